@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import ForbiddenWord
 
-# Register your models here.
+class ForbiddenWordAdmin(admin.ModelAdmin):
+    list_display = ('word', 'is_active', 'created_at')
+    list_editable = ('is_active',)
+    list_filter = ('is_active',)
+    search_fields = ('word',)
+
+admin.site.register(ForbiddenWord, ForbiddenWordAdmin)
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ForbiddenWord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.CharField(max_length=100, unique=True, verbose_name='Kelime')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Aktif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Oluşturulma Tarihi')),
+            ],
+            options={
+                'verbose_name': 'Yasaklı Kelime',
+                'verbose_name_plural': 'Yasaklı Kelimeler',
+            },
+        ),
+    ]
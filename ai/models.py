@@ -1,3 +1,13 @@
 from django.db import models
 
-# Create your models here.
+class ForbiddenWord(models.Model):
+    word = models.CharField(max_length=100, unique=True, verbose_name="Kelime")
+    is_active = models.BooleanField(default=True, verbose_name="Aktif")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
+
+    def __str__(self):
+        return self.word
+
+    class Meta:
+        verbose_name = "Yasaklı Kelime"
+        verbose_name_plural = "Yasaklı Kelimeler"
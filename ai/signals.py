@@ -0,0 +1,10 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ForbiddenWord
+from utils.content_filter import clear_content_filter
+
+@receiver(post_save, sender=ForbiddenWord)
+@receiver(post_delete, sender=ForbiddenWord)
+def clear_content_filter_cache(sender, instance, **kwargs):
+    transaction.on_commit(clear_content_filter)
@@ -1,3 +1,382 @@
-from django.test import TestCase
+"""
+Tests of the OpenAI gateway against a local stub server standing in for the Chat Completions API,
+of the streamed chat answers and the content filter, of the caching and image preparation of the OCR pipeline and of the question bank
+lookup of SolveImageView.
 
-# Create your tests here.
+    DB_ENGINE=sqlite python manage.py test ai
+"""
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageDraw
+from rest_framework.test import APIClient
+from questions.models import ExamType, ExamYear, Question, Subject
+from services.ocr_pipeline import binarize, prepare_image
+from users.models import CustomUser
+from ai.models import ForbiddenWord
+from utils.ai_utils import call_openai_chat, extract_text_from_image, is_valid_message, stream_openai_chat
+from utils.content_filter import StreamingMessageFilter
+from utils.question_text_index import find_matching_question, index_question
+
+SYSTEM_PROMPT = "Sen deneyimli bir öğretmensin."
+
+class StubOpenAIServer:
+    """
+    Answers POST /v1/chat/completions with a numbered answer, or with `answer` when given, after `delay` seconds.
+    `failures` is the number of requests answered with a 500 before the first successful answer.
+    Streamed requests get the answer word by word, `chunk_delay` seconds apart.
+    """
+
+    def __init__(self, delay=0, failures=0, answer=None, chunk_delay=0):
+        self.delay = delay
+        self.failures = failures
+        self.answer = answer
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self.sent_chunks = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                stub.requests.append(request)
+                time.sleep(stub.delay)
+                answer = stub.answer or f'Cevap {len(stub.requests)}'
+                if len(stub.requests) <= stub.failures:
+                    status, body = 500, {'error': {'message': 'Sunucu hatası', 'type': 'server_error'}}
+                elif request.get('stream'):
+                    return self.stream(answer)
+                else:
+                    status, body = 200, {
+                        'id': 'stub', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+                        'choices': [{
+                            'index': 0, 'finish_reason': 'stop',
+                            'message': {'role': 'assistant', 'content': answer},
+                        }],
+                    }
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def stream(self, answer):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                deltas = [({'content': word}, None) for word in re.findall(r'\S+\s*', answer)] + [({}, 'stop')]
+                try:
+                    for delta, finish_reason in deltas:
+                        chunk = {
+                            'id': 'stub', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'stub',
+                            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                        }
+                        self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                        self.wfile.flush()
+                        stub.sent_chunks += 1
+                        time.sleep(stub.chunk_delay)
+                    self.wfile.write(b'data: [DONE]\n\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client closed the stream
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    OPENAI_API_KEY='test', AI_REQUEST_TIMEOUT=2, AI_MAX_RETRIES=1, AI_CACHE_TTL=60,
+)
+class AIGatewayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def call(self, stub, user_message):
+        with override_settings(OPENAI_BASE_URL=stub.base_url):
+            return call_openai_chat(SYSTEM_PROMPT, user_message)
+
+    def test_repeated_question_is_answered_from_the_cache(self):
+        with StubOpenAIServer() as stub:
+            first = self.call(stub, "Türev nedir?")
+            second = self.call(stub, "  türev   NEDİR? ")
+            self.assertEqual((first, second), ('Cevap 1', 'Cevap 1'))
+            self.assertEqual(len(stub.requests), 1)
+
+            self.call(stub, "İntegral nedir?")
+            self.assertEqual(len(stub.requests), 2)
+
+    def test_server_error_is_retried(self):
+        with StubOpenAIServer(failures=1) as stub:
+            self.assertEqual(self.call(stub, "Limit nedir?"), 'Cevap 2')
+            self.assertEqual(len(stub.requests), 2)
+
+    @override_settings(AI_REQUEST_TIMEOUT=0.2, AI_MAX_RETRIES=0)
+    def test_slow_upstream_times_out(self):
+        with StubOpenAIServer(delay=1) as stub:
+            start = time.perf_counter()
+            with self.assertRaises(RuntimeError):
+                self.call(stub, "Olasılık nedir?")
+            self.assertLess(time.perf_counter() - start, 1)
+
+def read_events(response):
+    """(event, data) pairs of a server-sent events response."""
+    content = b''.join(response.streaming_content).decode()
+    return [
+        (re.search(r'^event: (.*)$', block, re.M).group(1), json.loads(re.search(r'^data: (.*)$', block, re.M).group(1)))
+        for block in content.split('\n\n') if block
+    ]
+
+LONG_ANSWER = ' '.join(f'kelime{i}' for i in range(40))
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    OPENAI_API_KEY='test', AI_REQUEST_TIMEOUT=2, AI_MAX_RETRIES=0, AI_CACHE_TTL=60, SECURE_SSL_REDIRECT=False,
+)
+class ChatStreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(email='ogrenci@example.com', password='Parola123!', name='Öğrenci')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def chat(self, stub, message):
+        with override_settings(OPENAI_BASE_URL=stub.base_url):
+            response = self.client.post(reverse('ai-simple-chat'), {'message': message, 'stream': True}, format='json')
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            return read_events(response)
+
+    def test_answer_is_streamed_word_by_word_and_cached(self):
+        with StubOpenAIServer(answer='Türev, bir fonksiyonun değişim hızıdır.') as stub:
+            events = self.chat(stub, "Türev nedir?")
+            self.assertEqual(events[-1], ('done', {'response': 'Türev, bir fonksiyonun değişim hızıdır.'}))
+            self.assertGreater(len([event for event, _ in events if event == 'token']), 1)
+
+            self.assertEqual(self.chat(stub, "türev nedir?")[-1], events[-1])
+            self.assertEqual(len(stub.requests), 1)
+
+    def test_forbidden_word_split_between_chunks_stops_the_stream(self):
+        filter_ = StreamingMessageFilter()
+        released = [filter_.feed(piece) for piece in ['Sistemi ', 'ha', 'ck', 'lemek']]
+        self.assertIsNone(released[-2])
+        self.assertNotIn('ha', ''.join(released[:2]))
+
+        with StubOpenAIServer(answer='Bu sitede sistemi hacklemek için şu adımları izleyin.') as stub:
+            events = self.chat(stub, "Nasıl giriş yaparım?")
+            self.assertEqual(events[-1][0], 'error')
+            self.assertNotIn('hack', ''.join(data.get('content', '') for _, data in events))
+
+    @override_settings(AI_MAX_CONCURRENT_REQUESTS=1)
+    def test_closed_stream_stops_the_generation_and_frees_its_slot(self):
+        with StubOpenAIServer(answer=LONG_ANSWER, chunk_delay=0.02) as stub:
+            with override_settings(OPENAI_BASE_URL=stub.base_url):
+                stream = stream_openai_chat(SYSTEM_PROMPT, "Uzun bir cevap ver.")
+                next(stream)
+                stream.close()
+                time.sleep(0.2)
+                self.assertLess(stub.sent_chunks, 20)
+
+                self.assertEqual(''.join(stream_openai_chat(SYSTEM_PROMPT, "Başka bir soru.")), LONG_ANSWER)
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ContentFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_turkish_letters_are_folded(self):
+        for text in ["SİSTEM AÇIĞI bulduk", "ILLEGAL", "ıllegal", "Bu bir Phishing sitesi"]:
+            self.assertFalse(is_valid_message(text), text)
+        for text in ["Türev nedir?", "İntegral ve limit", "", None]:
+            self.assertTrue(is_valid_message(text), text)
+
+    def test_words_added_in_the_admin_apply_at_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            word = ForbiddenWord.objects.create(word='Kopya Çekmek')
+        self.assertFalse(is_valid_message("Sınavda KOPYA ÇEKMEK istiyorum"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word.is_active = False
+            word.save()
+        self.assertTrue(is_valid_message("Sınavda KOPYA ÇEKMEK istiyorum"))
+
+    def test_word_list_is_read_from_the_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', encoding='utf-8', delete=False) as words_file:
+            words_file.write("# Yasaklı kelimeler\nkopya\n\nIğdır\n")
+        self.addCleanup(os.remove, words_file.name)
+
+        with override_settings(CONTENT_FILTER_WORDS_FILE=words_file.name):
+            self.assertFalse(is_valid_message("Kopya çekilir mi?"))
+            self.assertFalse(is_valid_message("IĞDIR"))
+            self.assertTrue(is_valid_message("hack"))
+
+def draw_page(seed, size=(1500, 2000)):
+    """Photo-like page of random text lines on off-white paper."""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, (235, 232, 225))
+    draw = ImageDraw.Draw(image)
+    for y in range(80, size[1] - 80, 60):
+        words = [rng.choice(['soru', 'cevap', 'türev', 'integral', 'A)', 'B)', 'limit', 'x²+3']) for _ in range(14)]
+        draw.text((60, y), ' '.join(words), fill=(30, 30, 30), font_size=36)
+    return image
+
+def encode(image, image_format='JPEG', **options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    OCR_MAX_DIMENSION=1000, OCR_CACHE_TTL=60,
+)
+class OCRPipelineTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_photo_is_downscaled_greyscaled_and_binarised(self):
+        image = binarize(prepare_image(draw_page(1)))
+        self.assertEqual((image.mode, image.size), ('L', (750, 1000)))
+        self.assertEqual({value for value, count in enumerate(image.histogram()) if count}, {0, 255})
+
+    @mock.patch('services.ocr_pipeline.run_tesseract', side_effect=lambda image: f'Metin {image.size}')
+    def test_copies_of_a_photo_are_read_once(self, run_tesseract):
+        page = draw_page(1)
+        first = extract_text_from_image(encode(page, quality=92))
+        self.assertEqual(extract_text_from_image(encode(page, quality=92)), first)  # Same file
+        self.assertEqual(extract_text_from_image(encode(page, quality=70)), first)  # Re-encoded
+        self.assertEqual(extract_text_from_image(encode(page.resize((1200, 1600)), 'PNG')), first)  # Resized
+        self.assertEqual(run_tesseract.call_count, 1)
+
+        extract_text_from_image(encode(draw_page(2), quality=92))
+        self.assertEqual(run_tesseract.call_count, 2)
+
+BANK_QUESTIONS = [
+    "Aşağıdakilerden hangisi Osmanlı Devleti'nin kuruluş döneminde uygulanan politikalardan biridir? "
+    "A) İskân politikası B) İstimalet C) Tımar sistemi D) Devşirme E) Hepsi",
+    "Bir sayının 3 katının 5 fazlası 20 ise bu sayının yarısı kaçtır? A) 2,5 B) 3 C) 5 D) 7,5 E) 10",
+    "Türkiye'de karasal iklimin görüldüğü bölgelerde doğal bitki örtüsü aşağıdakilerden hangisidir? "
+    "A) Maki B) Bozkır C) Orman D) Savan E) Tundra",
+]
+# OCR of a photo of the first question: Turkish letters lost, misread characters and extra punctuation
+PHOTOGRAPHED_QUESTION = (
+    "Asagidakilerden hangisi 0smanli Devleti'nin kurulus doneminde uygulanan politikalardan biridir ? "
+    "A) Iskan politikasi B) Istimalet C) Timar sistemi D) Devsirrne E) Hepsi."
+)
+# Two questions asked on the same passage, their texts are about 80% similar
+SHARED_PASSAGE = (
+    "1. - 2. soruları aşağıdaki parçaya göre cevaplayınız. Anadolu'da yerleşik hayata geçişin en eski izleri "
+    "Çatalhöyük ve Göbeklitepe gibi yerleşim yerlerinde görülür. Bu yerleşim yerlerinde bulunan tapınaklar, duvar "
+    "resimleri ve ev kalıntıları insanların tarım ve hayvancılıkla uğraştığını, inanç sistemleri geliştirdiğini "
+    "göstermektedir. Göbeklitepe'deki dikilitaşlar üzerindeki hayvan kabartmaları, avcı toplulukların bile anıtsal "
+    "yapılar inşa edebildiğini kanıtlar. Çatalhöyük'te evlerin birbirine bitişik yapılması ve girişlerin damdan "
+    "sağlanması, güvenlik kaygısını yansıtır. Bu buluntular, tarımın yerleşik hayatı mı yoksa inancın tarımı mı "
+    "başlattığı sorusunu yeniden tartışmaya açmıştır. "
+)
+PASSAGE_QUESTIONS = [
+    SHARED_PASSAGE + "1. Bu parçaya göre aşağıdakilerden hangisine ulaşılabilir? A) Yazı kullanılmıştır "
+    "B) İnanç sistemi gelişmiştir C) Ticaret yapılmıştır D) Madenler işlenmiştir E) Devlet kurulmuştur",
+    SHARED_PASSAGE + "2. Parçada sözü edilen yerleşim yerleri hangi çağa aittir? A) Cilalı Taş B) Tunç C) Demir "
+    "D) Bakır E) Yontma Taş",
+]
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SECURE_SSL_REDIRECT=False,
+)
+class QuestionBankLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        exam_year = ExamYear.objects.create(year=2023)
+        exam_type = ExamType.objects.create(name='KPSS')
+        subject = Subject.objects.create(name='Genel Kültür')
+        cls.questions = []
+        for number, text in enumerate(BANK_QUESTIONS, start=1):
+            question = Question.objects.create(
+                exam_year=exam_year, exam_type=exam_type, subject=subject, question_number=number,
+                correct_answer='B', image_url=f'https://example.com/soru-{number}.png',
+                video_solution_url=f'https://example.com/cozum-{number}.mp4',
+            )
+            index_question(question, text)
+            cls.questions.append(question)
+        cls.user = CustomUser.objects.create_user(email='ogrenci@example.com', password='Parola123!', name='Öğrenci')
+
+    def test_photographed_question_matches_its_bank_question(self):
+        question, similarity = find_matching_question(PHOTOGRAPHED_QUESTION)
+        self.assertEqual(question, self.questions[0])
+        self.assertGreaterEqual(similarity, 0.8)
+
+    def test_questions_sharing_a_passage_match_only_with_a_clear_lead(self):
+        for number, text in enumerate(PASSAGE_QUESTIONS, start=len(BANK_QUESTIONS) + 1):
+            question = Question.objects.create(
+                exam_year=self.questions[0].exam_year, exam_type=self.questions[0].exam_type,
+                subject=self.questions[0].subject, question_number=number, correct_answer='B',
+                image_url=f'https://example.com/soru-{number}.png',
+            )
+            index_question(question, text)
+
+        question, similarity = find_matching_question(PASSAGE_QUESTIONS[1])
+        self.assertEqual(question.question_number, len(BANK_QUESTIONS) + 2)
+        self.assertEqual(similarity, 1)
+
+        # A photo cut off below the passage is above the threshold for both questions
+        question, similarity = find_matching_question(SHARED_PASSAGE + "1. Bu parçaya göre")
+        self.assertIsNone(question)
+        self.assertGreaterEqual(similarity, 0.8)
+
+    def test_unknown_and_replaced_questions_do_not_match(self):
+        self.assertIsNone(find_matching_question("Bir üçgenin iç açıları toplamı kaç derecedir? A) 90 B) 180 C) 270 D) 360 E) 540")[0])
+        self.assertIsNone(find_matching_question("Hepsi")[0])
+
+        Question.objects.filter(pk=self.questions[0].pk).update(image_url='https://example.com/yeni-soru-1.png')
+        self.assertIsNone(find_matching_question(PHOTOGRAPHED_QUESTION)[0])
+
+    @mock.patch('ai.views.ai_views.call_openai_chat', return_value='Yapay zeka çözümü')
+    @mock.patch('ai.views.ai_views.extract_text_from_image')
+    def test_solve_image_answers_bank_questions_without_the_llm(self, extract_text, call_openai_chat):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        def solve(text):
+            extract_text.return_value = text
+            image = SimpleUploadedFile('soru.jpg', b'jpeg', content_type='image/jpeg')
+            response = client.post(reverse('ai-solve-image'), {'image': image}, format='multipart')
+            self.assertEqual(response.status_code, 200)
+            return response.json()['data']
+
+        data = solve(PHOTOGRAPHED_QUESTION)
+        self.assertEqual(data['matched_question']['id'], self.questions[0].id)
+        self.assertEqual(data['matched_question']['video_solution_url'], 'https://example.com/cozum-1.mp4')
+        self.assertIn('Doğru cevap: B', data['solution'])
+        call_openai_chat.assert_not_called()
+
+        data = solve("Bir üçgenin iç açıları toplamı kaç derecedir? A) 90 B) 180 C) 270 D) 360 E) 540")
+        self.assertEqual(data['solution'], 'Yapay zeka çözümü')
+        self.assertNotIn('matched_question', data)
@@ -1,13 +1,43 @@
+import json
+from contextlib import closing
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, JSONParser
 from rest_framework.exceptions import ParseError
 
 from utils.api_responses import ApiResponse
-from utils.ai_utils import extract_text_from_image, call_openai_chat, is_valid_message
+from utils.ai_utils import extract_text_from_image, call_openai_chat, is_valid_message, stream_openai_chat
+from utils.question_text_index import find_matching_question
+from serializers.question_serializers import QuestionDetailSerializer
 # from rest_framework.throttling import UserRateThrottle
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_chat_events(system_prompt, user_message):
+    """
+    Server-sent events of a streamed answer: 'token' events with the pieces of the answer, then a 'done' event
+    with the whole answer or an 'error' event, after which the client should discard the pieces it received.
+    """
+    pieces = []
+    try:
+        # A client that disconnects closes this generator and with it the stream of the model
+        with closing(stream_openai_chat(system_prompt, user_message)) as stream:
+            for piece in stream:
+                pieces.append(piece)
+                yield sse_event('token', {'content': piece})
+        yield sse_event('done', {'response': ''.join(pieces)})
+    except RuntimeError as e:
+        yield sse_event('error', {'message': str(e)})
+    except Exception as e:
+        print(f"Unexpected error in SimpleChatView stream: {e}")
+        yield sse_event('error', {'message': "Sohbet yanıtı alınırken beklenmedik bir hata oluştu."})
+
 class SimpleChatView(APIView):
+    """
+    Answers with the whole response, or with server-sent events as the model generates it when 'stream' is true.
+    """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, JSONParser]
     # throttle_classes = [UserRateThrottle]
@@ -30,6 +60,12 @@ class SimpleChatView(APIView):
           Yanıt verirken, her zaman platformun amacına uygun, saygılı ve eğitici bir üslup kullan.
         """
 
+        if str(request.data.get('stream', request.query_params.get('stream', ''))).lower() in ('true', '1'):
+            response = StreamingHttpResponse(stream_chat_events(system_prompt, user_message), content_type='text/event-stream')
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'  # Keeps nginx from buffering the events
+            return response
+
         try:
             ai_response = call_openai_chat(system_prompt, user_message)
             return ApiResponse.Success(data={"response": ai_response})
@@ -98,7 +134,21 @@ class SolveImageView(APIView):
             if not is_valid_message(extracted_text):
                  return ApiResponse.BadRequest(message="Görüntüdeki metin uygunsuz içerik barındırıyor.")
 
-            # 2. Solve with OpenAI
+            # 2. Answer questions of the question bank with their stored answer
+            question, similarity = find_matching_question(extracted_text)
+            if question is not None:
+                exam = ' '.join(str(part) for part in (question.exam_year, question.exam_type) if part)
+                solution = f"Bu soru {exam} sınavının {question.question_number}. sorusu. Doğru cevap: {question.correct_answer}."
+                if question.video_solution_url:
+                    solution += " Sorunun video çözümünü izleyebilirsiniz."
+                return ApiResponse.Success(data={
+                    "solution": solution,
+                    "extracted_text": extracted_text,
+                    "matched_question": QuestionDetailSerializer(question).data,
+                    "similarity": round(similarity, 2),
+                })
+
+            # 3. Solve with OpenAI
             system_prompt = f"""
               Sen 'Sınav Soruları' adlı uygulamada deneyimli bir öğretmensin. Kullanıcıların sorularına kibar, kısa ve öz şekilde yanıt ver.
               Ancak, etik dışı veya uygunsuz içerikleri yanıtlamamalısın.
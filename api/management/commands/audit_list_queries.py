@@ -0,0 +1,144 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.generics import GenericAPIView
+from rest_framework.mixins import ListModelMixin
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory, force_authenticate
+from pagination.keyset_pagination import KeysetPagination
+from users.models import CustomUser
+
+SEQ_SCAN_REGEX = re.compile(r'Seq Scan on (\w+)')
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the first page query of every API list view and flag sequential scans. "
+        "Sequential scans are disabled for the planner, so a remaining Seq Scan means no index can serve the query. "
+        "Run it against a migrated and seeded PostgreSQL database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, dest='user_id',
+            help="Run the queries as this user. Defaults to the user with the most quiz attempts."
+        )
+        parser.add_argument(
+            '--ignore-table', action='append', dest='ignored_tables', default=[],
+            help="Do not flag sequential scans on this table. Can be passed multiple times."
+        )
+        parser.add_argument(
+            '--show-plans', action='store_true',
+            help="Print the full plan of every query."
+        )
+        parser.add_argument(
+            '--no-fail', action='store_true',
+            help="Only report sequential scans instead of exiting with an error."
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Bu komut yalnızca PostgreSQL veritabanında çalışır.")
+
+        user = self.get_user(options['user_id'])
+        flagged, skipped = [], []
+
+        for route, callback in iter_list_views(get_resolver().url_patterns):
+            label = f"{route} ({get_view_class(callback).__name__})"
+            queryset = build_first_page_queryset(route, callback, user)
+            if queryset is None:
+                skipped.append(label)
+                continue
+
+            plan = explain_without_seq_scans(queryset)
+            tables = sorted(set(SEQ_SCAN_REGEX.findall(plan)) - set(options['ignored_tables']))
+            if tables:
+                flagged.append(label)
+                self.stdout.write(self.style.WARNING(f"SEQ SCAN  {label}: {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"OK        {label}")
+            if options['show_plans']:
+                self.stdout.write(plan + '\n')
+
+        for label in skipped:
+            self.stdout.write(f"SKIPPED   {label}: URL parametresi veya queryset yok")
+
+        if flagged and not options['no_fail']:
+            raise CommandError(f"{len(flagged)} liste sorgusu sıralı tarama (Seq Scan) kullanıyor.")
+        self.stdout.write(self.style.SUCCESS(f"{len(flagged)} sorgu işaretlendi, {len(skipped)} görünüm atlandı."))
+
+    def get_user(self, user_id):
+        if user_id is not None:
+            try:
+                return CustomUser.objects.get(pk=user_id)
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"Kullanıcı bulunamadı: {user_id}")
+
+        user = CustomUser.objects.annotate(attempt_count=Count('quiz_attempts')).order_by('-attempt_count', 'id').first()
+        if user is None:
+            raise CommandError("Veritabanında kullanıcı yok, önce örnek veri yükleyin.")
+        return user
+
+def get_view_class(callback):
+    return getattr(callback, 'cls', None) or getattr(callback, 'view_class', None) or type(callback)
+
+def iter_list_views(patterns, prefix='/'):
+    """Yields (route, callback) for every URL whose GET request is served by a DRF list action."""
+    for pattern in patterns:
+        if 'format' in pattern.pattern.regex.groupindex:
+            continue  # Format suffix duplicates of the same view
+        route = prefix + str(pattern.pattern).lstrip('^').rstrip('$')
+        if isinstance(pattern, URLResolver):
+            yield from iter_list_views(pattern.url_patterns, route)
+            continue
+        if not isinstance(pattern, URLPattern):
+            continue
+
+        view_class = get_view_class(pattern.callback)
+        if not (isinstance(view_class, type) and issubclass(view_class, GenericAPIView)):
+            continue
+        actions = getattr(pattern.callback, 'actions', None)
+        if actions is not None and actions.get('get') != 'list':
+            continue
+        if actions is None and not issubclass(view_class, ListModelMixin):
+            continue
+        yield route, pattern.callback
+
+def build_first_page_queryset(route, callback, user):
+    """
+    Builds the queryset the view would run for the first page, ordered and sliced the way its paginator does.
+    Returns None for routes with URL parameters and views that build their response without get_queryset.
+    """
+    if '<' in route or '(?P' in route:
+        return None
+
+    request = APIRequestFactory().get(route)
+    force_authenticate(request, user=user)
+
+    view = get_view_class(callback)(**getattr(callback, 'initkwargs', {}))
+    actions = getattr(callback, 'actions', None)
+    if actions is not None:
+        view.action_map = actions
+        view.action = actions.get('get')
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    view.request = view.initialize_request(request)
+
+    try:
+        queryset = view.filter_queryset(view.get_queryset())
+    except AssertionError:
+        return None  # No queryset or get_queryset, the view builds its response itself
+
+    paginator = view.paginator
+    if isinstance(paginator, KeysetPagination):
+        ordering = [f'-{paginator.field}', '-id'] if paginator.descending else [paginator.field, 'id']
+        return queryset.order_by(*ordering)[:paginator.page_size + 1]
+    if isinstance(paginator, PageNumberPagination):
+        return queryset[:paginator.page_size]
+    return queryset
+
+def explain_without_seq_scans(queryset):
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
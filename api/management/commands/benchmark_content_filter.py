@@ -0,0 +1,59 @@
+import re
+import timeit
+from django.core.management.base import BaseCommand
+from utils.content_filter import DEFAULT_FORBIDDEN_WORDS, ContentFilter, StreamingMessageFilter
+
+SHORT_MESSAGE = "Türev ile integral arasındaki ilişkiyi kısaca açıklar mısın?"
+ANSWER = (
+    "Türev, bir fonksiyonun bir noktadaki anlık değişim hızını verir. İntegral ise bu değişimlerin toplamını, "
+    "yani eğrinin altında kalan alanı hesaplar. Analizin temel teoremi bu iki işlemin birbirinin tersi olduğunu "
+    "söyler: Bir fonksiyonun integralinin türevi fonksiyonun kendisidir. Örneğin f(x) = x² için türev 2x, "
+    "belirsiz integral ise x³/3 + C olur. Sınavda bu ilişkiyi kullanarak alan ve hız sorularını çözebilirsin. "
+)
+OCR_PAGE = ANSWER * 8  # About 3500 characters, a photographed page of questions
+
+class LegacyFilter:
+    """The previous is_valid_message: one case insensitive search per pattern."""
+    max_length = max(len(word) for word in DEFAULT_FORBIDDEN_WORDS)
+
+    def is_valid(self, text):
+        if not text:
+            return True
+        return not any(re.search(pattern, text, re.IGNORECASE) for pattern in DEFAULT_FORBIDDEN_WORDS)
+
+class Command(BaseCommand):
+    help = (
+        "Compare the precompiled content filter with the previous per pattern search on a chat message, "
+        "an answer, an OCR page and an answer streamed word by word."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=2000, help="Calls per measurement.")
+        parser.add_argument('--repeat', type=int, default=5, help="Measurements per case, the fastest is reported.")
+
+    def handle(self, *args, **options):
+        filters = {'legacy': LegacyFilter(), 'compiled': ContentFilter(DEFAULT_FORBIDDEN_WORDS)}
+        chunks = re.findall(r'\S+\s*', ANSWER)
+        cases = [
+            ('chat message', lambda content_filter: content_filter.is_valid(SHORT_MESSAGE)),
+            ('answer', lambda content_filter: content_filter.is_valid(ANSWER)),
+            ('OCR page', lambda content_filter: content_filter.is_valid(OCR_PAGE)),
+            (f'stream ({len(chunks)} chunks)', lambda content_filter: stream(content_filter, chunks)),
+        ]
+
+        self.stdout.write(f"{'Case':<22}{'legacy µs':>12}{'compiled µs':>14}{'speedup':>10}")
+        for label, check in cases:
+            timings = {
+                name: min(timeit.repeat(lambda: check(content_filter), number=options['number'], repeat=options['repeat']))
+                / options['number'] * 1_000_000
+                for name, content_filter in filters.items()
+            }
+            self.stdout.write(
+                f"{label:<22}{timings['legacy']:>12.1f}{timings['compiled']:>14.1f}{timings['legacy'] / timings['compiled']:>9.1f}x"
+            )
+
+def stream(content_filter, chunks):
+    message_filter = StreamingMessageFilter(content_filter)
+    for chunk in chunks:
+        message_filter.feed(chunk)
+    message_filter.flush()
@@ -0,0 +1,166 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import CustomUser
+
+DEFAULT_CONFIGURATIONS = ['sync:1:1', 'sync:3:1', 'gthread:3:4']
+FAST_PATH = '/api/v1/report/types/'
+UPSTREAM_PATH = '/api/v2/chat/'  # Waits for the stub OpenAI server
+READY_TIMEOUT = 60
+
+class Command(BaseCommand):
+    help = (
+        "Compare gunicorn worker models under mixed load: short database requests together with chat requests "
+        "that wait for a stub OpenAI server with a fixed delay. Every configuration is given as "
+        "worker_class:workers:threads and started with gunicorn.conf.py on a free local port."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--config', action='append', dest='configurations',
+            help=f"worker_class:workers:threads, can be passed multiple times. Defaults to {', '.join(DEFAULT_CONFIGURATIONS)}."
+        )
+        parser.add_argument('--requests', type=int, default=400, help="Requests per configuration.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Number of concurrent clients.")
+        parser.add_argument('--upstream-ratio', type=float, default=0.2, help="Share of the requests that wait for the upstream.")
+        parser.add_argument('--upstream-delay', type=int, default=500, help="Response time of the stub OpenAI server in ms.")
+        parser.add_argument('--user', type=int, dest='user_id', help="Authenticate as this user. Defaults to the first staff user.")
+
+    def handle(self, *args, **options):
+        user = CustomUser.objects.filter(**({'pk': options['user_id']} if options['user_id'] else {'is_staff': True})).order_by('id').first()
+        if user is None:
+            raise CommandError("Kullanıcı bulunamadı, --user ile bir kullanıcı seçin.")
+        token = str(RefreshToken.for_user(user).access_token)
+        upstream = start_stub_openai_server(options['upstream_delay'] / 1000)
+
+        self.stdout.write(
+            f"{'Configuration':<16}{'req/s':>8}{'fast p50':>10}{'fast p99':>10}{'upstream p50':>14}{'upstream p99':>14}{'errors':>8}"
+        )
+        try:
+            for configuration in options['configurations'] or DEFAULT_CONFIGURATIONS:
+                result = self.run_configuration(configuration, upstream.server_address[1], token, options)
+                self.stdout.write(
+                    f"{configuration:<16}{result['throughput']:>8.1f}{result['fast'][0]:>10.0f}{result['fast'][1]:>10.0f}"
+                    f"{result['upstream'][0]:>14.0f}{result['upstream'][1]:>14.0f}{result['errors']:>8}"
+                )
+        finally:
+            upstream.shutdown()
+        self.stdout.write("Latencies in ms. Fast requests are database reads, upstream requests wait for the stub server.")
+
+    def run_configuration(self, configuration, upstream_port, token, options):
+        try:
+            worker_class, workers, threads = configuration.split(':')
+        except ValueError:
+            raise CommandError(f"Geçersiz yapılandırma: {configuration}, beklenen biçim worker_class:workers:threads")
+
+        port = get_free_port()
+        env = dict(
+            os.environ,
+            GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKER_CLASS=worker_class, GUNICORN_WORKERS=workers,
+            GUNICORN_THREADS=threads, GUNICORN_MAX_REQUESTS='0',
+            OPENAI_BASE_URL=f'http://127.0.0.1:{upstream_port}/v1', OPENAI_API_KEY='benchmark',
+            ALLOWED_HOSTS='127.0.0.1', SECURE_SSL_REDIRECT='False',
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', os.path.join(settings.BASE_DIR, 'gunicorn.conf.py'), 'osym_backend.wsgi:application'],
+            env=env, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            base_url = f'http://127.0.0.1:{port}'
+            wait_until_ready(base_url, server)
+            return send_mixed_load(base_url, token, options)
+        finally:
+            server.terminate()
+            server.wait()
+
+def start_stub_openai_server(delay):
+    """Chat completions endpoint that answers every request after the given delay, running in a daemon thread."""
+    body = json.dumps({
+        'id': 'benchmark', 'object': 'chat.completion', 'created': 0, 'model': 'benchmark',
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'Tamam.'}}],
+        'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+    }).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(base_url, server):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise CommandError("gunicorn başlatılamadı.")
+        try:
+            requests.get(base_url + '/app-ads.txt', timeout=1)
+            return
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    raise CommandError(f"gunicorn {READY_TIMEOUT} saniye içinde yanıt vermedi.")
+
+def send_mixed_load(base_url, token, options):
+    """Sends the requests, every 1 / upstream_ratio-th one waits for the upstream, and returns the latencies."""
+    every = max(1, round(1 / options['upstream_ratio'])) if options['upstream_ratio'] > 0 else None
+    sessions = threading.local()
+
+    def send(index):
+        if not hasattr(sessions, 'client'):
+            sessions.client = requests.Session()
+            sessions.client.headers['Authorization'] = f'Bearer {token}'
+        is_upstream = every is not None and index % every == 0
+        start = time.perf_counter()
+        if is_upstream:
+            response = sessions.client.post(base_url + UPSTREAM_PATH, json={'message': 'Merhaba'}, timeout=60)
+        else:
+            response = sessions.client.get(base_url + FAST_PATH, timeout=60)
+        return is_upstream, (time.perf_counter() - start) * 1000, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+        results = list(executor.map(send, range(options['requests'])))
+    elapsed = time.perf_counter() - start
+
+    def percentiles(is_upstream):
+        latencies = [latency for upstream, latency, _ in results if upstream == is_upstream]
+        if len(latencies) < 2:
+            return (latencies or [0]) * 2
+        cuts = statistics.quantiles(latencies, n=100)
+        return cuts[49], cuts[98]
+
+    return {
+        'throughput': len(results) / elapsed,
+        'fast': percentiles(False),
+        'upstream': percentiles(True),
+        'errors': sum(1 for _, _, status_code in results if status_code >= 400),
+    }
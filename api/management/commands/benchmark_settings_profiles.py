@@ -0,0 +1,83 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import get_resolver
+
+PROFILES = ('full', 'api')
+BENCHMARK_METRICS_TOKEN = 'benchmark'
+
+# Routes without database queries, so the timings show the cost of the middleware chain and the framework
+ROUTES = (
+    ('/app-ads.txt', {}),  # Plain Django view
+    ('/api/v1/request-metrics/', {'HTTP_X_METRICS_TOKEN': BENCHMARK_METRICS_TOKEN}),  # DRF view with JWT authentication
+)
+
+STARTUP_SCRIPT = "import time; start = time.perf_counter(); import django; django.setup(); " \
+                 "from osym_backend.wsgi import application; from django.urls import get_resolver; " \
+                 "get_resolver().url_patterns; print(time.perf_counter() - start)"
+
+class Command(BaseCommand):
+    help = (
+        "Compare the startup time and the per-request overhead of the 'full' and 'api' settings profiles. "
+        "Every profile runs in its own Python process, startup covers django.setup(), the WSGI application and the URLconf."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help="Requests per route and profile.")
+        parser.add_argument('--startup-runs', type=int, default=5, help="Process starts per profile, the median is reported.")
+        parser.add_argument('--worker', action='store_true', help="Measure the requests of the current profile and print JSON.")
+
+    def handle(self, *args, **options):
+        if options['worker']:
+            self.stdout.write(json.dumps(measure_requests(options['requests'])))
+            return
+
+        results = {profile: self.run_profile(profile, options) for profile in PROFILES}
+
+        self.stdout.write(f"{'':<40}" + ''.join(f"{profile:>12}" for profile in PROFILES))
+        rows = [('Installed apps', 'apps', '{:d}'), ('Middleware', 'middleware', '{:d}'), ('Startup (ms)', 'startup_ms', '{:.0f}')]
+        rows += [(f"{route} (µs/request)", route, '{:.0f}') for route, _ in ROUTES]
+        for label, key, value_format in rows:
+            self.stdout.write(f"{label:<40}" + ''.join(f"{value_format.format(results[profile][key]):>12}" for profile in PROFILES))
+
+    def run_profile(self, profile, options):
+        env = dict(os.environ, SETTINGS_PROFILE=profile, METRICS_TOKEN=BENCHMARK_METRICS_TOKEN)
+        startup_times = [float(run(env, [sys.executable, '-c', STARTUP_SCRIPT])) for _ in range(options['startup_runs'])]
+        worker_output = run(env, [
+            sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_settings_profiles',
+            '--worker', '--requests', str(options['requests'])
+        ])
+        result = json.loads(worker_output.strip().splitlines()[-1])
+        result['startup_ms'] = statistics.median(startup_times) * 1000
+        return result
+
+def run(env, command):
+    process = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise CommandError(f"{' '.join(command[:3])} failed:\n{process.stderr}")
+    return process.stdout
+
+def measure_requests(request_count):
+    """Median microseconds per request of every route, sent through the full handler and middleware chain."""
+    get_resolver().url_patterns  # Loaded by the first request in production as well
+    host = next((host for host in settings.ALLOWED_HOSTS if host and host != '*' and not host.startswith('.')), 'localhost')
+    client = Client(HTTP_HOST=host)
+    result = {'apps': len(settings.INSTALLED_APPS), 'middleware': len(settings.MIDDLEWARE)}
+
+    for route, headers in ROUTES:
+        response = client.get(route, secure=True, **headers)
+        if response.status_code != 200:
+            raise CommandError(f"{route} returned {response.status_code}.")
+        timings = []
+        for _ in range(request_count):
+            start = time.perf_counter()
+            client.get(route, secure=True, **headers)
+            timings.append(time.perf_counter() - start)
+        result[route] = statistics.median(timings) * 1_000_000
+    return result
@@ -0,0 +1,86 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import CustomUser
+
+DEFAULT_PATHS = ['/api/v1/report/types/', '/api/v1/paytr/payment_plans/']
+STATS_FLUSH_SECONDS = 11  # Idle PostgreSQL backends report their statistics at the latest after 10 seconds
+
+class Command(BaseCommand):
+    help = (
+        "Send concurrent requests to a running server and report p50/p99 latency and the PostgreSQL connections "
+        "opened during the run. Run it once per configuration, e.g. with DB_CONN_MAX_AGE=0 and DB_CONN_MAX_AGE=60 "
+        "on the server, and compare the results. Connections are read from pg_stat_database.sessions (PostgreSQL 14+) "
+        "of the database in the DB_* settings, so point them at the same database as the server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000', help="Address of the server under test.")
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help=f"Path to request, can be passed multiple times. Defaults to {', '.join(DEFAULT_PATHS)}."
+        )
+        parser.add_argument('--requests', type=int, default=2000, help="Total number of requests.")
+        parser.add_argument('--concurrency', type=int, default=8, help="Number of concurrent clients.")
+        parser.add_argument('--user', type=int, dest='user_id', help="Authenticate as this user. Defaults to the first staff user.")
+        parser.add_argument('--label', default='', help="Printed with the results, e.g. the CONN_MAX_AGE of the server.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        token = str(RefreshToken.for_user(self.get_user(options['user_id'])).access_token)
+        sessions = threading.local()
+
+        def send(index):
+            if not hasattr(sessions, 'client'):
+                # One keep-alive HTTP connection per client, so only the server side connections are counted
+                sessions.client = requests.Session()
+                sessions.client.headers['Authorization'] = f'Bearer {token}'
+            url = options['base_url'].rstrip('/') + paths[index % len(paths)]
+            start = time.perf_counter()
+            response = sessions.client.get(url, timeout=30)
+            return time.perf_counter() - start, response.status_code
+
+        send(0)  # Warm up the server before counting
+        sessions_before = self.get_session_count()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(send, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+        if sessions_before is not None:
+            time.sleep(STATS_FLUSH_SECONDS)
+        sessions_after = self.get_session_count()
+
+        latencies = sorted(duration * 1000 for duration, _ in results)
+        errors = sum(1 for _, status_code in results if status_code >= 400)
+        percentiles = statistics.quantiles(latencies, n=100)
+
+        self.stdout.write(f"Load test {options['label']}".rstrip())
+        self.stdout.write(f"  Requests:        {len(results)} ({errors} errors) with {options['concurrency']} clients in {elapsed:.1f} s")
+        self.stdout.write(f"  Throughput:      {len(results) / elapsed:.0f} requests/s")
+        self.stdout.write(f"  Latency p50/p99: {percentiles[49]:.1f} / {percentiles[98]:.1f} ms (max {latencies[-1]:.1f} ms)")
+        if sessions_before is None:
+            self.stdout.write("  DB connections:  not available, needs PostgreSQL 14 or newer")
+        else:
+            opened = sessions_after - sessions_before
+            self.stdout.write(f"  DB connections:  {opened} opened, {opened / len(results):.2f} per request")
+
+    def get_user(self, user_id):
+        users = CustomUser.objects.all()
+        user = users.filter(pk=user_id).first() if user_id is not None else users.filter(is_staff=True).order_by('id').first()
+        if user is None:
+            raise CommandError("Kullanıcı bulunamadı, --user ile bir kullanıcı seçin.")
+        return user
+
+    def get_session_count(self):
+        """Connections opened to the database since the statistics were reset, None when the server does not count them."""
+        if connection.vendor != 'postgresql' or connection.pg_version < 140000:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_stat_clear_snapshot()')
+            cursor.execute('SELECT sessions FROM pg_stat_database WHERE datname = current_database()')
+            return cursor.fetchone()[0]
@@ -1,3 +1,757 @@
-from django.test import TestCase
+"""
+Query count and payload size budgets for every route in api/urls.
 
-# Create your tests here.
+The fixture is a question bank of a few thousand questions and a user with hundreds of attempts, so a per-row query
+in a view or serializer shows up as soon as it is added. Every route is called once with a cold cache and the run
+fails when a route runs more queries or returns a larger body than its budget. With BUDGET_TABLE=1 a table of
+queries, time and bytes per route is printed after the run, compare it between changes when working on performance.
+
+    python manage.py test api                   # PostgreSQL from the DB_* environment variables
+    DB_ENGINE=sqlite python manage.py test api  # SQLite, no database server needed
+    BUDGET_TABLE=1 python manage.py test api    # Prints the table
+
+Run it with the default SETTINGS_PROFILE=full, the api profile leaves out the admin upload pages that have budgets.
+
+Budgets are the measured values with a little headroom. Lower them when a change saves queries and only raise them
+together with the change that needs it. A new route in api/urls fails RouteCoverageTests until it gets a budget
+or an entry in EXCLUDED.
+"""
+import base64
+import json
+import os
+import random
+import re
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+import email_validator
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from osym_backend.celery import app as celery_app
+from exam_sets.models import (
+    ExamSet, ExamSetSubject, ExamSetQuizGroup, ExamSetQuiz, ExamSetQuizAttempt, ExamSetIncorrectQuestion,
+    ExamSetDisplaySet, ExamSetDisplaySetAttempt, ExamSetDisplaySetIncorrectQuestion, UserExamConfiguration
+)
+from exams.models import Exam
+from ogmmateryal.models import ExamSection, ExamSubject, ExamStructure
+from others.models import BulkUploadStatus
+from paytr.models import Payment, PaymentPlan
+from questions.models import ExamYear, ExamType, Subject, Topic, Question
+from questions.views.question_views import QuestionCodec
+from quizzes.models import (
+    QuizAttempt, IncorrectQuestion, QuestionDisplaySet, DisplaySetAttempt, DisplaySetIncorrectQuestion, FavoriteQuestion
+)
+from reports.models import ReportType
+from topic_history.models import TopicHistory
+from uni_rankings.models import ExamYear as RankingExamYear, Location, University, Major, Program
+from users.models import CustomUser, VerificationCode
+from utils.attempt_grading import AttemptGrader, sort_by_subject_order
+from utils.ordered_questions import set_ordered_questions
+from utils.performance_tools import build_latest_statuses, save_latest_statuses, refresh_user_performance
+from utils.quiz_generation import create_quiz_group
+from utils.request_metrics import request_metrics
+
+PASSWORD = 'Deneme.Sifre.2024'
+NEW_PASSWORD = 'Yeni.Sifre.2025'
+VERIFICATION_CODE = '12345'
+
+QUESTIONS_PER_TOPIC = 7  # Per exam year and type: 7 years x 2 types x 30 topics x 7 = 2940 questions
+QUIZ_GROUPS = 30
+ATTEMPTS_PER_QUIZ = 10
+
+ROUTE_PARAMETER_REGEX = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+URL_PARAMETER_REGEX = re.compile(r'<(?:\w+:)?(\w+)>')
+
+class Endpoint:
+    """
+    One request of the budget run.
+    url_kwargs maps the URL parameters to fixture paths (e.g. {'pk': 'quiz.id'}), data and params are dicts
+    or callables taking the test class. user is the fixture attribute of the requesting user, None sends no
+    credentials, and token is the kind of JWT sent for it.
+    """
+
+    def __init__(self, method, route, max_queries, max_kb, url_kwargs=None, data=None, params=None,
+                 user='user', token='access', status=200):
+        self.method = method
+        self.route = route
+        self.max_queries = max_queries
+        self.max_bytes = int(max_kb * 1024)
+        self.url_kwargs = url_kwargs or {}
+        self.data = data
+        self.params = params
+        self.user = user
+        self.token = token
+        self.status = status
+
+    @property
+    def key(self):
+        return self.method, self.route
+
+    def build_url(self, fixture):
+        values = {name: resolve(fixture, path) for name, path in self.url_kwargs.items()}
+        return URL_PARAMETER_REGEX.sub(lambda match: str(values[match.group(1)]), self.route)
+
+    def build_payload(self, fixture):
+        payload = self.params if self.method == 'get' else self.data
+        return payload(fixture) if callable(payload) else payload
+
+def resolve(fixture, path):
+    """Follows a dotted path of attributes and list indexes, e.g. 'subjects.0.id'."""
+    value = fixture
+    for part in path.split('.'):
+        value = value[int(part)] if part.isdigit() else getattr(value, part)
+    return value
+
+def answers_for(fixture, parent, count=None):
+    """Submitted answers for the first questions of a quiz or display set, keyed for both submit formats."""
+    questions = fixture.question_orders[parent][:count]
+    return {'answers': [
+        {'question_id': question.id, 'question_order': order, 'user_answer': question.correct_answer, 'user_time': 40}
+        for order, question in enumerate(questions, start=1)
+    ]}
+
+def id_list(objects):
+    return ','.join(str(obj.id) for obj in objects)
+
+ENDPOINTS = [
+    # Users
+    Endpoint('post', '/api/v1/register/', 7, 1, user=None, data={
+        'email': 'yeni@example.com', 'name': 'Yeni', 'phone_number': '5550001122',
+        'password': PASSWORD, 'password_confirmation': PASSWORD
+    }),
+    Endpoint('post', '/api/v1/verification-code/resend/', 7, 1, user=None,
+             data=lambda f: {'email': f.pending_user.email}),
+    Endpoint('post', '/api/v1/verification-code/verify/', 6, 1, user=None,
+             data=lambda f: {'email': f.pending_user.email, 'code': VERIFICATION_CODE}),
+    Endpoint('post', '/api/v1/password/reset/request/', 7, 1, user=None, data=lambda f: {'email': f.user.email}),
+    Endpoint('post', '/api/v1/password/reset/', 7, 1, user=None, data=lambda f: {
+        'email': f.pending_user.email, 'code': VERIFICATION_CODE,
+        'new_password': NEW_PASSWORD, 'confirm_password': NEW_PASSWORD
+    }),
+    Endpoint('post', '/api/v1/login/', 4, 1, user=None, data=lambda f: {'email': f.user.email, 'password': PASSWORD}),
+    Endpoint('post', '/api/v1/refresh/token/', 3, 1, token='refresh'),
+    Endpoint('post', '/api/v1/logout/', 8, 1, token='refresh'),
+    Endpoint('put', '/api/v1/password/change/', 20, 1, data={
+        'current_password': PASSWORD, 'new_password': NEW_PASSWORD, 'confirm_password': NEW_PASSWORD
+    }),
+    Endpoint('get', '/api/v1/profile/', 4, 1),
+    Endpoint('put', '/api/v1/profile/', 5, 1, data={'name': 'Öğrenci Yeni'}),
+    Endpoint('delete', '/api/v1/account/', 94, 1),  # Cascades over every table holding the user's rows
+    Endpoint('post', '/api/v1.1/register/', 8, 1, user=None, data={
+        'email': 'yeni11@example.com', 'name': 'Yeni', 'phone_number': '5550001133',
+        'password': PASSWORD, 'password_confirmation': PASSWORD
+    }),
+    Endpoint('post', '/api/v1.1/login/', 4, 1, user=None, data=lambda f: {'email': f.user.email, 'password': PASSWORD}),
+    Endpoint('post', '/api/v2/anonymous/register/', 5, 1, user=None, data={'device_id': 'yeni-cihaz'}),
+    Endpoint('post', '/api/v2/anonymous/upgrade/', 12, 1, user='anonymous_user', data={
+        'email': 'misafir@example.com', 'name': 'Misafir', 'phone_number': '5550001144',
+        'password': PASSWORD, 'password_confirmation': PASSWORD
+    }),
+
+    # Exams and grades
+    Endpoint('get', '/api/v1/exams/', 6, 2),
+    Endpoint('get', '/api/v1/exams/select/', 5, 1),
+    Endpoint('post', '/api/v1/exams/select/', 10, 1, data=lambda f: {'exams': [exam.id for exam in f.exams[:3]]}),
+    Endpoint('get', '/api/v1/grades/', 3, 1),
+    Endpoint('get', '/api/v1/user/grade/', 3, 1),
+    Endpoint('post', '/api/v1/user/grade/', 4, 1, data={'grade': 11}),
+
+    # Question catalogue
+    Endpoint('get', '/api/v1/exam-years/', 8, 1),
+    Endpoint('get', '/api/v1/exam-types/', 8, 1, params=lambda f: {'year_ids': id_list(f.exam_years[:3])}),
+    Endpoint('get', '/api/v1/subjects/', 8, 1, params=lambda f: {
+        'year_ids': id_list(f.exam_years[:3]), 'type_ids': id_list(f.exam_types)
+    }),
+    Endpoint('get', '/api/v1/topics/', 8, 1, params=lambda f: {
+        'year_ids': id_list(f.exam_years[:3]), 'type_ids': id_list(f.exam_types), 'subject_id': f.subjects[0].id
+    }),
+    Endpoint('get', '/api/v2/soru/<str:code>/', 8, 1, url_kwargs={'code': 'question_code'}),
+
+    # Quizzes
+    Endpoint('post', '/api/v1/quizzes/', 20, 1, data=lambda f: {
+        'year_ids': [year.id for year in f.exam_years], 'type_ids': [exam_type.id for exam_type in f.exam_types],
+        'subject_id': f.subjects[0].id, 'topic_id': f.topics[0].id, 'name': 'Yeni Test'
+    }),
+    Endpoint('post', '/api/v2/quizzes/', 20, 1, data=lambda f: {
+        'year_ids': [year.id for year in f.exam_years], 'type_ids': [exam_type.id for exam_type in f.exam_types],
+        'subject_id': f.subjects[0].id, 'topic_ids': [topic.id for topic in f.topics[:2]], 'name': 'Yeni Test',
+        'max_questions': 40, 'seed': 16
+    }),
+    Endpoint('get', '/api/v1/quiz-groups/', 9, 8),
+    Endpoint('get', '/api/v1/quiz-groups/<int:pk>/', 8, 1, url_kwargs={'pk': 'quiz_group.id'}),
+    Endpoint('delete', '/api/v1/quiz-groups/<int:pk>/', 17, 1, url_kwargs={'pk': 'quiz_group.id'}),
+    Endpoint('get', '/api/v1/quizzes/<int:pk>/', 8, 8, url_kwargs={'pk': 'quiz.id'}),
+    Endpoint('delete', '/api/v1/quizzes/<int:pk>/', 11, 1, url_kwargs={'pk': 'quiz.id'}),
+    Endpoint('post', '/api/v1/quizzes/<int:quiz_id>/submit/', 14, 8, url_kwargs={'quiz_id': 'quiz.id'},
+             data=lambda f: answers_for(f, f.quiz, 15)),
+    Endpoint('get', '/api/v1/quizzes/attempts/', 8, 12),
+    Endpoint('get', '/api/v1/quizzes/attempts/<int:pk>/', 9, 12, url_kwargs={'pk': 'quiz_attempt.id'}),
+    Endpoint('delete', '/api/v1/quizzes/attempts/<int:pk>/', 7, 1, url_kwargs={'pk': 'quiz_attempt.id'}),
+    Endpoint('get', '/api/v1/quizzes/<int:quiz_id>/attempts/', 11, 96, url_kwargs={'quiz_id': 'quiz.id'}),
+    Endpoint('get', '/api/v1/quiz-groups/<int:quiz_group_id>/attempts/', 11, 8,
+             url_kwargs={'quiz_group_id': 'quiz_group.id'}),
+    Endpoint('get', '/api/v1/quizzes/incorrect-questions/', 10, 24),
+    Endpoint('get', '/api/v1/quizzes/incorrect-questions/subjects/', 4, 1),
+    Endpoint('get', '/api/v1/quizzes/incorrect-questions/subjects/<int:subject_id>/topics/', 4, 1,
+             url_kwargs={'subject_id': 'subjects.0.id'}),
+    Endpoint('delete', '/api/v1/quizzes/incorrect-questions/<int:pk>/', 5, 1, url_kwargs={'pk': 'incorrect_question.id'}),
+    Endpoint('post', '/api/v1/quizzes/favorites/questions/toggle/', 10, 1, data=lambda f: {
+        'question_id': f.question_orders[f.quiz][-1].id, 'quiz_attempt_id': f.quiz_attempt.id
+    }),
+    Endpoint('get', '/api/v1/quizzes/favorites/questions/', 4, 12),
+    Endpoint('get', '/api/v1/quizzes/favorites/subjects/', 4, 1),
+    Endpoint('get', '/api/v1/quizzes/favorites/subjects/<int:subject_id>/topics/', 4, 1,
+             url_kwargs={'subject_id': 'subjects.0.id'}),
+    Endpoint('get', '/api/v1/quizgroups-displaysets/', 12, 4),
+
+    # Display sets
+    Endpoint('get', '/api/v1/quizzes/display-sets/', 8, 8),
+    Endpoint('post', '/api/v1/quizzes/display-sets/', 22, 32, data=lambda f: {
+        'year_ids': [year.id for year in f.exam_years], 'type_ids': [exam_type.id for exam_type in f.exam_types],
+        'subject_id': f.subjects[0].id, 'topic_id': f.topics[0].id, 'name': 'Yeni PDF'
+    }),
+    Endpoint('get', '/api/v1/quizzes/display-sets/<pk>/', 9, 4, url_kwargs={'pk': 'display_set.id'}),
+    Endpoint('get', '/api/v2/quizzes/display-sets/', 8, 8),
+    Endpoint('post', '/api/v2/quizzes/display-sets/', 22, 64, data=lambda f: {
+        'year_ids': [year.id for year in f.exam_years], 'type_ids': [exam_type.id for exam_type in f.exam_types],
+        'subject_id': f.subjects[0].id, 'topic_ids': [topic.id for topic in f.topics[:2]], 'name': 'Yeni PDF'
+    }),
+    Endpoint('get', '/api/v2/quizzes/display-sets/<pk>/', 10, 4, url_kwargs={'pk': 'display_set.id'}),
+    Endpoint('post', '/api/v1/quizzes/display-sets/<int:display_set_id>/submit/', 14, 16,
+             url_kwargs={'display_set_id': 'display_set.id'}, data=lambda f: answers_for(f, f.display_set, 25)),
+
+    # Exam sets
+    Endpoint('get', '/api/v2/exam-sets/', 9, 2),
+    Endpoint('get', '/api/v2/exam-sets/<pk>/', 8, 2, url_kwargs={'pk': 'exam_set.id'}),
+    Endpoint('get', '/api/v2/exam-sets/exam-set-quizzes/', 6, 1),
+    Endpoint('get', '/api/v2/exam-sets/exam-set-quiz/<quiz_id>/', 8, 12, url_kwargs={'quiz_id': 'exam_set_quiz.id'}),
+    Endpoint('get', '/api/v2/exam-sets/exam-set-display-sets/', 9, 8),
+    Endpoint('get', '/api/v2/exam-sets/exam-set-display-set/<display_set_id>/', 10, 4,
+             url_kwargs={'display_set_id': 'exam_set_display_set.id'}),
+    Endpoint('post', '/api/v2/exam-sets/<pk>/create_quiz/', 48, 1, url_kwargs={'pk': 'exam_set.id'},
+             data={'name': 'Yeni Deneme'}),
+    Endpoint('post', '/api/v2/exam-sets/<pk>/create_display_set/', 57, 2, url_kwargs={'pk': 'exam_set.id'},
+             data={'name': 'Yeni Deneme PDF'}),
+    Endpoint('get', '/api/v2/user-exam-configurations/', 9, 2),
+    Endpoint('post', '/api/v2/user-exam-configurations/', 22, 1, data=lambda f: {
+        'name': 'Yeni Ayar', 'exam_years': [year.id for year in f.exam_years[:2]],
+        'exam_types': [f.exam_types[0].id], 'subjects': [f.subjects[1].id], 'topics': [f.topics[5].id]
+    }),
+    Endpoint('get', '/api/v2/user-exam-configurations/<pk>/', 8, 1, url_kwargs={'pk': 'exam_configuration.id'}),
+    Endpoint('put', '/api/v2/user-exam-configurations/<pk>/', 21, 1, url_kwargs={'pk': 'exam_configuration.id'},
+             data=lambda f: {'name': 'Ayar', 'exam_years': [f.exam_years[0].id], 'subjects': [f.subjects[0].id]}),
+    Endpoint('patch', '/api/v2/user-exam-configurations/<pk>/', 12, 1, url_kwargs={'pk': 'exam_configuration.id'},
+             data={'name': 'Ayar'}),
+    Endpoint('delete', '/api/v2/user-exam-configurations/<pk>/', 14, 1, url_kwargs={'pk': 'exam_configuration.id'}),
+    Endpoint('post', '/api/v2/user-exam-configurations/<pk>/create_quiz/', 28, 1,
+             url_kwargs={'pk': 'exam_configuration.id'}, data={'name': 'Ayar Testi'}),
+    Endpoint('post', '/api/v2/user-exam-configurations/<pk>/create_display_set/', 29, 4,
+             url_kwargs={'pk': 'exam_configuration.id'}, data={'name': 'Ayar PDF'}),
+    Endpoint('post', '/api/v2/exam-set-quizzes/<int:quiz_id>/submit/', 15, 16,
+             url_kwargs={'quiz_id': 'exam_set_quiz.id'}, data=lambda f: answers_for(f, f.exam_set_quiz, 30)),
+    Endpoint('get', '/api/v2/exam-set-quizzes/attempts/', 8, 32),
+    Endpoint('get', '/api/v2/exam-set-quizzes/<int:pk>/', 9, 24, url_kwargs={'pk': 'exam_set_quiz_attempt.id'}),
+    Endpoint('delete', '/api/v2/exam-set-quizzes/<int:pk>/', 6, 1, url_kwargs={'pk': 'exam_set_quiz_attempt.id'}),
+    Endpoint('get', '/api/v2/exam-set-quizzes/<int:quiz_id>/attempts/', 11, 96,
+             url_kwargs={'quiz_id': 'exam_set_quiz.id'}),
+    Endpoint('get', '/api/v2/exam-set-quiz-groups/<int:quiz_group_id>/attempts/', 11, 8,
+             url_kwargs={'quiz_group_id': 'exam_set_quiz.quiz_group_id'}),
+    Endpoint('post', '/api/v2/exam-set-display-sets/<int:display_set_id>/submit/', 15, 16,
+             url_kwargs={'display_set_id': 'exam_set_display_set.id'},
+             data=lambda f: answers_for(f, f.exam_set_display_set, 30)),
+    Endpoint('get', '/api/v2/exam-set-display-sets/attempts/', 8, 16),
+    Endpoint('get', '/api/v2/exam-set-display-sets/attempts/<int:pk>/', 9, 16,
+             url_kwargs={'pk': 'exam_set_display_set_attempt.id'}),
+    Endpoint('delete', '/api/v2/exam-set-display-sets/attempts/<int:pk>/', 6, 1,
+             url_kwargs={'pk': 'exam_set_display_set_attempt.id'}),
+    Endpoint('get', '/api/v2/exam-set-display-sets/<int:display_set_id>/attempts/', 11, 32,
+             url_kwargs={'display_set_id': 'exam_set_display_set.id'}),
+
+    # Performance
+    Endpoint('get', '/api/v2/exam-types/performance/', 5, 4),
+    Endpoint('get', '/api/v2/exam-types/subjects/<int:subject_id>/performance/', 5, 1,
+             url_kwargs={'subject_id': 'subjects.0.id'}),
+    Endpoint('get', '/api/v2/exam-types/subjects/<int:subject_id>/topics/', 9, 2,
+             url_kwargs={'subject_id': 'subjects.0.id'}),
+    Endpoint('get', '/api/v1/topic/<int:topic_id>/history/', 4, 1, url_kwargs={'topic_id': 'topics.0.id'}),
+
+    # Reports
+    Endpoint('get', '/api/v1/report/types/', 4, 1),
+    Endpoint('post', '/api/v1/questions/<int:question_id>/report/', 8, 1, url_kwargs={'question_id': 'questions.0.id'},
+             data=lambda f: {'report_type': f.report_types[0].id, 'report_detail': 'Görsel okunmuyor.'}),
+
+    # University rankings
+    Endpoint('get', '/api/v1/yks-ranking-calculation/', 7, 1),
+    Endpoint('get', '/api/v1/university/locations/', 5, 1),
+    Endpoint('get', '/api/v1/university/locations/<int:location_id>/universities/', 5, 1,
+             url_kwargs={'location_id': 'locations.0.id'}),
+    Endpoint('get', '/api/v1/university/locations/<int:location_id>/universities/<int:university_id>/majors/', 5, 1,
+             url_kwargs={'location_id': 'locations.0.id', 'university_id': 'universities.0.id'}),
+    Endpoint('get', '/api/v1/university/locations/<int:location_id>/universities/<int:university_id>/majors/'
+             '<int:major_id>/programs/', 5, 1,
+             url_kwargs={'location_id': 'locations.0.id', 'university_id': 'universities.0.id', 'major_id': 'majors.0.id'}),
+    Endpoint('get', '/api/v1/university/programs/search/', 5, 8, params={'q': 'üniversitesi'}),
+
+    # Payments
+    Endpoint('get', '/api/v1/paytr/payments/', 5, 8),
+    Endpoint('get', '/api/v1/paytr/payment_plans/', 4, 1),
+    Endpoint('get', '/api/v1/paytr/static/success/', 2, 4, user=None),
+    Endpoint('get', '/api/v1/paytr/static/failed/', 2, 4, user=None),
+
+    # Pages and API roots
+    Endpoint('get', '/api/v1/', 3, 1),
+    Endpoint('get', '/api/v2/', 3, 1),
+    Endpoint('get', '/', 2, 8, user=None),
+    Endpoint('get', '/app-ads.txt', 2, 1, user=None),
+    Endpoint('get', '/api/v1/soru/<str:question_code>/', 2, 12, user=None, url_kwargs={'question_code': 'question_code'}),
+    Endpoint('get', '/soru/<str:question_code>/', 2, 12, user=None, url_kwargs={'question_code': 'question_code'}),
+    Endpoint('get', '/api/v1/check-task-status/<str:task_type>/', 2, 1, user=None, url_kwargs={'task_type': 'task_type'}),
+    Endpoint('get', '/check-task-status/<str:task_type>/', 2, 1, user=None, url_kwargs={'task_type': 'task_type'}),
+    Endpoint('get', '/api/v1/request-metrics/', 2, 1, user=None, status=401),
+    Endpoint('get', '/api/v1/request-metrics/', 2, 1, status=403),
+    # Grows with the number of routes called before it, the registry is reset in setUpClass
+    Endpoint('get', '/api/v1/request-metrics/', 2, 56, user='admin_user'),
+    Endpoint('get', '/request-metrics/', 2, 560, user='admin_user', params={'output': 'prometheus'}),
+    Endpoint('get', '/api/v1/upload-history/<str:task_type>/', 15, 12, user=None, url_kwargs={'task_type': 'task_type'}),
+    Endpoint('get', '/upload-history/<str:task_type>/', 15, 12, user=None, url_kwargs={'task_type': 'task_type'}),
+    Endpoint('get', '/api/v1/upload-history/details/<int:upload_id>/', 4, 1, user=None,
+             url_kwargs={'upload_id': 'upload_status.id'}),
+    Endpoint('get', '/upload-history/details/<int:upload_id>/', 4, 1, user=None,
+             url_kwargs={'upload_id': 'upload_status.id'}),
+]
+
+# (method, URL name) pairs that call a third-party service on every request
+EXCLUDED = {
+    ('post', 'ai-simple-chat'): "Sends the message to the OpenAI API.",
+    ('post', 'ai-summarize-image'): "Sends the image to the OpenAI API.",
+    ('post', 'ai-solve-image'): "Sends the image to the OpenAI API.",
+    ('post', 'yks-ranking-calculation'): "Forwards the scores to ogmmateryal.eba.gov.tr.",
+    ('post', 'paytr_payment'): "Requests a payment token from PayTR.",
+    ('post', 'paytr_notification'): "PayTR callback, only accepted from PayTR's IP addresses with a signed hash.",
+}
+
+def normalize_route(pattern):
+    """Route of a path() or router regex pattern, e.g. '^exam-sets/(?P<pk>[^/.]+)/$' becomes 'exam-sets/<pk>/'."""
+    return ROUTE_PARAMETER_REGEX.sub(r'<\1>', str(pattern)).lstrip('^').rstrip('$')
+
+def get_methods(callback):
+    """HTTP methods a view answers, without HEAD and OPTIONS."""
+    actions = getattr(callback, 'actions', None)
+    if actions:
+        return sorted(method for method in actions if method not in ('head', 'options'))
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    if view_class is None:
+        return ['get']  # Plain function views
+    return [method for method in view_class.http_method_names if method not in ('head', 'options') and hasattr(view_class, method)]
+
+def iter_api_routes(patterns, prefix='/', in_api=False):
+    """Yields (route, URL name, methods) for every view included from the api.urls modules."""
+    for pattern in patterns:
+        if 'format' in pattern.pattern.regex.groupindex:
+            continue  # Format suffix duplicates of the same view
+        route = prefix + normalize_route(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            module_name = getattr(pattern.urlconf_name, '__name__', str(pattern.urlconf_name))
+            yield from iter_api_routes(pattern.url_patterns, route, in_api or module_name.startswith('api.urls'))
+        elif isinstance(pattern, URLPattern) and in_api:
+            yield route, pattern.name, get_methods(pattern.callback)
+
+class RouteCoverageTests(SimpleTestCase):
+    def test_every_api_route_has_a_budget(self):
+        budgeted = {endpoint.key for endpoint in ENDPOINTS}
+        routes = set()
+        missing = []
+        for route, name, methods in iter_api_routes(get_resolver().url_patterns):
+            for method in methods:
+                routes.add((method, route))
+                if (method, route) not in budgeted and (method, name) not in EXCLUDED:
+                    missing.append(f"{method.upper()} {route} ({name})")
+
+        self.assertEqual(missing, [], "Routes without a query budget, add them to ENDPOINTS or EXCLUDED.")
+        stale = sorted(f"{method.upper()} {route}" for method, route in budgeted - routes)
+        self.assertEqual(stale, [], "Budgets for routes that no longer exist.")
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    SECURE_SSL_REDIRECT=False,
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # E-mails are rendered and sent in process to the test outbox instead of through the broker,
+        # and addresses are validated without resolving their domain
+        cls.task_always_eager = celery_app.conf.task_always_eager
+        cls.check_deliverability = email_validator.CHECK_DELIVERABILITY
+        celery_app.conf.task_always_eager = True
+        email_validator.CHECK_DELIVERABILITY = False
+        request_metrics.reset()
+
+    @classmethod
+    def tearDownClass(cls):
+        celery_app.conf.task_always_eager = cls.task_always_eager
+        email_validator.CHECK_DELIVERABILITY = cls.check_deliverability
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(16)
+        cls.question_orders = {}  # Questions of every seeded quiz and display set in their stored order
+        cls.seed_question_bank(rng)
+        cls.seed_users()
+        cls.seed_quizzes(rng)
+        cls.seed_display_sets(rng)
+        cls.seed_exam_sets(rng)
+        cls.seed_catalogues()
+        refresh_user_performance(cls.user.id)
+
+    @classmethod
+    def seed_question_bank(cls, rng):
+        cls.exam_years = [ExamYear.objects.create(year=year) for year in range(2018, 2025)]
+        cls.exam_types = [ExamType.objects.create(name=name) for name in ('TYT', 'AYT')]
+        for exam_type in cls.exam_types:
+            exam_type.exam_years.set(cls.exam_years)
+        cls.subjects = [
+            Subject.objects.create(name=name) for name in ('Matematik', 'Fizik', 'Kimya', 'Biyoloji', 'Türkçe', 'Tarih')
+        ]
+        for subject in cls.subjects:
+            subject.exam_types.set(cls.exam_types)
+        cls.topics = Topic.objects.bulk_create([
+            Topic(name=f'{subject.name} {index}. Ünite', subject=subject, achievement_code=subject.id * 100 + index)
+            for subject in cls.subjects for index in range(1, 6)
+        ])
+
+        questions = []
+        for exam_year in cls.exam_years:
+            for exam_type in cls.exam_types:
+                question_number = 0
+                for topic in cls.topics:
+                    for _ in range(QUESTIONS_PER_TOPIC):
+                        question_number += 1
+                        questions.append(Question(
+                            exam_year=exam_year, exam_type=exam_type, subject_id=topic.subject_id, topic=topic,
+                            question_number=question_number, correct_answer=rng.choice('ABCDE'),
+                            difficulty_level=rng.randint(1, 10),
+                            image_url=f'https://cdn.example.com/{exam_year.year}/{exam_type.name}/{question_number}.png'
+                        ))
+        cls.questions = Question.objects.bulk_create(questions, batch_size=500)
+        cls.questions_by_topic = defaultdict(list)
+        for question in cls.questions:
+            cls.questions_by_topic[question.topic_id].append(question)
+        cls.question_code = QuestionCodec.encode(cls.questions[0].id)
+
+    @classmethod
+    def seed_users(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='ogrenci@example.com', password=PASSWORD, name='Öğrenci', phone_number='5551112233',
+            is_verified=True, grade=12, subscription_end_date=timezone.now() + timedelta(days=30)
+        )
+        cls.pending_user = CustomUser.objects.create_user(email='bekleyen@example.com', password=PASSWORD, name='Bekleyen')
+        VerificationCode.objects.create(user=cls.pending_user, code=VERIFICATION_CODE)
+        cls.anonymous_user = CustomUser.objects.create_user(
+            email='misafir_cihaz@misafir.com', password=PASSWORD, name='Misafir', device_id='cihaz',
+            is_anonymous_user=True, is_verified=True
+        )
+        cls.admin_user = CustomUser.objects.create_user(
+            email='yonetici@example.com', password=PASSWORD, name='Yönetici', is_verified=True, is_staff=True
+        )
+
+    @classmethod
+    def record_attempts(cls, model, incorrect_model, parent_field, source_type, attempts):
+        """
+        Saves graded (parent, result) pairs as attempts of cls.user with their incorrect questions,
+        the latest status of every answered question and the question positions of each parent.
+        """
+        saved = model.objects.bulk_create([
+            model(
+                user=cls.user, correct_count=result.correct_count, incorrect_count=result.incorrect_count,
+                unanswered_count=result.unanswered_count, success_rate=result.success_rate, details=result.details,
+                motivational_message='İyi çalışmalar!', **{parent_field: parent}
+            )
+            for parent, result in attempts
+        ])
+        attempt_field = 'quiz_attempt' if parent_field == 'quiz' else 'display_set_attempt'
+        incorrect_questions, statuses = [], []
+        question_key = 'question_id' if parent_field == 'quiz' else 'id'
+        for attempt, (_, result) in zip(saved, attempts):
+            incorrect_questions += result.build_incorrect_questions(incorrect_model, cls.user, **{attempt_field: attempt})
+            statuses += build_latest_statuses(
+                cls.user.id, attempt.details['answers'], attempt.created_at, source_type, attempt.id, question_key
+            )
+        incorrect_model.objects.bulk_create(incorrect_questions, batch_size=500)
+        # One row per question, the last attempt wins like it does on submit
+        save_latest_statuses(list({status.question_id: status for status in statuses}.values()), batch_size=500)
+        return saved
+
+    @classmethod
+    def grade(cls, rng, parent, questions, attempt_count):
+        """Grades attempt_count random submissions of the questions, in the order they are stored for parent."""
+        cls.question_orders[parent] = questions
+        grader = AttemptGrader(questions)
+        graded = []
+        for _ in range(attempt_count):
+            answers = []
+            for order, question in enumerate(questions, start=1):
+                roll = rng.random()
+                if roll < 0.2:
+                    continue  # Left blank
+                user_answer = question.correct_answer if roll < 0.65 else rng.choice('ABCDE')
+                answers.append({'question_id': question.id, 'question_order': order, 'user_answer': user_answer,
+                                'user_time': rng.randint(20, 180)})
+            if parent_uses_question_ids(parent):
+                graded.append((parent, grader.grade_by_question_id(answers)))
+            else:
+                graded.append((parent, grader.grade_by_question_order(answers)))
+        return graded
+
+    @classmethod
+    def seed_quizzes(cls, rng):
+        exam_year_ids = [year.id for year in cls.exam_years[:3]]
+        exam_type_ids = [exam_type.id for exam_type in cls.exam_types]
+
+        graded = []
+        for index in range(QUIZ_GROUPS):
+            topic = cls.topics[index % len(cls.topics)]
+            questions = rng.sample(cls.questions_by_topic[topic.id], 20)
+            quiz_group = create_quiz_group(
+                cls.user, f'{topic.name} Testi {index + 1}', topic.subject_id, exam_year_ids, exam_type_ids,
+                [topic.id], [question.id for question in questions]
+            )
+            graded += cls.grade(rng, quiz_group.quizzes.get(), questions, ATTEMPTS_PER_QUIZ)
+        attempts = cls.record_attempts(QuizAttempt, IncorrectQuestion, 'quiz', 'quiz', graded)
+
+        cls.quiz_attempt = attempts[-1]
+        cls.quiz = cls.quiz_attempt.quiz
+        cls.quiz_group = cls.quiz.quiz_group
+        cls.incorrect_question = IncorrectQuestion.objects.filter(quiz_attempt=cls.quiz_attempt).first()
+        FavoriteQuestion.objects.bulk_create([
+            FavoriteQuestion(user=cls.user, question=question, question_order=order, quiz=attempt.quiz, quiz_attempt=attempt)
+            for attempt in attempts[::ATTEMPTS_PER_QUIZ]
+            for order, question in enumerate(cls.question_orders[attempt.quiz][:2], start=1)
+        ])
+
+    @classmethod
+    def seed_display_sets(cls, rng):
+        graded = []
+        for index, subject in enumerate(cls.subjects * 2):
+            topics = [topic for topic in cls.topics if topic.subject_id == subject.id][:2]
+            questions = rng.sample(cls.questions_by_topic[topics[0].id] + cls.questions_by_topic[topics[1].id], 40)
+            display_set = QuestionDisplaySet.objects.create(
+                name=f'{subject.name} PDF {index + 1}', created_by=cls.user, subject=subject
+            )
+            display_set.exam_years.set(cls.exam_years)
+            display_set.exam_types.set(cls.exam_types)
+            display_set.topic.set(topics)
+            set_ordered_questions(display_set, questions)
+            graded += cls.grade(rng, display_set, questions, 3)
+        attempts = cls.record_attempts(
+            DisplaySetAttempt, DisplaySetIncorrectQuestion, 'display_set', 'display_set', graded
+        )
+        cls.display_set = attempts[-1].display_set
+
+    @classmethod
+    def seed_exam_sets(cls, rng):
+        cls.exam_set = ExamSet.objects.create(name='TYT Genel Deneme', description='Üç dersten karma deneme.')
+        cls.exam_set.exam_years.set(cls.exam_years)
+        cls.exam_set.exam_types.set(cls.exam_types[:1])
+        exam_set_subjects = cls.subjects[:3]
+        for order, subject in enumerate(exam_set_subjects):
+            ExamSetSubject.objects.create(exam_set=cls.exam_set, subject=subject, order=order)
+        exam_set_topics = [topic for topic in cls.topics if topic.subject_id in {subject.id for subject in exam_set_subjects}]
+        cls.exam_set.topics.set(exam_set_topics)
+        subject_order = [subject.id for subject in exam_set_subjects]
+
+        quiz_attempts, display_set_attempts = [], []
+        for index in range(5):
+            questions = sort_by_subject_order(
+                rng.sample([question for topic in exam_set_topics for question in cls.questions_by_topic[topic.id]], 40),
+                subject_order
+            )
+            quiz_group = ExamSetQuizGroup.objects.create(
+                name=f'Deneme {index + 1}', created_by=cls.user, exam_set=cls.exam_set
+            )
+            quiz_group.exam_years.set(cls.exam_years)
+            quiz_group.exam_types.set(cls.exam_types[:1])
+            quiz_group.subjects.set(exam_set_subjects)
+            quiz_group.topic.set(exam_set_topics)
+            quiz = ExamSetQuiz.objects.create(quiz_group=quiz_group)
+            set_ordered_questions(quiz, questions)
+            quiz_attempts += cls.grade(rng, quiz, questions, 4)
+
+            display_set = ExamSetDisplaySet.objects.create(
+                name=f'Deneme PDF {index + 1}', created_by=cls.user, exam_set=cls.exam_set
+            )
+            display_set.exam_years.set(cls.exam_years)
+            display_set.exam_types.set(cls.exam_types[:1])
+            display_set.subjects.set(exam_set_subjects)
+            display_set.topic.set(exam_set_topics)
+            set_ordered_questions(display_set, questions)
+            display_set_attempts += cls.grade(rng, display_set, questions, 2)
+
+        cls.exam_set_quiz_attempt = cls.record_attempts(
+            ExamSetQuizAttempt, ExamSetIncorrectQuestion, 'quiz', 'exam_set_quiz', quiz_attempts
+        )[-1]
+        cls.exam_set_quiz = cls.exam_set_quiz_attempt.quiz
+        cls.exam_set_display_set_attempt = cls.record_attempts(
+            ExamSetDisplaySetAttempt, ExamSetDisplaySetIncorrectQuestion, 'display_set', 'exam_set_display_set',
+            display_set_attempts
+        )[-1]
+        cls.exam_set_display_set = cls.exam_set_display_set_attempt.display_set
+
+        for index, subject in enumerate(cls.subjects[:3]):
+            configuration = UserExamConfiguration.objects.create(name=f'{subject.name} Ayarı', created_by=cls.user)
+            configuration.exam_years.set(cls.exam_years[:2])
+            configuration.exam_types.set(cls.exam_types[:1])
+            configuration.subjects.set([subject])
+            configuration.topics.set([topic for topic in cls.topics if topic.subject_id == subject.id][:1])
+        cls.exam_configuration = configuration
+
+    @classmethod
+    def seed_catalogues(cls):
+        now = timezone.now()
+        cls.exams = [
+            Exam.objects.create(
+                title=title, exam_date=now + timedelta(days=30 * index), is_major_exam=index < 2,
+                display_in_homepage=index < 3
+            )
+            for index, title in enumerate(('YKS', 'LGS', 'KPSS', 'ALES', 'DGS', 'YDS'))
+        ]
+        cls.user.exams.set(cls.exams[:2])
+
+        plans = [
+            PaymentPlan.objects.create(title=f'{days} Gün', description='Tüm sorulara erişim.', days=days,
+                                       final_price=Decimal(price), discount=Decimal('50.00'))
+            for days, price in ((30, '149.90'), (90, '349.90'), (365, '999.90'))
+        ]
+        for index in range(8):
+            Payment.objects.create(
+                user=cls.user, user_address='Ankara', payment_plan=plans[index % 3], merchant_oid=f'SSM{index:08d}',
+                status='successful', user_ip='127.0.0.1', user_basket='[]',
+                total_payment_amount=plans[index % 3].final_price, installment_info='1'
+            )
+
+        cls.report_types = [ReportType.objects.create(name=name) for name in ('Yanlış cevap', 'Görsel hatalı', 'Diğer')]
+        TopicHistory.objects.create(topic=cls.topics[0], history_data={
+            str(year.year): {'TYT': index, 'AYT': index + 1} for index, year in enumerate(cls.exam_years)
+        })
+
+        structure = ExamStructure.objects.create(name='YKS', active=True)
+        for order, section_name in enumerate(('TYT', 'AYT')):
+            section = ExamSection.objects.create(name=section_name, order=order)
+            for subject in cls.subjects:
+                ExamSubject.objects.create(section=section, name=subject.name, question_count=40)
+            structure.sections.add(section)
+
+        cls.task_type = 'questions'
+        for index in range(12):
+            cls.upload_status = BulkUploadStatus.objects.create(
+                task_id=f'task-{index}', task_type=cls.task_type, user=cls.user, status='SUCCESS', progress=100,
+                message=f'{index * 10} tane soru başarıyla oluşturuldu.'
+            )
+
+        ranking_years = [RankingExamYear.objects.create(year=year) for year in (2023, 2024)]
+        cls.locations = [Location.objects.create(name=name) for name in ('Ankara', 'İstanbul', 'İzmir')]
+        cls.universities = [
+            University.objects.create(name=f'{location.name.upper()} ÜNİVERSİTESİ') for location in cls.locations
+        ]
+        cls.majors = [Major.objects.create(name=name) for name in ('Tıp', 'Hukuk', 'Bilgisayar Mühendisliği', 'Mimarlık')]
+        for exam_year in ranking_years:
+            for university_index, (university, location) in enumerate(zip(cls.universities, cls.locations)):
+                for major_index, major in enumerate(cls.majors):
+                    Program.objects.create(
+                        major=major, university=university, exam_year=exam_year, location=location,
+                        ranking=1000 * (major_index + 1) + university_index, min_score=500 - 10 * major_index,
+                        max_score=520 - 10 * major_index, program_code=10000 + university_index * 10 + major_index,
+                        program_type='SAY', education_length=4
+                    )
+
+    def get_token(self, user_attribute, kind):
+        refresh = RefreshToken.for_user(getattr(self, user_attribute))
+        return str(refresh.access_token) if kind == 'access' else str(refresh)
+
+    def call(self, endpoint):
+        """Calls the endpoint in a rolled back transaction with a cold cache, returning (response, queries, ms)."""
+        client = APIClient()
+        if endpoint.user:
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.get_token(endpoint.user, endpoint.token)}')
+        url = endpoint.build_url(self)
+        payload = endpoint.build_payload(self)
+        cache.clear()
+
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = getattr(client, endpoint.method)(url, payload, format=None if endpoint.method == 'get' else 'json')
+                elapsed = (time.perf_counter() - start) * 1000
+            transaction.set_rollback(True)  # Every endpoint sees the same fixture
+        return response, len(queries), elapsed
+
+    def test_query_and_payload_budgets(self):
+        rows, violations = [], []
+        for endpoint in ENDPOINTS:
+            response, query_count, elapsed = self.call(endpoint)
+            size = len(response.content)
+            label = f"{endpoint.method.upper()} {endpoint.route}"
+            rows.append((label, response.status_code, query_count, endpoint.max_queries, elapsed, size, endpoint.max_bytes))
+
+            if response.status_code != endpoint.status:
+                violations.append(f"{label}: status {response.status_code}, expected {endpoint.status}: {response.content[:300]!r}")
+            if query_count > endpoint.max_queries:
+                violations.append(f"{label}: {query_count} queries, budget {endpoint.max_queries}")
+            if size > endpoint.max_bytes:
+                violations.append(f"{label}: {size} bytes, budget {endpoint.max_bytes}")
+
+        if os.environ.get('BUDGET_TABLE'):
+            print_budget_table(rows)
+        self.assertEqual(violations, [], "\n".join(violations))
+
+    def test_history_lists_keep_the_page_number_envelope(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.get_token("user", "access")}')
+        attempt_count = QuizAttempt.objects.filter(user=self.user).count()
+
+        # Installed app versions fetch the first page without parameters and the next ones with ?page=N
+        first_page = client.get('/api/v1/quizzes/attempts/').json()
+        self.assertEqual(first_page['total'], attempt_count)
+        self.assertEqual((first_page['page_size'], first_page['current_page'], first_page['previous']), (10, 1, None))
+        self.assertEqual(first_page['total_pages'], -(-attempt_count // 10))
+        second_page = client.get('/api/v1/quizzes/attempts/', {'page': 2}).json()
+        self.assertEqual(second_page['current_page'], 2)
+        self.assertFalse({row['id'] for row in first_page['data']} & {row['id'] for row in second_page['data']})
+
+        cursor_page = client.get('/api/v1/quizzes/attempts/', {'pagination': 'cursor'}).json()
+        self.assertEqual(cursor_page['page_size'], 20)
+        self.assertNotIn('current_page', cursor_page)
+        self.assertEqual([row['id'] for row in cursor_page['data'][:10]], [row['id'] for row in first_page['data']])
+        third_page = client.get('/api/v1/quizzes/attempts/', {'page': 3}).json()
+        self.assertEqual(client.get(cursor_page['next']).json()['data'][0]['id'], third_page['data'][0]['id'])
+
+    def test_crafted_cursors_are_not_found(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.get_token("user", "access")}')
+        for key in (['2024-01-01T00:00:00+00:00', 'id'], [['2024-01-01'], 1], [{'gt': 1}, 1], ['dün', 1], [True, 1], 'x'):
+            cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+            response = client.get('/api/v1/quizzes/attempts/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, key)
+        response = client.get('/api/v1/university/programs/search/', {'cursor': base64.urlsafe_b64encode(b'["bir", 1]').decode()})
+        self.assertEqual(response.status_code, 404)
+
+def parent_uses_question_ids(parent):
+    """Quizzes are submitted with question ids, display sets with question orders."""
+    return parent._meta.model_name in ('quiz', 'examsetquiz')
+
+def print_budget_table(rows):
+    width = max(len(row[0]) for row in rows)
+    print(f"\n{'Endpoint'.ljust(width)}  Status  Queries  Budget      ms     Bytes    Budget")
+    for label, status_code, query_count, max_queries, elapsed, size, max_bytes in rows:
+        print(f"{label.ljust(width)}  {status_code:>6}  {query_count:>7}  {max_queries:>6}  {elapsed:>6.1f}  {size:>8}  {max_bytes:>8}")
+    print(f"{'Total'.ljust(width)}  {'':>6}  {sum(row[2] for row in rows):>7}  {'':>6}  "
+          f"{sum(row[4] for row in rows):>6.1f}  {sum(row[5] for row in rows):>8}")
@@ -1,10 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from others.views.other_views import check_task_status, upload_history, upload_history_details, base_view, question_redirect_view
+from others.views.metrics_views import RequestMetricsView
 
 urlpatterns = [
-    path('check-task-status/<str:task_type>/', check_task_status, name='check_task_status'),
-    path('upload-history/<str:task_type>/', upload_history, name='upload_history'),
-    path('upload-history/details/<int:upload_id>/', upload_history_details, name='upload_history_details'),
+    path('request-metrics/', RequestMetricsView.as_view(), name='request_metrics'),
     path('soru/<str:question_code>/', question_redirect_view, name='question_redirect'),
     path('', base_view, name='base_view'),
 ]
+
+# Progress and history of the admin bulk uploads, only served by workers with the admin (SETTINGS_PROFILE=full)
+if not settings.API_ONLY:
+    urlpatterns += [
+        path('check-task-status/<str:task_type>/', check_task_status, name='check_task_status'),
+        path('upload-history/<str:task_type>/', upload_history, name='upload_history'),
+        path('upload-history/details/<int:upload_id>/', upload_history_details, name='upload_history_details'),
+    ]
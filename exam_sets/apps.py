@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class ExamSetsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exam_sets'
-    verbose_name = 'Sınav Setleri'
\ No newline at end of file
+    verbose_name = 'Sınav Setleri'
+
+    def ready(self):
+        from exam_sets import signals
@@ -0,0 +1,117 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from itertools import groupby
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def copy_links(old_through, parent_field, new_through, new_parent_field, parent_exam_set_ids, subject_positions):
+    """
+    Copies the rows of an auto-created M2M table into an ordered through table. Questions are numbered
+    the way the exam set views sorted them: by the exam set's subject order, unordered subjects last,
+    then by question number.
+    """
+    links = []
+    rows = old_through.objects.order_by(f'{parent_field}_id').values_list(
+        f'{parent_field}_id', 'question_id', 'question__subject_id', 'question__question_number'
+    )
+    for parent_id, parent_rows in groupby(rows.iterator(), key=lambda row: row[0]):
+        positions = subject_positions.get(parent_exam_set_ids.get(parent_id), {})
+        parent_rows = sorted(
+            parent_rows, key=lambda row: (positions.get(row[2], len(positions)), row[3], row[1])
+        )
+        for position, (_, question_id, _, _) in enumerate(parent_rows, start=1):
+            links.append(new_through(**{f'{new_parent_field}_id': parent_id, 'question_id': question_id, 'position': position}))
+        if len(links) >= BATCH_SIZE:
+            new_through.objects.bulk_create(links)
+            links = []
+    new_through.objects.bulk_create(links)
+
+
+def copy_question_links(apps, schema_editor):
+    ExamSetSubject = apps.get_model('exam_sets', 'ExamSetSubject')
+    ExamSetQuiz = apps.get_model('exam_sets', 'ExamSetQuiz')
+    ExamSetDisplaySet = apps.get_model('exam_sets', 'ExamSetDisplaySet')
+
+    subject_positions = {}
+    for exam_set_id, subject_id in ExamSetSubject.objects.order_by('order', 'id').values_list('exam_set_id', 'subject_id'):
+        positions = subject_positions.setdefault(exam_set_id, {})
+        positions[subject_id] = len(positions)
+
+    copy_links(
+        ExamSetQuiz._meta.get_field('questions').remote_field.through, 'examsetquiz',
+        apps.get_model('exam_sets', 'ExamSetQuizQuestion'), 'quiz',
+        dict(ExamSetQuiz.objects.values_list('id', 'quiz_group__exam_set_id')), subject_positions
+    )
+    copy_links(
+        ExamSetDisplaySet._meta.get_field('questions').remote_field.through, 'examsetdisplayset',
+        apps.get_model('exam_sets', 'ExamSetDisplaySetQuestion'), 'display_set',
+        dict(ExamSetDisplaySet.objects.values_list('id', 'exam_set_id')), subject_positions
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_sets', '0008_alter_examsetsubject_options_and_more'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamSetDisplaySetQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('display_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='exam_sets.examsetdisplayset')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_set_display_set_links', to='questions.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ExamSetQuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_set_quiz_links', to='questions.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='exam_sets.examsetquiz')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='examsetdisplaysetquestion',
+            index=models.Index(fields=['display_set', 'position'], name='exam_sets_e_display_454926_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='examsetdisplaysetquestion',
+            unique_together={('display_set', 'question')},
+        ),
+        migrations.AddIndex(
+            model_name='examsetquizquestion',
+            index=models.Index(fields=['quiz', 'position'], name='exam_sets_e_quiz_id_477cc3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='examsetquizquestion',
+            unique_together={('quiz', 'question')},
+        ),
+        migrations.RunPython(copy_question_links, migrations.RunPython.noop),
+        # A through model cannot be added to an existing M2M field, so the field is recreated on the new table
+        migrations.RemoveField(
+            model_name='examsetdisplayset',
+            name='questions',
+        ),
+        migrations.AddField(
+            model_name='examsetdisplayset',
+            name='questions',
+            field=models.ManyToManyField(related_name='exam_set_display_sets', through='exam_sets.ExamSetDisplaySetQuestion', to='questions.question'),
+        ),
+        migrations.RemoveField(
+            model_name='examsetquiz',
+            name='questions',
+        ),
+        migrations.AddField(
+            model_name='examsetquiz',
+            name='questions',
+            field=models.ManyToManyField(related_name='exam_set_quizzes', through='exam_sets.ExamSetQuizQuestion', to='questions.question'),
+        ),
+    ]
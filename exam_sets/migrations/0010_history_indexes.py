@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_sets', '0009_ordered_question_links'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsetdisplaysetattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='exam_sets_e_user_id_8e6a87_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetquizattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='exam_sets_e_user_id_2e5f68_idx'),
+        ),
+    ]
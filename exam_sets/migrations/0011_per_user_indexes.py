@@ -0,0 +1,91 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_examsetdisplaysetincorrectquestion_created_at(apps, schema_editor):
+    model = apps.get_model('exam_sets', 'ExamSetDisplaySetIncorrectQuestion')
+    attempt_model = apps.get_model('exam_sets', 'ExamSetDisplaySetAttempt')
+    model.objects.update(
+        created_at=Subquery(attempt_model.objects.filter(id=OuterRef('display_set_attempt_id')).values('created_at')[:1])
+    )
+
+
+def copy_examsetincorrectquestion_created_at(apps, schema_editor):
+    model = apps.get_model('exam_sets', 'ExamSetIncorrectQuestion')
+    attempt_model = apps.get_model('exam_sets', 'ExamSetQuizAttempt')
+    model.objects.update(
+        created_at=Subquery(attempt_model.objects.filter(id=OuterRef('quiz_attempt_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exam_sets', '0010_history_indexes'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='examsetdisplaysetincorrectquestion',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AlterModelOptions(
+            name='examsetincorrectquestion',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddField(
+            model_name='examsetdisplaysetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_examsetdisplaysetincorrectquestion_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='examsetdisplaysetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddField(
+            model_name='examsetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_examsetincorrectquestion_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='examsetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='examsetdisplayset',
+            index=models.Index(fields=['created_by', '-created_at'], name='exam_sets_e_created_985def_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetdisplaysetattempt',
+            index=models.Index(fields=['display_set', 'user', '-created_at'], name='exam_sets_e_display_55d9fc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetdisplaysetincorrectquestion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='exam_sets_e_user_id_9c0973_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetincorrectquestion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='exam_sets_e_user_id_392f32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetquizattempt',
+            index=models.Index(fields=['quiz', 'user', '-created_at'], name='exam_sets_e_quiz_id_db610c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='examsetquizgroup',
+            index=models.Index(fields=['created_by', '-created_at'], name='exam_sets_e_created_69db94_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userexamconfiguration',
+            index=models.Index(fields=['created_by', 'is_active', '-created_at'], name='exam_sets_u_created_3a6657_idx'),
+        ),
+    ]
@@ -62,6 +62,7 @@ class UserExamConfiguration(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_by', 'is_active', '-created_at'])]
 
 class ExamSetQuizGroup(models.Model):
     name = models.CharField(max_length=255)
@@ -78,10 +79,31 @@ class ExamSetQuizGroup(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_by', '-created_at'])]
+
+class ExamSetQuizQuestion(models.Model):
+    """A question of an exam set quiz with its 1-based position, following the exam set's subject order."""
+    quiz = models.ForeignKey('ExamSetQuiz', on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='exam_set_quiz_links')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('quiz', 'question')
+        indexes = [models.Index(fields=['quiz', 'position'])]
+
+class ExamSetDisplaySetQuestion(models.Model):
+    """A question of an exam set display set with its 1-based position, following the exam set's subject order."""
+    display_set = models.ForeignKey('ExamSetDisplaySet', on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='exam_set_display_set_links')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('display_set', 'question')
+        indexes = [models.Index(fields=['display_set', 'position'])]
 
 class ExamSetQuiz(models.Model):
     quiz_group = models.ForeignKey(ExamSetQuizGroup, on_delete=models.CASCADE, related_name='quizzes')
-    questions = models.ManyToManyField(Question, related_name='exam_set_quizzes')
+    questions = models.ManyToManyField(Question, through='ExamSetQuizQuestion', related_name='exam_set_quizzes')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -92,7 +114,7 @@ class ExamSetQuiz(models.Model):
 
 class ExamSetDisplaySet(models.Model):
     name = models.CharField(max_length=255)
-    questions = models.ManyToManyField(Question, related_name='exam_set_display_sets')
+    questions = models.ManyToManyField(Question, through='ExamSetDisplaySetQuestion', related_name='exam_set_display_sets')
     exam_set = models.ForeignKey('exam_sets.ExamSet', on_delete=models.CASCADE, related_name='display_sets')
     exam_years = models.ManyToManyField(ExamYear, related_name='exam_set_display_sets')
     exam_types = models.ManyToManyField(ExamType, related_name='exam_set_display_sets')
@@ -103,6 +125,7 @@ class ExamSetDisplaySet(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_by', '-created_at'])]
 
     def __str__(self):
         return f"{self.name}"
@@ -120,6 +143,10 @@ class ExamSetQuizAttempt(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),  # Newest-first history pages
+            models.Index(fields=['quiz', 'user', '-created_at']),  # Attempts of one quiz
+        ]
 
     def __str__(self):
         return f"Attempt by {self.user} on {self.quiz}"
@@ -132,9 +159,11 @@ class ExamSetIncorrectQuestion(models.Model):
     user_time = models.FloatField(null=True, blank=True)
     quiz_attempt = models.ForeignKey(ExamSetQuizAttempt, on_delete=models.CASCADE, related_name='incorrect_questions')
     question_order = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Copy of the attempt's time, so the list is ordered without a join
 
     class Meta:
-        ordering = ['-quiz_attempt__created_at']
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at', '-id'])]  # Newest-first history pages
 
     def __str__(self):
         return f"Incorrect attempt by {self.user} for {self.question} in exam set attempt {self.quiz_attempt.id}"
@@ -152,6 +181,10 @@ class ExamSetDisplaySetAttempt(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),  # Newest-first history pages
+            models.Index(fields=['display_set', 'user', '-created_at']),  # Attempts of one display set
+        ]
 
     def __str__(self):
         return f"Attempt by {self.user} on {self.display_set}"
@@ -164,9 +197,11 @@ class ExamSetDisplaySetIncorrectQuestion(models.Model):
     user_time = models.FloatField(null=True, blank=True)
     display_set_attempt = models.ForeignKey(ExamSetDisplaySetAttempt, on_delete=models.CASCADE, related_name='incorrect_questions')
     question_order = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Copy of the attempt's time, so the list is ordered without a join
 
     class Meta:
-        ordering = ['-display_set_attempt__created_at']
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at', '-id'])]  # Newest-first history pages
 
     def __str__(self):
         return f"Incorrect attempt by {self.user} for {self.question} in display set attempt {self.display_set_attempt.id}"
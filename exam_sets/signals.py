@@ -0,0 +1,22 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import ExamSetSubject
+from .tasks import renumber_exam_set_questions_task
+
+logger = logging.getLogger('django')
+
+@receiver(post_save, sender=ExamSetSubject)
+@receiver(post_delete, sender=ExamSetSubject)
+def renumber_exam_set_questions_on_subject_order_change(sender, instance, **kwargs):
+    # Quiz and display set questions are stored in the exam set's subject order
+    exam_set_id = instance.exam_set_id
+
+    def enqueue():
+        try:
+            renumber_exam_set_questions_task.delay(exam_set_id)
+        except Exception as e:
+            logger.error(f"Soru sıralaması güncellemesi kuyruğa alınamadı (exam set {exam_set_id}): {str(e)}")
+
+    transaction.on_commit(enqueue)
@@ -0,0 +1,6 @@
+from celery import shared_task
+from utils.ordered_questions import renumber_exam_set_questions
+
+@shared_task
+def renumber_exam_set_questions_task(exam_set_id):
+    renumber_exam_set_questions(exam_set_id)
@@ -11,7 +11,9 @@ from utils.api_responses import ApiResponse
 from pagination.custom_pagination import CustomPagination
 from rest_framework.exceptions import ValidationError, NotFound as DRFNotFound
 from django.http import Http404
-from serializers.question_serializers import QuestionDetailSerializer
+from utils.attempt_grading import sort_by_subject_order
+from utils.ordered_questions import get_exam_set_subject_ids, ordered_questions, set_ordered_questions
+from utils.prefetch_querysets import prefetch_exam_sets, prefetch_exam_set_quiz_groups, prefetch_exam_set_display_sets, prefetch_exam_set_quizzes
 import random
 
 class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
@@ -25,7 +27,10 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
             return None
     
     def get_queryset(self):
-        return ExamSet.objects.filter(is_active=True)
+        queryset = ExamSet.objects.filter(is_active=True)
+        if self.action in ('list', 'retrieve'):
+            return prefetch_exam_sets(queryset)
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -75,10 +80,7 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
             quiz_group.topic.set(exam_set.topics.all())
         
         # Get ordered subjects with their order
-        ordered_subject_ids = []
-        if exam_set:
-            ordered_subjects = exam_set.examsetsubject_set.all().order_by('order')
-            ordered_subject_ids = [item.subject_id for item in ordered_subjects]
+        ordered_subject_ids = get_exam_set_subject_ids(exam_set.id)
         
         # Get all questions that match criteria
         all_questions = []
@@ -124,9 +126,9 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
         if not all_questions:
             return ApiResponse.BadRequest(message="Bu kriterlere uygun soru bulunamadı.")
         
-        # Create a single quiz with all questions
+        # Create a single quiz with all questions, stored in the order the exam set displays them
         quiz = ExamSetQuiz.objects.create(quiz_group=quiz_group)
-        quiz.questions.set(all_questions)
+        set_ordered_questions(quiz, sort_by_subject_order(all_questions, ordered_subject_ids))
         
         serializer = SimpleExamSetQuizGroupSerializer(quiz_group, context={'request': request})
         return ApiResponse.Success(data=serializer.data)
@@ -234,14 +236,14 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
         if not questions:
             return ApiResponse.BadRequest(message="Bu kriterlere uygun soru bulunamadı.")
         
-        display_set.questions.set(questions)
+        set_ordered_questions(display_set, sort_by_subject_order(questions, get_exam_set_subject_ids(exam_set.id)))
         
         serializer = ExamSetDisplaySetSerializer(display_set, context={'request': request})
         return ApiResponse.Success(data=serializer.data)
 
     @action(detail=False, methods=['get'], url_path='exam-set-quizzes')
     def exam_set_quizzes(self, request):
-        queryset = ExamSetQuizGroup.objects.filter(created_by=request.user)
+        queryset = prefetch_exam_set_quiz_groups(ExamSetQuizGroup.objects.filter(created_by=request.user))
         page = self.paginate_queryset(queryset)
         
         serializer = SimpleExamSetQuizGroupSerializer(page if page is not None else queryset, many=True, context={'request': request})
@@ -258,47 +260,17 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], url_path='exam-set-quiz/(?P<quiz_id>[^/.]+)')
     def exam_set_quiz_detail(self, request, quiz_id=None):
         try:
-            quiz = ExamSetQuiz.objects.get(id=quiz_id, quiz_group__created_by=request.user)
+            quiz = prefetch_exam_set_quizzes(ExamSetQuiz.objects.all()).get(id=quiz_id, quiz_group__created_by=request.user)
         except ExamSetQuiz.DoesNotExist:
             return ApiResponse.NotFound(message="Test bulunamadı.")
         
-        # Get the ordered subjects with their order
-        ordered_subject_ids = []
-        if quiz.quiz_group and quiz.quiz_group.exam_set:
-            ordered_subjects = quiz.quiz_group.exam_set.examsetsubject_set.all().order_by('order')
-            ordered_subject_ids = [item.subject_id for item in ordered_subjects]
-        
-        # Get all questions first
-        all_questions = list(quiz.questions.all())
-        
-        # Sort questions manually based on subject order and question_number
-        def sort_key(question):
-            try:
-                subject_order = ordered_subject_ids.index(question.subject_id)
-            except ValueError:
-                subject_order = len(ordered_subject_ids)  # Put unordered subjects at the end
-            return (subject_order, question.question_number)
-        
-        ordered_questions = sorted(all_questions, key=sort_key)
-        
-        # Use a custom serializer context to pass the ordered questions
-        serializer = DetailedExamSetQuizSerializer(quiz, context={
-            'request': request,
-            'ordered_questions': ordered_questions
-        })
-        
-        data = serializer.data
-        # Replace the questions data with ordered question data
-        data['questions'] = [
-            QuestionDetailSerializer(q, context={'request': request}).data 
-            for q in ordered_questions
-        ]
-        
-        return ApiResponse.Success(data=data, message="Test detayları getirildi.")
+        # Questions come in their stored order, which follows the exam set's subject order
+        serializer = DetailedExamSetQuizSerializer(quiz, context={'request': request})
+        return ApiResponse.Success(data=serializer.data, message="Test detayları getirildi.")
 
     @action(detail=False, methods=['get'], url_path='exam-set-display-sets')
     def exam_set_display_sets(self, request):
-        queryset = ExamSetDisplaySet.objects.filter(created_by=request.user)
+        queryset = prefetch_exam_set_display_sets(ExamSetDisplaySet.objects.filter(created_by=request.user))
         page = self.paginate_queryset(queryset)
         
         serializer = ExamSetDisplaySetSerializer(page if page is not None else queryset, many=True, context={'request': request})
@@ -315,50 +287,19 @@ class ExamSetViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=False, methods=['get'], url_path='exam-set-display-set/(?P<display_set_id>[^/.]+)')
     def exam_set_display_set_detail(self, request, display_set_id=None):
         try:
-            display_set = ExamSetDisplaySet.objects.get(id=display_set_id, created_by=request.user)
+            display_set = prefetch_exam_set_display_sets(ExamSetDisplaySet.objects.all()).get(id=display_set_id, created_by=request.user)
         except ExamSetDisplaySet.DoesNotExist:
             return ApiResponse.NotFound(message="PDF bulunamadı.")
         
-        # Get the ordered subjects with their order
-        ordered_subject_ids = []
-        if display_set.exam_set:
-            # Get subjects with their order from ExamSetSubject model
-            ordered_subjects = display_set.exam_set.examsetsubject_set.all().order_by('order')
-            ordered_subject_ids = [item.subject_id for item in ordered_subjects]
-        
-        # Get all questions first
-        all_questions = list(display_set.questions.all())
-        
-        # Sort questions manually based on subject order and question_number
-        def sort_key(question):
-            try:
-                subject_order = ordered_subject_ids.index(question.subject_id)
-            except ValueError:
-                subject_order = len(ordered_subject_ids)  # Put unordered subjects at the end
-            return (subject_order, question.question_number)
-        
-        ordered_questions = sorted(all_questions, key=sort_key)
-        
-        # Paginate the questions
-        page = self.paginate_queryset(ordered_questions)
-        
-        # Calculate the starting index for the current page
-        page_number = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', self.pagination_class.page_size))
-        start_index = (page_number - 1) * page_size
-        
-        # Prepare serialized data with correct question_order
-        serialized_questions = []
-        for idx, question in enumerate(page, start=start_index + 1):
-            question_data = QuestionDetailSerializer(question, context={'request': request}).data
-            question_data['question_order'] = idx
-            serialized_questions.append(question_data)
-        
-        # Serialize the display set without the questions first
-        display_set_data = DetailedExamSetDisplaySetSerializer(display_set, context={'request': request}).data
+        # Paginate the questions in their stored order, only the requested page is loaded
+        page = self.paginate_queryset(ordered_questions(display_set).select_related('exam_year', 'exam_type'))
         
-        # Replace the questions with our paginated and ordered questions
-        display_set_data['questions'] = serialized_questions
+        # Serialize only the current page of questions, numbered from the page's first position
+        display_set_data = DetailedExamSetDisplaySetSerializer(
+            display_set, context={'request': request, 'questions': page}
+        ).data
+        for question_order, question_data in enumerate(display_set_data['questions'], start=self.paginator.page.start_index()):
+            question_data['question_order'] = question_order
         
         # Return paginated response
         return self.get_paginated_response(display_set_data)
@@ -371,7 +312,7 @@ class UserExamConfigurationViewSet(viewsets.ModelViewSet):
         # Prefetch related objects to optimize detailed serialization
         return UserExamConfiguration.objects.filter(
             created_by=self.request.user, is_active=True
-        ).prefetch_related(
+        ).select_related('created_by').prefetch_related(
             'exam_years', 'exam_types', 'subjects', 'topics'
         )
 
@@ -491,7 +432,7 @@ class UserExamConfigurationViewSet(viewsets.ModelViewSet):
             if config.topics.exists(): quiz_group.topic.set(config.topics.all())
 
             quiz = Quiz.objects.create(quiz_group=quiz_group)
-            quiz.questions.set(questions)
+            set_ordered_questions(quiz, questions)
 
             serializer = SimpleQuizGroupSerializer(quiz_group, context={'request': request})
             return ApiResponse.Success(data=serializer.data, message="Test başarıyla oluşturuldu.")
@@ -529,7 +470,7 @@ class UserExamConfigurationViewSet(viewsets.ModelViewSet):
                 display_set.save()
             if config.topics.exists(): display_set.topic.set(config.topics.all())
 
-            display_set.questions.set(questions)
+            set_ordered_questions(display_set, sorted(question.id for question in questions))
 
             serializer = QuestionDisplaySetSerializer(display_set, context={'request': request})
             return ApiResponse.Success(data=serializer.data, message="PDF başarıyla oluşturuldu.")
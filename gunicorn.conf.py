@@ -0,0 +1,69 @@
+"""
+Gunicorn settings, read from the working directory by `gunicorn osym_backend.wsgi:application`.
+
+Every value can be set from the environment (.env in docker-compose):
+
+    GUNICORN_WORKER_CLASS         gthread (default), sync or gevent
+    GUNICORN_WORKERS              worker processes, defaults to 3
+    GUNICORN_THREADS              threads per gthread worker, defaults to 4
+    GUNICORN_MAX_REQUESTS         requests before a worker is replaced, defaults to 1000 (0 disables)
+    GUNICORN_MAX_REQUESTS_JITTER  random extra requests, so the workers do not restart at the same time
+    GUNICORN_KEEPALIVE            seconds to keep an idle connection from nginx open
+    GUNICORN_TIMEOUT              seconds before a silent worker is killed
+    GUNICORN_PRELOAD              import the application once in the master and fork the workers from it,
+                                  defaults to True except for gevent
+
+With gthread a slow upstream (OpenAI, ÖSYM, PayTR) only holds one thread instead of a whole worker. Every thread
+keeps its own database connection for DB_CONN_MAX_AGE seconds, so a container holds up to workers x threads
+connections, 12 with the defaults. The default does not grow with the CPU cores of the host, raise it together
+with max_connections of the database. docker-compose runs the application behind pgbouncer, which keeps
+DEFAULT_POOL_SIZE server connections however many the containers open.
+
+gevent needs the gevent package, and psycogreen to make the psycopg2 queries cooperative, which are not in
+requirements.txt. Every greenlet has its own database connection, only run gevent behind pgbouncer. The application
+is not preloaded for gevent, modules imported in the master before the workers patch them would keep blocking.
+Compare the worker models with `python manage.py benchmark_gunicorn`.
+"""
+import os
+
+def get_int(name, default):
+    return int(os.environ.get(name, default))
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = get_int('GUNICORN_WORKERS', 3)
+threads = get_int('GUNICORN_THREADS', 4 if worker_class == 'gthread' else 1)
+worker_connections = get_int('GUNICORN_WORKER_CONNECTIONS', 1000)  # Concurrent requests per gevent worker
+
+max_requests = get_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = get_int('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10)
+
+keepalive = get_int('GUNICORN_KEEPALIVE', 5)
+timeout = get_int('GUNICORN_TIMEOUT', 180)
+graceful_timeout = get_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+# The workers share the memory of the imported Django application until they write to it
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'False' if worker_class == 'gevent' else 'True') == 'True'
+
+# Heartbeat files on tmpfs, a disk backed /tmp in Docker can stall the workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+def pre_fork(server, worker):
+    if preload_app:
+        # A connection opened while the master imported the application must not be shared with the workers
+        from django.db import connections
+        connections.close_all()
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            server.log.warning("psycogreen is not installed, database queries block the gevent worker.")
+        else:
+            patch_psycopg()
+
+    if preload_app:
+        from utils.request_metrics import request_metrics
+        request_metrics.reset()  # Every worker reports its own requests from its own start
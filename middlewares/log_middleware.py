@@ -1,17 +1,74 @@
 from django.utils.deprecation import MiddlewareMixin
 import datetime
 import logging
+import time
+from django.conf import settings
+from django.db import connection
 from django.utils import timezone
+from utils.request_metrics import RequestStats, current_request_stats, request_metrics
 
 logger = logging.getLogger('django')
 
+SLOW_QUERY_LOG_LENGTH = 500
+
 class LogRequestMiddleware(MiddlewareMixin):
+    """
+    Logs unhandled exceptions and records the wall time, database queries, cache lookups and response size
+    of every request into utils.request_metrics. Requests slower than SLOW_REQUEST_THRESHOLD_MS are logged
+    with their slowest queries.
+    """
+    async_capable = False  # The query wrapper and the current request stats are bound to the calling thread
+
+    def __call__(self, request):
+        stats = RequestStats()
+        request.request_stats = stats
+        token = current_request_stats.set(stats)
+        try:
+            with connection.execute_wrapper(stats):
+                return super().__call__(request)
+        finally:
+            current_request_stats.reset(token)
+
     def process_request(self, request):
         request.start_time = timezone.localtime()
+        request.perf_start = time.perf_counter()
 
     def process_response(self, request, response):
+        stats = getattr(request, 'request_stats', None)
+        start = getattr(request, 'perf_start', None)
+        if stats is None or start is None:
+            return response
+
+        duration = time.perf_counter() - start
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.view_name if resolver_match else 'unresolved'
+        response_size = None if response.streaming else len(response.content)
+        request_metrics.record(view_name, request.method, response.status_code, duration, stats, response_size)
+
+        if duration * 1000 >= settings.SLOW_REQUEST_THRESHOLD_MS:
+            self.log_slow_request(request, view_name, response.status_code, duration, stats)
         return response
 
+    def log_slow_request(self, request, view_name, status_code, duration, stats):
+        slowest_queries = " || ".join(
+            f"{seconds * 1000:.1f} ms: {sql[:SLOW_QUERY_LOG_LENGTH]}" for seconds, sql in stats.get_slowest_queries()
+        )
+        logger.warning(
+            "Slow request: %.0f ms | Path: %s | Method: %s | View: %s | Status: %s | Queries: %s in %.0f ms | "
+            "Cache hits/misses: %s/%s | User: %s | Slowest queries: %s",
+            duration * 1000,
+            request.path,
+            request.method,
+            view_name,
+            status_code,
+            stats.query_count,
+            stats.query_time * 1000,
+            stats.cache_hits,
+            stats.cache_misses,
+            self.get_user_info(request),
+            slowest_queries or "-"
+        )
+
     def process_exception(self, request, exception):
         request_path = request.path
         request_method = request.method
@@ -38,8 +95,9 @@ class LogRequestMiddleware(MiddlewareMixin):
         return ip
 
     def get_user_info(self, request):
-        if request.user.is_authenticated:
-            user_id = request.user.id
-            user_email = request.user.email
+        user = getattr(request, 'user', None)  # Not set when the request fails before AuthenticationMiddleware
+        if user is not None and user.is_authenticated:
+            user_id = user.id
+            user_email = user.email
             return f"ID: {user_id}, Email: {user_email}"
         return "Anonymous"
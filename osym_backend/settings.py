@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from datetime import timedelta
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -24,6 +25,14 @@ EMAIL_RESEND_LIMIT = 7  # Limit for resending verification email
 ENVIRONMENT = os.getenv('ENVIRONMENT', 'production')
 DEBUG = ENVIRONMENT.lower() == 'development'
 
+# Settings profile of the process: 'full' serves the admin panel and the API, 'api' only the JWT authenticated API.
+# API workers leave out the admin apps and the session, CSRF and message middleware that only the admin pages need.
+# Run migrate and collectstatic with the full profile, see `python manage.py benchmark_settings_profiles`.
+SETTINGS_PROFILE = os.getenv('SETTINGS_PROFILE', 'full')
+if SETTINGS_PROFILE not in ('full', 'api'):
+    raise ImproperlyConfigured(f"SETTINGS_PROFILE must be 'full' or 'api', not '{SETTINGS_PROFILE}'.")
+API_ONLY = SETTINGS_PROFILE == 'api'
+
 # Secret key
 SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-#3k1q$5!5uq^$2z#5b5b3z')
 
@@ -59,6 +68,7 @@ EXCLUDED_CATCH_ALL_PREFIXES = [
     'soru/',
     'upload-history/',
     'check-task-status/',
+    'request-metrics/',
     'admin-yonetim/',
 ]
 
@@ -101,7 +111,6 @@ INSTALLED_APPS = [
     'corsheaders',
     'django_filters',
     'django_admin_listfilter_dropdown',
-    'debug_toolbar',
 
     'users',
     'api',
@@ -121,6 +130,19 @@ INSTALLED_APPS = [
     'performance_metrics',
 ]
 
+ADMIN_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'nested_admin',
+    'django_admin_listfilter_dropdown',
+]
+
+if API_ONLY:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_APPS]
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=6*30),
@@ -188,7 +210,7 @@ CELERY_TIMEZONE = 'Europe/Istanbul'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django_redis.cache.RedisCache',
+        'BACKEND': 'utils.cache_backends.InstrumentedRedisCache',  # django_redis RedisCache counting hits and misses
         'LOCATION': 'redis://redis:6379/1',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
@@ -198,6 +220,32 @@ CACHES = {
 
 LOG_LEVEL = 'DEBUG' if DEBUG else 'ERROR'
 
+# Request metrics of LogRequestMiddleware, see utils/request_metrics.py
+SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', '1000'))  # Slower requests are logged with their slowest queries
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Lets a Prometheus scraper read the metrics endpoint without an admin account
+
+# OpenAI gateway, see services/ai_gateway.py
+OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # Defaults to the OpenAI API, set it to a stub server for tests
+AI_REQUEST_TIMEOUT = float(os.getenv('AI_REQUEST_TIMEOUT', '30'))  # Seconds per attempt
+AI_MAX_RETRIES = int(os.getenv('AI_MAX_RETRIES', '2'))
+AI_MAX_CONCURRENT_REQUESTS = int(os.getenv('AI_MAX_CONCURRENT_REQUESTS', '8'))  # Per worker process
+AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL', str(60 * 60 * 24)))  # Seconds an answer is reused for the same question
+
+# OCR of the uploaded question photos, see services/ocr_pipeline.py
+TESSDATA_DIR_PATH = os.getenv('TESSDATA_DIR_PATH')
+OCR_MAX_DIMENSION = int(os.getenv('OCR_MAX_DIMENSION', '2000'))  # Longer side of the image read by Tesseract, in pixels
+OCR_MAX_WORKERS = int(os.getenv('OCR_MAX_WORKERS', str(os.cpu_count() or 1)))  # Concurrent Tesseract reads per process
+OCR_CACHE_TTL = int(os.getenv('OCR_CACHE_TTL', str(60 * 60 * 24 * 7)))
+
+# Question bank lookup of the photographed questions, see utils/question_text_index.py
+QUESTION_MATCH_THRESHOLD = float(os.getenv('QUESTION_MATCH_THRESHOLD', '0.8'))  # Estimated Jaccard similarity of the texts
+QUESTION_MATCH_MARGIN = float(os.getenv('QUESTION_MATCH_MARGIN', '0.1'))  # Lead needed over the second most similar question
+
+# Forbidden words of the AI endpoints, see utils/content_filter.py
+CONTENT_FILTER_WORDS_FILE = os.getenv('CONTENT_FILTER_WORDS_FILE')  # One word per line, replaces the built-in list
+CONTENT_FILTER_REFRESH = int(os.getenv('CONTENT_FILTER_REFRESH', '60'))  # Seconds before a process compiles the word list again
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -257,7 +305,6 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'middlewares.log_middleware.LogRequestMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -267,6 +314,19 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Only the admin pages use sessions, CSRF tokens and messages, the API authenticates every request with a JWT
+ADMIN_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+if API_ONLY:
+    MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in ADMIN_MIDDLEWARE]
+if DEBUG:
+    MIDDLEWARE.insert(MIDDLEWARE.index('middlewares.log_middleware.LogRequestMiddleware') + 1, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+
 INTERNAL_IPS = [
     '127.0.0.1',
     'localhost',
@@ -304,9 +364,26 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Every worker thread keeps its connection for DB_CONN_MAX_AGE seconds instead of connecting per request,
+        # 0 closes it after every request. Health checks replace a connection the server closed in the meantime.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # Set to True behind pgbouncer in transaction pooling mode, which cannot keep cursors open between transactions
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True',
     }
 }
 
+# DB_ENGINE=sqlite runs the test suite without a PostgreSQL server, e.g. `DB_ENGINE=sqlite python manage.py test api`.
+# The migrations use PostgreSQL extensions, so the SQLite test database is created from the models instead.
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'TEST': {'MIGRATE': False},
+        }
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
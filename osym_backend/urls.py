@@ -4,8 +4,10 @@ from django.conf import settings
 from django.urls import include
 from others.views.other_views import base_view
 
-urlpatterns = [
-    path(settings.ADMIN_URL, admin.site.urls),
+# API workers (SETTINGS_PROFILE=api) do not install the admin
+urlpatterns = [] if settings.API_ONLY else [path(settings.ADMIN_URL, admin.site.urls)]
+
+urlpatterns += [
     path('api/v1/', include('api.urls.users.urls')),
     path('api/v1/', include('api.urls.exams.urls')),
     path('api/v1/', include('api.urls.grades.urls')),
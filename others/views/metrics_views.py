@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+from utils.api_responses import ApiResponse
+from utils.request_metrics import request_metrics
+
+class IsAdminOrMetricsToken(BasePermission):
+    """Admin users, or a scraper sending METRICS_TOKEN in the X-Metrics-Token header."""
+
+    def has_permission(self, request, view):
+        token = request.headers.get('X-Metrics-Token')
+        if settings.METRICS_TOKEN and token and constant_time_compare(token, settings.METRICS_TOKEN):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+class RequestMetricsView(APIView):
+    """
+    Request metrics of the worker process answering the call, per URL name and method.
+    Returns JSON summaries by default and the Prometheus text format with ?output=prometheus.
+    """
+    permission_classes = [IsAdminOrMetricsToken]
+
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get('output') == 'prometheus':
+            return HttpResponse(request_metrics.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+        return ApiResponse.Success(data=request_metrics.snapshot())
@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from pagination.custom_pagination import CustomPagination
+from utils.api_responses import ApiResponse
+
+class KeysetPagination:
+    """
+    Keyset pagination over a (field, id) ordering for value or model querysets.
+    The cursor holds the key of the last row, so every page is an index range scan
+    instead of an OFFSET that reads and throws away all the rows before it.
+    The field must not be NULL for the paginated rows.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Geçersiz sayfa imleci.'
+
+    def __init__(self, field, descending=False):
+        self.field = field
+        self.descending = descending
+        self.request = None
+        self.next_cursor = None
+        self.page_size_used = self.page_size
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_key(self, row):
+        if isinstance(row, dict):
+            return row[self.field], row['id']
+        return getattr(row, self.field), row.id
+
+    def encode_cursor(self, row):
+        value, last_id = self.get_key(row)
+        if isinstance(value, datetime):
+            value = value.isoformat()  # Keeps the microseconds, so rows created in the same second are not skipped
+        key = json.dumps([value, last_id])
+        return base64.urlsafe_b64encode(key.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        if type(value) not in (str, int, float) or type(last_id) is not int:  # bool is a subclass of int
+            raise NotFound(self.invalid_cursor_message)
+        return value, last_id
+
+    def parse_cursor_value(self, queryset, value):
+        """The cursor value as a value of the model field, so a crafted cursor is a 404 instead of a database error."""
+        try:
+            value = queryset.model._meta.get_field(self.field).to_python(value)
+        except (ValidationError, TypeError, ValueError, OverflowError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+
+        cursor = self.decode_cursor(request)
+        if cursor:
+            value, last_id = cursor
+            value = self.parse_cursor_value(queryset, value)
+            if self.descending:
+                after = Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'id__lt': last_id})
+            else:
+                after = Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'id__gt': last_id})
+            queryset = queryset.filter(after)
+
+        ordering = [f'-{self.field}', '-id'] if self.descending else [self.field, 'id']
+        # Fetch one extra row to know whether there is a next page without counting
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.next_cursor = self.encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+        self.page_size_used = page_size
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data, message=None):
+        if not message:
+            message = 'İşlem başarılı oldu.'
+
+        return Response({
+            'success': True,
+            'message': ApiResponse._format_message(message),
+            'page_size': self.page_size_used,
+            'next': self.get_next_link(),
+            'data': data,
+            'status_code': status.HTTP_200_OK
+        }, status=status.HTTP_200_OK)
+
+class CreatedAtCursorPagination(KeysetPagination):
+    """
+    Newest-first cursor pagination for the per-user history lists (attempts, incorrect and favourite questions),
+    served from the (user_id, created_at DESC, id DESC) indexes.
+    Cursor pages are only served to clients that ask for them with ?pagination=cursor or send a cursor. App
+    versions released before the cursor request the first page without parameters and the next ones with ?page=N,
+    such requests are served by CustomPagination in the same order, with its page number envelope.
+    The total of a cursor page is only counted when the client asks for it with ?include_total=true, and the count
+    is cached briefly so infinite scroll does not run COUNT(*) on every page.
+    """
+    include_total_query_param = 'include_total'
+    pagination_query_param = 'pagination'
+    total_cache_timeout = 60
+
+    def __init__(self):
+        super().__init__('created_at', descending=True)
+        self.total = None
+        self.legacy_paginator = None
+
+    def get_total(self, queryset):
+        cache_key = f'cursor_total:{hashlib.md5(str(queryset.query).encode()).hexdigest()}'
+        total = cache.get(cache_key)
+        if total is None:
+            total = queryset.count()
+            cache.set(cache_key, total, timeout=self.total_cache_timeout)
+        return total
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.total = None
+        self.legacy_paginator = None
+        uses_cursor = (
+            request.query_params.get(self.cursor_query_param)
+            or request.query_params.get(self.pagination_query_param) == 'cursor'
+        )
+        if not uses_cursor:
+            self.legacy_paginator = CustomPagination()
+            return self.legacy_paginator.paginate_queryset(queryset.order_by('-created_at', '-id'), request, view)
+
+        if request.query_params.get(self.include_total_query_param, '').lower() in ('1', 'true'):
+            self.total = self.get_total(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data, message=None):
+        if self.legacy_paginator is not None:
+            return self.legacy_paginator.get_paginated_response(data, message)
+        response = super().get_paginated_response(data, message)
+        response.data['total'] = self.total
+        return response
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from users.models import CustomUser
+from utils.performance_tools import QuestionTotals, refresh_user_performance
+
+class Command(BaseCommand):
+    help = "Rebuild SubjectPerformance and TopicPerformance rollups from QuestionLatestStatus."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Only rebuild the given user id. Can be passed multiple times."
+        )
+        parser.add_argument(
+            '--all-users', action='store_true',
+            help="Rebuild every user, not only the ones who have answered questions."
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        if not user_ids:
+            users = CustomUser.objects.all()
+            if not options['all_users']:
+                users = users.filter(question_latest_statuses__isnull=False).distinct()
+            user_ids = list(users.order_by('id').values_list('id', flat=True))
+
+        # Question bank totals are the same for every user
+        totals = QuestionTotals()
+
+        for index, user_id in enumerate(user_ids, start=1):
+            refresh_user_performance(user_id, totals=totals)
+            if index % 100 == 0:
+                self.stdout.write(f"{index}/{len(user_ids)} kullanıcı işlendi.")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt performance rollups for {len(user_ids)} users."))
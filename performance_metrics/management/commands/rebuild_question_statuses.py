@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from questions.models import Question
+from quizzes.models import QuizAttempt, DisplaySetAttempt
+from exam_sets.models import ExamSetQuizAttempt, ExamSetDisplaySetAttempt
+from performance_metrics.models import QuestionLatestStatus
+from utils.performance_tools import build_latest_statuses
+
+ATTEMPT_SOURCES = [
+    (QuizAttempt, 'quiz', 'question_id'),
+    (DisplaySetAttempt, 'display_set', 'id'),
+    (ExamSetQuizAttempt, 'exam_set_quiz', 'question_id'),
+    (ExamSetDisplaySetAttempt, 'exam_set_display_set', 'id'),
+]
+
+class Command(BaseCommand):
+    help = "Rebuild QuestionLatestStatus rows from the stored quiz, display set and exam set attempts."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help="Only rebuild the given user id. Can be passed multiple times."
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of rows written per INSERT."
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['user_ids']
+        batch_size = options['batch_size']
+
+        if not user_ids:
+            user_ids = set()
+            for model, _, _ in ATTEMPT_SOURCES:
+                user_ids.update(model.objects.values_list('user_id', flat=True).distinct())
+
+        existing_question_ids = set(Question.objects.values_list('id', flat=True))
+        total_rows = 0
+
+        for user_id in sorted(user_ids):
+            latest = {}  # {question_id: QuestionLatestStatus}
+
+            for model, source_type, question_key in ATTEMPT_SOURCES:
+                attempts = model.objects.filter(user_id=user_id).only('id', 'user_id', 'details', 'created_at')
+                for attempt in attempts.iterator():
+                    statuses = build_latest_statuses(
+                        user_id,
+                        attempt.details.get('answers', []),
+                        attempt.created_at,
+                        source_type,
+                        attempt.id,
+                        question_key=question_key
+                    )
+                    for status in statuses:
+                        current = latest.get(status.question_id)
+                        if current is None or current.answered_at <= status.answered_at:
+                            latest[status.question_id] = status
+
+            rows = [status for question_id, status in latest.items() if question_id in existing_question_ids]
+
+            with transaction.atomic():
+                QuestionLatestStatus.objects.filter(user_id=user_id).delete()
+                QuestionLatestStatus.objects.bulk_create(rows, batch_size=batch_size)
+
+            total_rows += len(rows)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total_rows} question statuses for {len(user_ids)} users."))
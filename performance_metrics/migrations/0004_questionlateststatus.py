@@ -0,0 +1,33 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_metrics', '0003_alter_subjectperformance_exam_type'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionLatestStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('correct', 'Doğru'), ('incorrect', 'Yanlış'), ('unanswered', 'Boş')], max_length=10)),
+                ('answered_at', models.DateTimeField()),
+                ('source_type', models.CharField(choices=[('quiz', 'Quiz'), ('display_set', 'Soru Seti'), ('exam_set_quiz', 'Sınav Seti Quiz'), ('exam_set_display_set', 'Sınav Seti Soru Seti')], max_length=20)),
+                ('source_attempt_id', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='latest_statuses', to='questions.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_latest_statuses', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-answered_at'],
+                'unique_together': {('user', 'question')},
+            },
+        ),
+    ]
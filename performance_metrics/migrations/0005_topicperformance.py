@@ -0,0 +1,39 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_metrics', '0004_questionlateststatus'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+                ('incorrect_count', models.PositiveIntegerField(default=0)),
+                ('unanswered_count', models.PositiveIntegerField(default=0)),
+                ('unseen_count', models.PositiveIntegerField(default=0)),
+                ('total_questions', models.PositiveIntegerField(default=0)),
+                ('success_rate', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_performances', to='questions.subject')),
+                ('topic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performances', to='questions.topic')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='topic_performances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-updated_at'],
+                'indexes': [models.Index(fields=['user', 'subject'], name='performance_user_id_55e691_idx')],
+                'unique_together': {('user', 'topic')},
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_metrics', '0005_topicperformance'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subjectperformance',
+            index=models.Index(condition=models.Q(('exam_type', None)), fields=['user', 'subject'], name='subject_perf_user_overall_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:17
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def delete_duplicate_overall_subject_performances(apps, schema_editor):
+    # Keeps the most recently updated overall row of every (user, subject), the others were written by concurrent refreshes
+    model = apps.get_model('performance_metrics', 'SubjectPerformance')
+    latest = model.objects.filter(
+        user_id=OuterRef('user_id'), subject_id=OuterRef('subject_id'), exam_type=None
+    ).order_by('-updated_at', '-id').values('id')[:1]
+    model.objects.filter(exam_type=None).exclude(id=Subquery(latest)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('performance_metrics', '0006_per_user_indexes'),
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_overall_subject_performances, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='subjectperformance',
+            name='subject_perf_user_overall_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='subjectperformance',
+            constraint=models.UniqueConstraint(condition=models.Q(('exam_type', None)), fields=('user', 'subject'), name='subject_perf_user_overall_uniq'),
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 from users.models import CustomUser
-from questions.models import ExamType, Subject
+from questions.models import ExamType, Subject, Topic, Question
 
 class SubjectPerformance(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='subject_performances')
@@ -22,6 +22,61 @@ class SubjectPerformance(models.Model):
     class Meta:
         ordering = ['-updated_at']
         unique_together = ('user', 'exam_type', 'subject')
+        constraints = [
+            # unique_together does not cover the overall rows, NULL exam types never conflict. The index also serves
+            # the performance endpoints, which read the overall rows ordered by subject.
+            models.UniqueConstraint(fields=['user', 'subject'], condition=models.Q(exam_type=None), name='subject_perf_user_overall_uniq'),
+        ]
 
     def __str__(self):
-        return f"Performance for {self.user} - {self.exam_type} - {self.subject}"
\ No newline at end of file
+        return f"Performance for {self.user} - {self.exam_type} - {self.subject}"
+
+class TopicPerformance(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='topic_performances')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topic_performances')
+    topic = models.ForeignKey(Topic, on_delete=models.CASCADE, related_name='performances')
+    correct_count = models.PositiveIntegerField(default=0)
+    incorrect_count = models.PositiveIntegerField(default=0)
+    unanswered_count = models.PositiveIntegerField(default=0)
+    unseen_count = models.PositiveIntegerField(default=0)
+    total_questions = models.PositiveIntegerField(default=0)
+    success_rate = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        unique_together = ('user', 'topic')
+        indexes = [
+            models.Index(fields=['user', 'subject']),
+        ]
+
+    def __str__(self):
+        return f"Performance for {self.user} - {self.subject} - {self.topic}"
+
+class QuestionLatestStatus(models.Model):
+    STATUS_CHOICES = [
+        ('correct', 'Doğru'),
+        ('incorrect', 'Yanlış'),
+        ('unanswered', 'Boş'),
+    ]
+    SOURCE_CHOICES = [
+        ('quiz', 'Quiz'),
+        ('display_set', 'Soru Seti'),
+        ('exam_set_quiz', 'Sınav Seti Quiz'),
+        ('exam_set_display_set', 'Sınav Seti Soru Seti'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='question_latest_statuses')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='latest_statuses')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES)
+    answered_at = models.DateTimeField()
+    source_type = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    source_attempt_id = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-answered_at']
+        unique_together = ('user', 'question')
+
+    def __str__(self):
+        return f"{self.user} - Question {self.question_id}: {self.status}"
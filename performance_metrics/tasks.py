@@ -0,0 +1,18 @@
+from celery import shared_task
+from django.core.cache import cache
+from utils.performance_tools import (
+    ROLLUP_REBUILD_CACHE_KEY, get_user_rebuild_cache_key, rebuild_performance_rollups, refresh_user_performance
+)
+
+@shared_task
+def refresh_user_performance_task(user_id):
+    refresh_user_performance(user_id)
+
+@shared_task
+def rebuild_performance_rollups_task(user_ids=None):
+    # Changes made while the rollups are rebuilt schedule the next rebuild
+    if user_ids is None:
+        cache.delete(ROLLUP_REBUILD_CACHE_KEY)
+    else:
+        cache.delete_many([get_user_rebuild_cache_key(user_id) for user_id in user_ids])
+    return rebuild_performance_rollups(user_ids)
@@ -1,23 +1,43 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from questions.models import Subject, Question
-from quizzes.models import QuizAttempt, DisplaySetAttempt
-from performance_metrics.models import SubjectPerformance
+from questions.models import Subject, Topic
+from performance_metrics.models import SubjectPerformance, TopicPerformance
 from serializers.performance_serializers import SubjectPerformanceSerializer
 from utils.api_responses import ApiResponse
+from utils.performance_tools import refresh_user_performance
 from pagination.custom_pagination import CustomPagination
-from questions.models import Topic
-from exam_sets.models import ExamSetQuizAttempt, ExamSetDisplaySetAttempt
+
+def serialize_subject_summary(subject, subject_performance):
+    return {
+        'id': subject.id,
+        'name': subject.name,
+        'correct_count': subject_performance.correct_count,
+        'incorrect_count': subject_performance.incorrect_count,
+        'unanswered_count': subject_performance.unanswered_count,
+        'unseen_count': subject_performance.unseen_count,
+        'total_questions': subject_performance.total_questions,
+        'success_rate': subject_performance.success_rate,
+        'correct_percentage': subject_performance.correct_percentage,
+        'incorrect_percentage': subject_performance.incorrect_percentage,
+        'unanswered_percentage': subject_performance.unanswered_percentage,
+        'unseen_percentage': subject_performance.unseen_percentage
+    }
 
 class ExamTypePerformanceView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         user = request.user
-        subjects = Subject.objects.all()
+        subjects = {subject.id: subject for subject in Subject.objects.all()}
             
-        if not subjects.exists():
+        if not subjects:
             return ApiResponse.NotFound(message='Ders bulunamadı.')
+
+        # Rollups are refreshed by Celery after each submission and after question bank changes.
+        # Compute them here only for users who have none yet or when a subject was added since.
+        performances = list(SubjectPerformance.objects.filter(user=user, exam_type=None).order_by('subject_id'))
+        if {performance.subject_id for performance in performances} != set(subjects):
+            performances = refresh_user_performance(user.id)
             
         performance_data = []
         total_correct = 0
@@ -26,220 +46,33 @@ class ExamTypePerformanceView(APIView):
         total_unseen = 0
         total_questions_overall = 0
         
-        for subject in subjects:
-            # Get all questions for this subject across all exam types
-            all_questions = Question.objects.filter(subject=subject, image_url__isnull=False)
-            total_questions = all_questions.count()
-            total_questions_overall += total_questions
-            
-            # Get all question IDs
-            all_question_ids = set(all_questions.values_list('id', flat=True))
-            
-            # Process quiz attempts
-            quiz_attempts = QuizAttempt.objects.filter(
-                user=user,
-                quiz__quiz_group__subject=subject
-            ).order_by('-created_at')
-
-            # For standard display set attempts - use "subject" (singular)
-            display_attempts = DisplaySetAttempt.objects.filter(
-                user=user,
-                display_set__subject=subject
-            ).order_by('-created_at')
-
-            # For exam set quiz attempts - use "subjects" (plural)
-            exam_set_quiz_attempts = ExamSetQuizAttempt.objects.filter(
-                user=user,
-                quiz__quiz_group__subjects=subject
-            ).order_by('-created_at')
-
-            # For exam set display set attempts - use "subjects" (plural)
-            exam_set_display_attempts = ExamSetDisplaySetAttempt.objects.filter(
-                user=user,
-                display_set__subjects=subject
-            ).order_by('-created_at')
-            
-            # Track latest status for each question
-            question_latest_status = {}  # {question_id: (status, timestamp)}
-            
-            # Process quiz attempts (newer to older)
-            for attempt in quiz_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('question_id')
-                        if not question_id:
-                            continue
-                            
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Process display set attempts (newer to older)
-            for attempt in display_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('id')
-                        if not question_id:
-                            continue
-                            
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-
-            # Process exam set quiz attempts (newer to older)
-            for attempt in exam_set_quiz_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('question_id')
-                        if not question_id:
-                            continue
-
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.subject_id != subject.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                            
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Process exam set display set attempts (newer to older)
-            for attempt in exam_set_display_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('id')
-                        if not question_id:
-                            continue
+        for subject_performance in performances:
+            subject = subjects.get(subject_performance.subject_id)
+            if subject is None:
+                continue
 
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.subject_id != subject.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                            
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Calculate counts based on latest status
-            correct_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'correct')
-            incorrect_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'incorrect')
-            unanswered_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'unanswered')
-            
-            # Calculate unseen questions
-            seen_questions = set(question_latest_status.keys())
-            unseen_questions = all_question_ids - seen_questions
-            unseen_count = len(unseen_questions)
-            
             # Update totals
-            total_correct += correct_count
-            total_incorrect += incorrect_count
-            total_unanswered += unanswered_count
-            total_unseen += unseen_count
-            
-            # Calculate success rate and percentages
-            attempted_count = correct_count + incorrect_count
-            success_rate = (correct_count / attempted_count * 100) if attempted_count > 0 else 0
-            
-            # Calculate percentages
-            correct_percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
-            incorrect_percentage = (incorrect_count / total_questions * 100) if total_questions > 0 else 0
-            unanswered_percentage = (unanswered_count / total_questions * 100) if total_questions > 0 else 0
-            unseen_percentage = (unseen_count / total_questions * 100) if total_questions > 0 else 0
-            
-            # Get or create combined performance record
-            subject_performance, _ = SubjectPerformance.objects.update_or_create(
-                user=user,
-                subject=subject,
-                exam_type=None,  # No specific exam type
-                defaults={
-                    'correct_count': correct_count,
-                    'incorrect_count': incorrect_count,
-                    'unanswered_count': unanswered_count,
-                    'unseen_count': unseen_count,
-                    'total_questions': total_questions,
-                    'success_rate': success_rate,
-                    'correct_percentage': correct_percentage,
-                    'incorrect_percentage': incorrect_percentage,
-                    'unanswered_percentage': unanswered_percentage,
-                    'unseen_percentage': unseen_percentage
-                }
-            )
+            total_correct += subject_performance.correct_count
+            total_incorrect += subject_performance.incorrect_count
+            total_unanswered += subject_performance.unanswered_count
+            total_unseen += subject_performance.unseen_count
+            total_questions_overall += subject_performance.total_questions
             
             # Add to performance data
             performance_data.append({
                 'id': subject_performance.id,
                 'subject_id': subject.id,
                 'subject_name': subject.name,
-                'correct_count': correct_count,
-                'incorrect_count': incorrect_count,
-                'unanswered_count': unanswered_count,
-                'unseen_count': unseen_count,
-                'total_questions': total_questions,
-                'success_rate': success_rate,
-                'correct_percentage': round(correct_percentage, 1),
-                'incorrect_percentage': round(incorrect_percentage, 1),
-                'unanswered_percentage': round(unanswered_percentage, 1),
-                'unseen_percentage': round(unseen_percentage, 1)
+                'correct_count': subject_performance.correct_count,
+                'incorrect_count': subject_performance.incorrect_count,
+                'unanswered_count': subject_performance.unanswered_count,
+                'unseen_count': subject_performance.unseen_count,
+                'total_questions': subject_performance.total_questions,
+                'success_rate': subject_performance.success_rate,
+                'correct_percentage': round(subject_performance.correct_percentage, 1),
+                'incorrect_percentage': round(subject_performance.incorrect_percentage, 1),
+                'unanswered_percentage': round(subject_performance.unanswered_percentage, 1),
+                'unseen_percentage': round(subject_performance.unseen_percentage, 1)
             })
         
         # Calculate overall success rate and percentages
@@ -270,7 +103,7 @@ class ExamTypePerformanceView(APIView):
 class SubjectPerformanceDetailView(APIView):
     permission_classes = [IsAuthenticated]
     
-    def get(self, request, exam_type_id, subject_id):
+    def get(self, request, subject_id, exam_type_id=None):
         user = request.user
         
         try:
@@ -308,258 +141,40 @@ class SubjectTopicsPerformanceView(APIView):
             # If performance doesn't exist, return 404
             return ApiResponse.NotFound(message='Bu ders için performans bilgisi bulunamadı.')
         
-        # Get all topics for this subject
-        topics = Topic.objects.filter(subject=subject).order_by('name')
-        
-        if not topics.exists():
+        if not Topic.objects.filter(subject=subject).exists():
             # Return just the subject performance if no topics exist
             return ApiResponse.Success(data={
-                'subject': {
-                    'id': subject.id,
-                    'name': subject.name,
-                    'correct_count': subject_performance.correct_count,
-                    'incorrect_count': subject_performance.incorrect_count,
-                    'unanswered_count': subject_performance.unanswered_count,
-                    'unseen_count': subject_performance.unseen_count,
-                    'total_questions': subject_performance.total_questions,
-                    'success_rate': subject_performance.success_rate,
-                    'correct_percentage': subject_performance.correct_percentage,
-                    'incorrect_percentage': subject_performance.incorrect_percentage,
-                    'unanswered_percentage': subject_performance.unanswered_percentage,
-                    'unseen_percentage': subject_performance.unseen_percentage
-                },
+                'subject': serialize_subject_summary(subject, subject_performance),
                 'topics': []
             })
-        
-        topic_performances = []
-        
-        for topic in topics:
-            # Get all questions for this topic and subject across all exam types
-            all_questions = Question.objects.filter(
-                subject=subject,
-                topic=topic
-            )
-            total_questions = all_questions.count()
-            
-            if total_questions == 0:
-                continue  # Skip topics with no questions
-            
-            # Get all question IDs
-            all_question_ids = set(all_questions.values_list('id', flat=True))
-            
-            # Process quiz attempts
-            quiz_attempts = QuizAttempt.objects.filter(
-                user=user,
-                quiz__quiz_group__subject=subject,
-                quiz__quiz_group__topic=topic
-            ).order_by('-created_at')
 
-            display_attempts = DisplaySetAttempt.objects.filter(
-                user=user,
-                display_set__subject=subject,
-                display_set__topic=topic
-            ).order_by('-created_at')
-            
-            # Process exam set quiz attempts
-            exam_set_quiz_attempts = ExamSetQuizAttempt.objects.filter(
-                user=user,
-                quiz__quiz_group__subjects=subject,
-                quiz__quiz_group__topic=topic
-            ).order_by('-created_at')
-            
-            # Process exam set display set attempts
-            exam_set_display_attempts = ExamSetDisplaySetAttempt.objects.filter(
-                user=user,
-                display_set__subjects=subject,
-                display_set__topic=topic
-            ).order_by('-created_at')
-            
-            # Track latest status for each question
-            question_latest_status = {}  # {question_id: (status, timestamp)}
-            
-            # Process quiz attempts (newer to older)
-            for attempt in quiz_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('question_id')
-                        if not question_id:
-                            continue
-                        
-                        # Check if this question belongs to our topic
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.topic_id != topic.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                        
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Process display set attempts (newer to older)
-            for attempt in display_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('id')
-                        if not question_id:
-                            continue
-                        
-                        # Check if this question belongs to our topic
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.topic_id != topic.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                        
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Process exam set quiz attempts (newer to older)
-            for attempt in exam_set_quiz_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('question_id')
-                        if not question_id:
-                            continue
-                        
-                        # Check if this question belongs to our topic
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.topic_id != topic.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                        
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Process exam set display set attempts (newer to older)
-            for attempt in exam_set_display_attempts:
-                attempt_time = attempt.created_at
-                
-                if 'answers' in attempt.details:
-                    for answer in attempt.details['answers']:
-                        question_id = answer.get('id')
-                        if not question_id:
-                            continue
-                        
-                        # Check if this question belongs to our topic
-                        try:
-                            question = Question.objects.get(id=question_id)
-                            if question.topic_id != topic.id:
-                                continue
-                        except Question.DoesNotExist:
-                            continue
-                        
-                        # Skip if we already have a more recent attempt for this question
-                        if question_id in question_latest_status and question_latest_status[question_id][1] > attempt_time:
-                            continue
-                            
-                        is_correct = answer.get('is_correct', False)
-                        user_answer = answer.get('user_answer')
-                        
-                        if is_correct:
-                            status = 'correct'
-                        elif user_answer is None:
-                            status = 'unanswered'
-                        else:
-                            status = 'incorrect'
-                            
-                        question_latest_status[question_id] = (status, attempt_time)
-            
-            # Calculate counts based on latest status
-            correct_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'correct')
-            incorrect_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'incorrect')
-            unanswered_count = sum(1 for qid, (status, _) in question_latest_status.items() if status == 'unanswered')
-            
-            # Calculate unseen questions
-            seen_questions = set(question_latest_status.keys())
-            unseen_questions = all_question_ids - seen_questions
-            unseen_count = len(unseen_questions)
-            
-            # Calculate success rate
-            attempted_count = correct_count + incorrect_count
-            success_rate = (correct_count / attempted_count * 100) if attempted_count > 0 else 0
-            
-            # Add to topic performances
-            topic_performances.append({
-                'topic_id': topic.id,
-                'topic_name': topic.name,
-                'correct_count': correct_count,
-                'incorrect_count': incorrect_count,
-                'unanswered_count': unanswered_count,
-                'unseen_count': unseen_count,
-                'total_questions': total_questions,
-                'success_rate': success_rate,
-                'achievement_code': topic.achievement_code
-            })
+        # Topic rollups are stored next to the subject rollup; build them once for users
+        # whose rows predate topic rollups.
+        if not TopicPerformance.objects.filter(user=user).exists():
+            refresh_user_performance(user.id)
+
+        # Topics with no questions are not stored
+        topic_performances = (
+            TopicPerformance.objects.filter(user=user, subject=subject, total_questions__gt=0)
+            .select_related('topic')
+            .order_by('topic__name', 'topic_id')
+        )
         
         # Apply pagination
         paginator = self.pagination_class()
         paginated_topics = paginator.paginate_queryset(topic_performances, request)
+
+        topics_data = [{
+            'topic_id': topic_performance.topic.id,
+            'topic_name': topic_performance.topic.name,
+            'correct_count': topic_performance.correct_count,
+            'incorrect_count': topic_performance.incorrect_count,
+            'unanswered_count': topic_performance.unanswered_count,
+            'unseen_count': topic_performance.unseen_count,
+            'total_questions': topic_performance.total_questions,
+            'success_rate': topic_performance.success_rate,
+            'achievement_code': topic_performance.topic.achievement_code
+        } for topic_performance in paginated_topics]
         
         # Return both subject performance and paginated topic performances
-        response_data = {
-            'subject': {
-                'id': subject.id,
-                'name': subject.name,
-                'correct_count': subject_performance.correct_count,
-                'incorrect_count': subject_performance.incorrect_count,
-                'unanswered_count': subject_performance.unanswered_count,
-                'unseen_count': subject_performance.unseen_count,
-                'total_questions': subject_performance.total_questions,
-                'success_rate': subject_performance.success_rate,
-                'correct_percentage': subject_performance.correct_percentage,
-                'incorrect_percentage': subject_performance.incorrect_percentage,
-                'unanswered_percentage': subject_performance.unanswered_percentage,
-                'unseen_percentage': subject_performance.unseen_percentage
-            }
-        }
-        
-        return paginator.get_paginated_response({'topics': paginated_topics, 'subject': response_data['subject']})
+        return paginator.get_paginated_response({'topics': topics_data, 'subject': serialize_subject_summary(subject, subject_performance)})
@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from questions.models import Question
+from services.ocr_pipeline import read_text
+from utils.question_text_index import index_question
+
+DOWNLOAD_TIMEOUT = 30
+
+class Command(BaseCommand):
+    help = (
+        "Read the text of the question images and index it for the question bank lookup of SolveImageView. "
+        "Only questions without a text or with a changed image are read unless --reindex is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reindex', action='store_true', help="Read the images of every question again.")
+        parser.add_argument('--limit', type=int, help="Read at most this many images.")
+        parser.add_argument('--workers', type=int, default=4, help="Images downloaded and read at once.")
+
+    def handle(self, *args, **options):
+        questions = Question.objects.exclude(image_url__isnull=True).exclude(image_url='').order_by('id')
+        if not options['reindex']:
+            questions = questions.filter(Q(ocr_text__isnull=True) | ~Q(ocr_text__image_url=F('image_url')))
+        if options['limit']:
+            questions = questions[:options['limit']]
+        questions = list(questions)
+        self.stdout.write(f"{len(questions)} soru görseli okunacak.")
+
+        session = requests.Session()
+        start = time.perf_counter()
+        indexed, failed = 0, 0
+
+        def read(question):
+            response = session.get(question.image_url, timeout=DOWNLOAD_TIMEOUT)
+            response.raise_for_status()
+            return read_text(response.content)
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [(question, executor.submit(read, question)) for question in questions]
+            for question, future in futures:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Soru {question.id} okunamadı: {e}")
+                    continue
+                index_question(question, text)
+                indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{indexed} soru {time.perf_counter() - start:.1f} saniyede indekslendi, {failed} soru okunamadı."
+        ))
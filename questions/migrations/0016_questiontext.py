@@ -0,0 +1,41 @@
+# Generated by Django 5.0.7 on 2026-10-18 14:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('image_url', models.URLField(max_length=255, verbose_name='Okunan Resim URL')),
+                ('text', models.TextField(blank=True, verbose_name='Metin')),
+                ('signature', models.JSONField(blank=True, default=list, verbose_name='MinHash İmzası')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Güncellenme Tarihi')),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ocr_text', to='questions.question', verbose_name='Soru')),
+            ],
+            options={
+                'verbose_name': 'Soru Metni',
+                'verbose_name_plural': 'Soru Metinleri',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuestionTextBand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True, verbose_name='Bant Anahtarı')),
+                ('question_text', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='questions.questiontext', verbose_name='Soru Metni')),
+            ],
+            options={
+                'verbose_name': 'Soru Metni Bandı',
+                'verbose_name_plural': 'Soru Metni Bantları',
+            },
+        ),
+    ]
@@ -63,3 +63,25 @@ class Question(models.Model):
         verbose_name = 'Soru'
         verbose_name_plural = 'Sorular'
         unique_together = ('exam_year', 'exam_type', 'subject', 'topic', 'question_number')
+
+class QuestionText(models.Model):
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, related_name='ocr_text', verbose_name="Soru")
+    image_url = models.URLField(max_length=255, verbose_name="Okunan Resim URL")
+    text = models.TextField(blank=True, verbose_name="Metin")
+    signature = models.JSONField(default=list, blank=True, verbose_name="MinHash İmzası")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+
+    def __str__(self):
+        return str(self.question)
+
+    class Meta:
+        verbose_name = 'Soru Metni'
+        verbose_name_plural = 'Soru Metinleri'
+
+class QuestionTextBand(models.Model):
+    question_text = models.ForeignKey(QuestionText, on_delete=models.CASCADE, related_name='bands', verbose_name="Soru Metni")
+    key = models.BigIntegerField(db_index=True, verbose_name="Bant Anahtarı")
+
+    class Meta:
+        verbose_name = 'Soru Metni Bandı'
+        verbose_name_plural = 'Soru Metni Bantları'
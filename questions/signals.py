@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from .models import ExamYear, ExamType, Subject, Topic, Question
+from utils.question_catalogue import clear_question_catalogue
+from utils.question_facets import clear_question_facets
+from utils.performance_tools import get_answering_user_ids, schedule_performance_rebuild
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def clear_question_catalogue_cache(sender, instance, **kwargs):
+    transaction.on_commit(clear_question_catalogue)
+    transaction.on_commit(clear_question_facets)
+
+@receiver(post_save, sender=ExamYear)
+@receiver(post_delete, sender=ExamYear)
+@receiver(post_save, sender=ExamType)
+@receiver(post_delete, sender=ExamType)
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=Topic)
+@receiver(post_delete, sender=Topic)
+def clear_question_facets_cache(sender, instance, **kwargs):
+    # Picker entries carry the year, exam type, subject and topic names
+    transaction.on_commit(clear_question_facets)
+
+@receiver(post_save, sender=Question)
+@receiver(pre_delete, sender=Question)
+def rebuild_answered_question_performance(sender, instance, **kwargs):
+    # Only the users who answered the question count it in their rollups, their statuses are read before a delete
+    # removes them. Bulk uploads rebuild every rollup, see questions.tasks.
+    if kwargs.get('created'):
+        return
+    user_ids = get_answering_user_ids(id=instance.pk)
+    transaction.on_commit(lambda: schedule_performance_rebuild(user_ids))
+
+@receiver(post_save, sender=Topic)
+def rebuild_topic_performance(sender, instance, created, **kwargs):
+    # A topic moved to another subject moves its questions' statuses between the topic rollups
+    if not created:
+        user_ids = get_answering_user_ids(topic_id=instance.pk)
+        transaction.on_commit(lambda: schedule_performance_rebuild(user_ids))
@@ -1,8 +1,249 @@
 from celery import shared_task
+from django.db import transaction
 from .models import ExamYear, ExamType, Subject, Topic, Question
 import pandas as pd
 from others.models import BulkUploadStatus
 from unidecode import unidecode
+from utils.question_catalogue import rebuild_question_catalogue
+from utils.question_facets import rebuild_question_facets
+from utils.performance_tools import schedule_performance_rebuild
+
+BULK_WRITE_BATCH_SIZE = 500  # Rows written per bulk query, progress is reported after every batch
+REQUIRED_FIELDS = ['exam_year', 'exam_type', 'subject', 'correct_answer', 'question_number']
+OPTIONAL_FIELDS = ['achievement_code', 'difficulty_level', 'image_url', 'video_solution_url']
+QUESTION_UPDATE_FIELDS = ['topic', 'correct_answer', 'difficulty_level', 'image_url', 'video_solution_url']
+URL_MAX_LENGTH = 255
+
+def clean_text(series):
+    """Stripped string values of a column, blank cells become NaN."""
+    values = series.map(lambda value: str(value).strip(), na_action='ignore')
+    return values.mask(values == '')
+
+def parse_integers(series):
+    """Whole numbers of a cleaned column, anything else becomes NaN."""
+    numbers = pd.to_numeric(series, errors='coerce')
+    return numbers.where(numbers == numbers.round())
+
+def normalize_name(name):
+    return unidecode(name).lower()
+
+def to_value(value):
+    """Converts pandas missing values to None."""
+    return None if pd.isna(value) else value
+
+def prepare_rows(df, form_data):
+    """Maps the uploaded columns to a frame with one cleaned column per question field."""
+    rows = pd.DataFrame(index=df.index)
+    for field in REQUIRED_FIELDS:
+        rows[field] = clean_text(df[form_data[field]])
+    for field in OPTIONAL_FIELDS:
+        column = form_data.get(field)
+        if form_data.get(f'skip_{field}') or not column:
+            rows[field] = pd.Series(float('nan'), index=df.index, dtype=object)
+        else:
+            rows[field] = clean_text(df[column])
+    return rows
+
+class UploadErrors:
+    """Collects row messages so they can be reported in row order, like the row by row import did."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.messages = []
+
+    def row_prefix(self, index):
+        row = self.rows.loc[index]
+        return f"Satır {index + 1}, {row['exam_type']} sınav türü, {row['exam_year']} sınav yılı, {row['subject']} dersi için:"
+
+    def add(self, index, message):
+        self.messages.append((index, f"{self.row_prefix(index)} {message}"))
+
+    def add_plain(self, index, message):
+        self.messages.append((index, f"Satır {index + 1}: {message}"))
+
+    def add_for_mask(self, mask, message):
+        for index in mask.index[mask]:
+            self.add(index, message)
+
+    def ordered(self):
+        return [message for _, message in sorted(self.messages, key=lambda item: item[0])]
+
+def validate_rows(rows, errors):
+    """Vectorised checks of the required fields. Returns the mask of rows that can be imported."""
+    valid = pd.Series(True, index=rows.index)
+    for field in REQUIRED_FIELDS:
+        missing = valid & rows[field].isna()
+        for index in missing.index[missing]:
+            errors.add_plain(index, f"'{field}' boş olamaz.")
+        valid &= ~missing
+
+    rows['exam_year_value'] = parse_integers(rows['exam_year'])
+    invalid = valid & ~(rows['exam_year_value'] >= 0)
+    errors.add_for_mask(invalid, "'Sınav Yılı' pozitif bir tam sayı olmalıdır.")
+    valid &= ~invalid
+
+    rows['question_number_value'] = parse_integers(rows['question_number'])
+    invalid = valid & ~(rows['question_number_value'] >= 0)
+    errors.add_for_mask(invalid, "'Soru Numarası' pozitif bir tam sayı olmalıdır.")
+    valid &= ~invalid
+    return valid
+
+def resolve_lookups(rows, valid, errors):
+    """
+    Resolves exam years, exam types and subjects for every row with one query per table
+    and links them the way the admin expects. Returns the updated mask of importable rows.
+    """
+    years = {int(year) for year in rows.loc[valid, 'exam_year_value']}
+    existing_years = set(ExamYear.objects.filter(year__in=years).values_list('year', flat=True))
+    ExamYear.objects.bulk_create([ExamYear(year=year) for year in years - existing_years], ignore_conflicts=True)
+    exam_year_ids = dict(ExamYear.objects.filter(year__in=years).values_list('year', 'id'))
+    rows['exam_year_id'] = rows['exam_year_value'].map(exam_year_ids)
+
+    exam_type_ids = dict(ExamType.objects.filter(name__in=set(rows.loc[valid, 'exam_type'])).values_list('name', 'id'))
+    rows['exam_type_id'] = rows['exam_type'].map(exam_type_ids)
+    missing = valid & rows['exam_type_id'].isna()
+    errors.add_for_mask(missing, "Sınav türü bulunamadı.")
+    valid &= ~missing
+
+    year_type_pairs = rows.loc[valid, ['exam_year_id', 'exam_type_id']].drop_duplicates()
+    YearTypeLink = ExamType.exam_years.through
+    YearTypeLink.objects.bulk_create([
+        YearTypeLink(examyear_id=int(exam_year_id), examtype_id=int(exam_type_id))
+        for exam_year_id, exam_type_id in year_type_pairs.itertuples(index=False)
+    ], ignore_conflicts=True)
+
+    subjects = {subject.name: subject for subject in Subject.objects.filter(name__in=set(rows.loc[valid, 'subject']))}
+    rows['subject_id'] = rows['subject'].map({name: subject.id for name, subject in subjects.items()})
+    missing = valid & rows['subject_id'].isna()
+    errors.add_for_mask(missing, "Ders bulunamadı.")
+    valid &= ~missing
+
+    type_subject_pairs = rows.loc[valid, ['exam_type_id', 'subject_id']].drop_duplicates()
+    TypeSubjectLink = Subject.exam_types.through
+    TypeSubjectLink.objects.bulk_create([
+        TypeSubjectLink(examtype_id=int(exam_type_id), subject_id=int(subject_id))
+        for exam_type_id, subject_id in type_subject_pairs.itertuples(index=False)
+    ], ignore_conflicts=True)
+
+    rows['subject_key'] = rows['subject_id'].map({subject.id: normalize_name(subject.name) for subject in subjects.values()})
+    return valid
+
+def resolve_topics(rows, valid, errors):
+    """Sets topic_id from the achievement code. Unknown codes or topics of another subject are skipped with a warning."""
+    codes = parse_integers(rows['achievement_code'])
+    topics = Topic.objects.filter(achievement_code__in={int(code) for code in codes[valid].dropna()}).select_related('subject')
+    topics = {topic.achievement_code: topic for topic in topics}
+
+    rows['topic_id'] = codes.map({code: topic.id for code, topic in topics.items()})
+    topic_subject_names = codes.map({code: topic.subject.name if topic.subject else '-' for code, topic in topics.items()})
+    topic_subject_keys = codes.map({code: normalize_name(topic.subject.name) if topic.subject else None for code, topic in topics.items()})
+
+    given = valid & rows['achievement_code'].notna()
+    not_found = given & rows['topic_id'].isna()
+    for index in not_found.index[not_found]:
+        errors.add(index, f"Konu bulunamadı: Kazanım Kodu {rows.at[index, 'achievement_code']}")
+
+    mismatched = given & rows['topic_id'].notna() & (topic_subject_keys != rows['subject_key'])
+    for index in mismatched.index[mismatched]:
+        errors.add(
+            index,
+            f"Kazanım Kodu {int(codes[index])} {rows.at[index, 'subject']} dersine ait değil. "
+            f"{topic_subject_names[index]} dersine ait. Konu atlanacak."
+        )
+    rows.loc[mismatched, 'topic_id'] = float('nan')
+
+def validate_optional_fields(rows, valid, errors):
+    """Checks difficulty levels, URL lengths and answers. Returns the updated mask of importable rows."""
+    rows['difficulty_level_value'] = parse_integers(rows['difficulty_level'])
+    invalid = valid & rows['difficulty_level'].notna() & ~rows['difficulty_level_value'].between(1, 10)
+    errors.add_for_mask(invalid, "'Zorluk Seviyesi' 1 ile 10 arasında sayısal olmalıdır.")
+    rows.loc[invalid, 'difficulty_level_value'] = float('nan')
+
+    for field, label in [('image_url', 'Resim URL'), ('video_solution_url', 'Video Çözüm URL')]:
+        too_long = valid & (rows[field].map(len, na_action='ignore') > URL_MAX_LENGTH)
+        errors.add_for_mask(too_long, f"'{label}' en fazla {URL_MAX_LENGTH} karakter olabilir.")
+        valid &= ~too_long
+
+    too_long = valid & (rows['correct_answer'].map(len, na_action='ignore') > 1)
+    errors.add_for_mask(too_long, "'Doğru Cevap' 1 karakter uzunluğunda olmalıdır.")
+    valid &= ~too_long
+    return valid
+
+def apply_row(question, row):
+    """Copies the non-empty values of a row onto an existing question."""
+    for field, value in [
+        ('topic_id', to_value(row.topic_id)),
+        ('correct_answer', row.correct_answer),
+        ('difficulty_level', to_value(row.difficulty_level_value)),
+        ('image_url', to_value(row.image_url)),
+        ('video_solution_url', to_value(row.video_solution_url)),
+    ]:
+        if value is not None and value != '':
+            setattr(question, field, int(value) if field in ('topic_id', 'difficulty_level') else value)
+
+def split_questions(rows, valid, errors):
+    """
+    Splits the rows into new and existing questions, matched on exam year, exam type, subject and question number.
+    Later rows for the same question update it, like they did when rows were saved one by one.
+    Returns (questions_to_create, questions_to_update) as lists of (question, row indexes).
+    """
+    rows = rows[valid]
+    existing = {}
+    for question in Question.objects.filter(
+        exam_year_id__in=set(rows['exam_year_id'].astype(int)),
+        exam_type_id__in=set(rows['exam_type_id'].astype(int)),
+        subject_id__in=set(rows['subject_id'].astype(int)),
+        question_number__in=set(rows['question_number_value'].astype(int)),
+    ):
+        key = (question.exam_year_id, question.exam_type_id, question.subject_id, question.question_number)
+        existing.setdefault(key, []).append(question)
+
+    to_create, to_update = {}, {}
+    for row in rows.itertuples():
+        key = (int(row.exam_year_id), int(row.exam_type_id), int(row.subject_id), int(row.question_number_value))
+        if key in to_create:
+            apply_row(to_create[key][0], row)
+            to_create[key][1].append(row.Index)
+        elif key in existing:
+            if len(existing[key]) > 1:
+                errors.add(row.Index, "Bir hata oluştu - Bu numarayla birden fazla soru bulundu.")
+                continue
+            question = existing[key][0]
+            apply_row(question, row)
+            to_update.setdefault(question.id, (question, []))[1].append(row.Index)
+        else:
+            question = Question(
+                exam_year_id=key[0],
+                exam_type_id=key[1],
+                subject_id=key[2],
+                question_number=key[3],
+                topic_id=None if pd.isna(row.topic_id) else int(row.topic_id),
+                correct_answer=row.correct_answer,
+                difficulty_level=None if pd.isna(row.difficulty_level_value) else int(row.difficulty_level_value),
+                image_url=to_value(row.image_url),
+                video_solution_url=to_value(row.video_solution_url),
+            )
+            to_create[key] = (question, [row.Index])
+    return list(to_create.values()), list(to_update.values())
+
+def write_in_batches(entries, write, errors, on_progress):
+    """
+    Writes (question, row indexes) entries in batches, each batch in its own transaction.
+    A failing batch is reported on its rows and skipped. Returns the entries that were written.
+    """
+    written = []
+    for start in range(0, len(entries), BULK_WRITE_BATCH_SIZE):
+        batch = entries[start:start + BULK_WRITE_BATCH_SIZE]
+        batch_rows = [index for _, indexes in batch for index in indexes]
+        try:
+            with transaction.atomic():
+                write([question for question, _ in batch])
+            written.extend(batch)
+        except Exception as e:
+            for index in batch_rows:
+                errors.add(index, f"Bir hata oluştu - {str(e)}")
+        on_progress(len(batch_rows))
+    return written
 
 @shared_task
 def process_bulk_upload_questions(df_data, form_data, user_id=None, task_type='questions'):
@@ -17,160 +258,51 @@ def process_bulk_upload_questions(df_data, form_data, user_id=None, task_type='q
 
     try:
         total_rows = len(df)
-        processed_rows = 0
-        created_questions = 0
-        updated_questions = 0
-        error_messages = []  # Collect all errors
-        success_messages = []  # Collect success messages
-
-        # Loop through each row in the data
-        for index, row in df.iterrows():
-            try:
-                # Check required fields
-                required_fields = ['exam_year', 'exam_type', 'subject', 'correct_answer', 'question_number']
-                skip_row = False
-                for field in required_fields:
-                    field_value = row[form_data[field]]
-                    if pd.isna(field_value) or str(field_value).strip() == '':
-                        error_messages.append(f"Satır {index + 1}: '{field}' boş olamaz.")
-                        skip_row = True
-                        break  # Skip if a required field is missing
-                if skip_row:
-                    continue  # Skip this row if any required field is invalid
-
-                # Map columns using form data
-                exam_year_value = int(str(row[form_data['exam_year']]).strip())
-                exam_type_name = str(row[form_data['exam_type']]).strip()
-                subject_name = str(row[form_data['subject']]).strip()
-                question_number = int(str(row[form_data['question_number']]).strip())
-                correct_answer = str(row[form_data['correct_answer']]).strip()
-
-                # Create or get ExamYear
-                exam_year, _ = ExamYear.objects.get_or_create(year=exam_year_value)
-
-                # Get or ensure ExamType exists
-                exam_type = ExamType.objects.get(name=exam_type_name)
-
-                # Ensure the ExamType is associated with the ExamYear
-                if not exam_year.exam_types.filter(id=exam_type.id).exists():
-                    exam_year.exam_types.add(exam_type)
-
-                # Get or ensure Subject exists
-                subject = Subject.objects.get(name=subject_name)
-
-                # Ensure the Subject is associated with the ExamType
-                if not exam_type.subjects.filter(id=subject.id).exists():
-                    exam_type.subjects.add(subject)
-
-                # Handle optional fields
-                topic = None
-                if not form_data['skip_achievement_code'] and form_data['achievement_code']:
-                    achievement_code_field = form_data['achievement_code']
-                    achievement_code_value = row[achievement_code_field]
-                    if not pd.isna(achievement_code_value) and str(achievement_code_value).strip() != '':
-                        try:
-                            achievement_code = int(str(achievement_code_value).strip())
-                            topic = Topic.objects.get(achievement_code=achievement_code)
-                            if unidecode(topic.subject.name).lower() != unidecode(subject.name).lower():
-                                error_messages.append(f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: Kazanım Kodu {achievement_code} {subject.name} dersine ait değil. {topic.subject.name} dersine ait. Konu atlanacak.")
-                                topic = None
-                        except (Topic.DoesNotExist, ValueError):
-                            error_messages.append(f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: Konu bulunamadı: Kazanım Kodu {achievement_code_value}")
-                            topic = None
-
-                # Handle difficulty_level
-                difficulty_level = None
-                if not form_data['skip_difficulty_level'] and form_data['difficulty_level']:
-                    difficulty_level_field = form_data['difficulty_level']
-                    difficulty_level_value = row[difficulty_level_field]
-                    if not pd.isna(difficulty_level_value) and str(difficulty_level_value).strip() != '':
-                        try:
-                            difficulty_level = int(difficulty_level_value)
-                        except (ValueError, TypeError):
-                            error_messages.append(f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: 'Zorluk Seviyesi' sayısal olmalıdır.")
-                            difficulty_level = None
-
-                # Handle image_url
-                image_url = None
-                if not form_data['skip_image_url'] and form_data['image_url']:
-                    image_url_field = form_data['image_url']
-                    image_url_value = row[image_url_field]
-                    if not pd.isna(image_url_value) and str(image_url_value).strip() != '':
-                        image_url = str(image_url_value).strip()
-
-                # Handle video_solution_url
-                video_solution_url = None
-
-                if not form_data['skip_video_solution_url'] and form_data['video_solution_url']:
-                    video_solution_url_field = form_data['video_solution_url']
-                    video_solution_url_value = row[video_solution_url_field]
-                    
-                    # Check if the value is not NaN and not an empty string
-                    if not pd.isna(video_solution_url_value) and str(video_solution_url_value).strip() != '':
-                        video_solution_url = str(video_solution_url_value).strip()
-
-                # Check if the correct_answer field is too long
-                if correct_answer and len(correct_answer) > 1:
-                    error_messages.append(f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: 'Doğru Cevap' 1 karakter uzunluğunda olmalıdır.")
-                    continue  # Skip this row
-
-                # Check if the question exists, if so, update; otherwise, create a new one
-                question, created = Question.objects.get_or_create(
-                    exam_year=exam_year,
-                    exam_type=exam_type,
-                    subject=subject,
-                    question_number=question_number,
-                    defaults={
-                        'topic': topic,
-                        'correct_answer': correct_answer,
-                        'difficulty_level': difficulty_level,
-                        'image_url': image_url,
-                        'video_solution_url': video_solution_url,
-                    }
-                )
-
-                if not created:
-                    # Update the existing question's fields
-                    if topic is not None and topic != '':
-                        question.topic = topic
-                    if correct_answer is not None and correct_answer != '':
-                        question.correct_answer = correct_answer
-                    if difficulty_level is not None and difficulty_level != '':
-                        question.difficulty_level = difficulty_level
-                    if image_url is not None and image_url != '':
-                        question.image_url = image_url
-                    if video_solution_url is not None and video_solution_url != '':
-                        question.video_solution_url = video_solution_url
-                    question.save()
-                    updated_questions += 1
-                else:
-                    created_questions += 1
-
-            except Exception as e:
-                # Log the error for this row
-                error_messages.append(f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: Bir hata oluştu - {str(e)}")
-                error_message = f"Satır {index + 1}, {exam_type} sınav türü, {exam_year} sınav yılı, {subject_name} dersi için: Bir hata oluştu - {str(e)}"
-                task_status.message = error_message
-                task_status.save()
-                continue  # Skip to the next row
-
-            # Update progress
-            processed_rows += 1
-            progress = int((processed_rows / total_rows) * 100)
-            task_status.progress = progress
+        rows = prepare_rows(df, form_data)
+        errors = UploadErrors(rows)
+
+        # Validate, resolve the lookup tables and split the rows into inserts and updates
+        valid = validate_rows(rows, errors)
+        valid = resolve_lookups(rows, valid, errors)
+        resolve_topics(rows, valid, errors)
+        valid = validate_optional_fields(rows, valid, errors)
+        to_create, to_update = split_questions(rows, valid, errors)
+
+        # Skipped rows are already processed, the rest is reported after every written batch
+        processed_rows = total_rows - sum(len(indexes) for _, indexes in to_create + to_update)
+
+        def report_progress(row_count):
+            nonlocal processed_rows
+            processed_rows += row_count
+            task_status.progress = int((processed_rows / total_rows) * 100)
             task_status.status = 'PROGRESS'
-            task_status.save()
+            task_status.save(update_fields=['progress', 'status', 'updated_at'])
+
+        created = write_in_batches(to_create, Question.objects.bulk_create, errors, report_progress)
+        updated = write_in_batches(
+            to_update, lambda questions: Question.objects.bulk_update(questions, QUESTION_UPDATE_FIELDS), errors, report_progress
+        )
+
+        # Repeated rows of a question count as updates, like they did when rows were saved one by one
+        created_questions = len(created)
+        updated_questions = sum(len(indexes) for _, indexes in created + updated) - created_questions
 
         # Update task status to SUCCESS
         task_status.status = 'SUCCESS'
         task_status.message = f"{created_questions} tane soru başarıyla oluşturuldu, {updated_questions} tane soru güncellendi. Yükleme geçmişi sayfasına giderek detayları görebilirsiniz."
-        success_messages.append(
+        success_messages = [
             f"{created_questions} tane soru başarıyla oluşturuldu, {updated_questions} tane soru güncellendi.\n"
-            f"Uyarılar ve Hatalar: \n" + "\n".join(error_messages)
-        )
+            f"Uyarılar ve Hatalar: \n" + "\n".join(errors.ordered())
+        ]
         task_status.progress = 100
         task_status.save()
 
+        # Warm the question catalogue and picker facets once instead of on the next request
+        rebuild_question_catalogue()
+        rebuild_question_facets()
+        # Bulk writes send no signals, the performance totals are rebuilt from the new catalogue here
+        schedule_performance_rebuild()
+
     except Exception as e:
         # Update task status to FAILURE
         task_status.status = 'FAILURE'
@@ -1,19 +1,24 @@
-from questions.models import ExamYear, Topic, Subject, ExamType, Question
-from serializers.question_serializers import ExamYearSerializer, SimpleExamTypeSerializer, SubjectSerializer, TopicSerializer, QuestionDetailSerializer
+from questions.models import Question
+from serializers.question_serializers import QuestionDetailSerializer
 from utils.api_responses import ApiResponse
+from utils.question_facets import get_question_facets, get_facet_etag, facet_not_modified, with_facet_etag
 from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 
+def parse_ids(value):
+    """Parses a comma separated id list such as '1,2,3'."""
+    return [int(item) for item in value.split(',')]
+
 class ExamYearList(APIView):
     def get(self, request, *args, **kwargs):
-        exam_years = ExamYear.objects.filter(
-            questions__isnull=False,
-            questions__image_url__isnull=False,
-            questions__topic__isnull=False
-        ).distinct().order_by('-year')
-        serializer = ExamYearSerializer(exam_years, many=True, context={'request': request})
-        return ApiResponse.Success(data=serializer.data)
+        facets = get_question_facets()
+        etag = get_facet_etag(request, facets)
+        not_modified = facet_not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        return with_facet_etag(ApiResponse.Success(data=facets.exam_years()), etag)
 
 class ExamTypeList(APIView):
     def get(self, request, *args, **kwargs):
@@ -21,17 +26,19 @@ class ExamTypeList(APIView):
         if not year_ids:
             return ApiResponse.BadRequest(message="year_ids gereklidir.")
 
-        year_ids = year_ids.split(',')
+        try:
+            year_ids = parse_ids(year_ids)
+        except ValueError:
+            return ApiResponse.BadRequest(message="Geçersiz year_ids.")
 
-        # Fetch all exam types that have questions in any of the selected years
-        exam_types = ExamType.objects.filter(
-            questions__exam_year__id__in=year_ids,
-            questions__image_url__isnull=False,
-            questions__topic__isnull=False
-        ).distinct().order_by('name')
+        facets = get_question_facets()
+        etag = get_facet_etag(request, facets)
+        not_modified = facet_not_modified(request, etag)
+        if not_modified:
+            return not_modified
 
-        serializer = SimpleExamTypeSerializer(exam_types, many=True, context={'request': request})
-        return ApiResponse.Success(data=serializer.data)
+        # Exam types that have questions in any of the selected years
+        return with_facet_etag(ApiResponse.Success(data=facets.exam_types(year_ids)), etag)
 
 class SubjectList(APIView):
     def get(self, request, *args, **kwargs):
@@ -41,19 +48,20 @@ class SubjectList(APIView):
         if not year_ids or not type_ids:
             return ApiResponse.BadRequest(message="year_ids ve type_ids gereklidir.")
 
-        year_ids = list(map(int, year_ids.split(',')))
-        type_ids = list(map(int, type_ids.split(',')))
+        try:
+            year_ids = parse_ids(year_ids)
+            type_ids = parse_ids(type_ids)
+        except ValueError:
+            return ApiResponse.BadRequest(message="Geçersiz year_ids veya type_ids.")
 
-        # Fetch all subjects that have questions in any of the selected years and exam types
-        subjects = Subject.objects.filter(
-            questions__exam_year__id__in=year_ids,
-            questions__exam_type__id__in=type_ids,
-            questions__topic__isnull=False,
-            questions__image_url__isnull=False
-        ).distinct().order_by('name')
+        facets = get_question_facets()
+        etag = get_facet_etag(request, facets)
+        not_modified = facet_not_modified(request, etag)
+        if not_modified:
+            return not_modified
 
-        serializer = SubjectSerializer(subjects, many=True, context={'request': request})
-        return ApiResponse.Success(data=serializer.data)
+        # Subjects that have questions in any of the selected years and exam types
+        return with_facet_etag(ApiResponse.Success(data=facets.subjects(year_ids, type_ids)), etag)
 
 class TopicList(APIView):
     def get(self, request, *args, **kwargs):
@@ -67,19 +75,20 @@ class TopicList(APIView):
         if not subject_id.isdigit():
             return ApiResponse.BadRequest(message="Tek ders seçilebilir.")
 
-        year_ids = list(map(int, year_ids.split(',')))
-        type_ids = list(map(int, type_ids.split(',')))
-
-        # Fetch all topics that have questions in any of the selected years, exam types, and subject
-        topics = Topic.objects.filter(
-            subject__id=subject_id,
-            questions__exam_year__id__in=year_ids,
-            questions__exam_type__id__in=type_ids,
-            questions__image_url__isnull=False
-        ).distinct().order_by('name')
-
-        serializer = TopicSerializer(topics, many=True, context={'request': request})
-        return ApiResponse.Success(data=serializer.data)
+        try:
+            year_ids = parse_ids(year_ids)
+            type_ids = parse_ids(type_ids)
+        except ValueError:
+            return ApiResponse.BadRequest(message="Geçersiz year_ids veya type_ids.")
+
+        facets = get_question_facets()
+        etag = get_facet_etag(request, facets)
+        not_modified = facet_not_modified(request, etag)
+        if not_modified:
+            return not_modified
+
+        # Topics of the subject that have questions in any of the selected years and exam types
+        return with_facet_etag(ApiResponse.Success(data=facets.topics(year_ids, type_ids, int(subject_id))), etag)
 
 class QuestionCodec:
     # Characters for our encoding (36 chars: 0-9, a-z)
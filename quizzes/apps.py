@@ -5,3 +5,6 @@ class QuizzesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'quizzes'
     verbose_name = 'Motivasyon Mesajları'
+
+    def ready(self):
+        from quizzes import signals
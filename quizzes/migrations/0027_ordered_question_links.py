@@ -0,0 +1,102 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def copy_links(old_through, parent_field, new_through, new_parent_field, order_by):
+    """Copies the rows of an auto-created M2M table into an ordered through table, numbering them per parent."""
+    links = []
+    current_parent_id, position = None, 0
+    rows = old_through.objects.order_by(f'{parent_field}_id', *order_by).values_list(f'{parent_field}_id', 'question_id')
+    for parent_id, question_id in rows.iterator():
+        if parent_id != current_parent_id:
+            current_parent_id, position = parent_id, 0
+        position += 1
+        links.append(new_through(**{f'{new_parent_field}_id': parent_id, 'question_id': question_id, 'position': position}))
+        if len(links) >= BATCH_SIZE:
+            new_through.objects.bulk_create(links)
+            links = []
+    new_through.objects.bulk_create(links)
+
+
+def copy_question_links(apps, schema_editor):
+    Quiz = apps.get_model('quizzes', 'Quiz')
+    QuestionDisplaySet = apps.get_model('quizzes', 'QuestionDisplaySet')
+
+    # Quizzes were read in the order their question rows were inserted, display sets by question id
+    copy_links(
+        Quiz._meta.get_field('questions').remote_field.through, 'quiz',
+        apps.get_model('quizzes', 'QuizQuestion'), 'quiz', ['id']
+    )
+    copy_links(
+        QuestionDisplaySet._meta.get_field('questions').remote_field.through, 'questiondisplayset',
+        apps.get_model('quizzes', 'QuestionDisplaySetQuestion'), 'display_set', ['question_id']
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        ('quizzes', '0026_multisubjectmotivationalmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionDisplaySetQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('display_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='quizzes.questiondisplayset')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='display_set_links', to='questions.question')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_links', to='questions.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_links', to='quizzes.quiz')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='questiondisplaysetquestion',
+            index=models.Index(fields=['display_set', 'position'], name='quizzes_que_display_33a8a2_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='questiondisplaysetquestion',
+            unique_together={('display_set', 'question')},
+        ),
+        migrations.AddIndex(
+            model_name='quizquestion',
+            index=models.Index(fields=['quiz', 'position'], name='quizzes_qui_quiz_id_8ac8c2_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='quizquestion',
+            unique_together={('quiz', 'question')},
+        ),
+        migrations.RunPython(copy_question_links, migrations.RunPython.noop),
+        # A through model cannot be added to an existing M2M field, so the field is recreated on the new table
+        migrations.RemoveField(
+            model_name='questiondisplayset',
+            name='questions',
+        ),
+        migrations.AddField(
+            model_name='questiondisplayset',
+            name='questions',
+            field=models.ManyToManyField(related_name='display_sets', through='quizzes.QuestionDisplaySetQuestion', to='questions.question'),
+        ),
+        migrations.RemoveField(
+            model_name='quiz',
+            name='questions',
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='questions',
+            field=models.ManyToManyField(related_name='quizzes', through='quizzes.QuizQuestion', to='questions.question'),
+        ),
+    ]
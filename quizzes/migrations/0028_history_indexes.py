@@ -0,0 +1,50 @@
+# Generated by Django 5.0.7 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_attempt_created_at(apps, schema_editor):
+    IncorrectQuestion = apps.get_model('quizzes', 'IncorrectQuestion')
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    IncorrectQuestion.objects.update(
+        created_at=Subquery(QuizAttempt.objects.filter(id=OuterRef('quiz_attempt_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0027_ordered_question_links'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='incorrectquestion',
+            options={'ordering': ['-created_at']},
+        ),
+        # Added as nullable first and filled from the attempt, so existing rows keep their attempt's time
+        migrations.AddField(
+            model_name='incorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_attempt_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='incorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='favoritequestion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizzes_fav_user_id_dc22d8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incorrectquestion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizzes_inc_user_id_c70844_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizzes_qui_user_id_79944a_idx'),
+        ),
+    ]
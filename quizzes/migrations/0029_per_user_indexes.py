@@ -0,0 +1,68 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:35
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_displaysetincorrectquestion_created_at(apps, schema_editor):
+    model = apps.get_model('quizzes', 'DisplaySetIncorrectQuestion')
+    attempt_model = apps.get_model('quizzes', 'DisplaySetAttempt')
+    model.objects.update(
+        created_at=Subquery(attempt_model.objects.filter(id=OuterRef('display_set_attempt_id')).values('created_at')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0015_alter_examtype_exam_years_alter_examtype_name_and_more'),
+        ('quizzes', '0028_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='displaysetincorrectquestion',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.AddField(
+            model_name='displaysetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_displaysetincorrectquestion_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='displaysetincorrectquestion',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='displaysetattempt',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizzes_dis_user_id_49dbb6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='displaysetattempt',
+            index=models.Index(fields=['display_set', 'user', '-created_at'], name='quizzes_dis_display_9816d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='displaysetincorrectquestion',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='quizzes_dis_user_id_64338d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incorrectquestion',
+            index=models.Index(fields=['user', 'question'], name='quizzes_inc_user_id_5e3448_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='questiondisplayset',
+            index=models.Index(fields=['created_by', '-created_at'], name='quizzes_que_created_ef5c62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'user', '-created_at'], name='quizzes_qui_quiz_id_4f6d8f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizgroup',
+            index=models.Index(fields=['created_by', '-created_at'], name='quizzes_qui_created_fe5feb_idx'),
+        ),
+    ]
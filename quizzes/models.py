@@ -17,6 +17,26 @@ class QuestionDisplaySetTopic(models.Model):
   class Meta:
     db_table = 'quizzes_questiondisplayset_topic'
 
+class QuizQuestion(models.Model):
+    """A question of a quiz with its 1-based position in the quiz."""
+    quiz = models.ForeignKey('Quiz', on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='quiz_links')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('quiz', 'question')
+        indexes = [models.Index(fields=['quiz', 'position'])]
+
+class QuestionDisplaySetQuestion(models.Model):
+    """A question of a display set with its 1-based position in the set."""
+    display_set = models.ForeignKey('QuestionDisplaySet', on_delete=models.CASCADE, related_name='question_links')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='display_set_links')
+    position = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('display_set', 'question')
+        indexes = [models.Index(fields=['display_set', 'position'])]
+
 class QuizGroup(models.Model):
     name = models.CharField(max_length=255)
     created_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='quiz_groups')
@@ -31,10 +51,11 @@ class QuizGroup(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_by', '-created_at'])]
 
 class QuestionDisplaySet(models.Model):
     name = models.CharField(max_length=255)
-    questions = models.ManyToManyField(Question, related_name='display_sets')
+    questions = models.ManyToManyField(Question, through='QuestionDisplaySetQuestion', related_name='display_sets')
     exam_years = models.ManyToManyField(ExamYear, related_name='display_sets')
     exam_types = models.ManyToManyField(ExamType, related_name='display_sets')
     subject = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, related_name='display_sets')
@@ -44,13 +65,14 @@ class QuestionDisplaySet(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [models.Index(fields=['created_by', '-created_at'])]
 
     def __str__(self):
         return f"{self.name}"
 
 class Quiz(models.Model):
     quiz_group = models.ForeignKey(QuizGroup, on_delete=models.CASCADE, related_name='quizzes')
-    questions = models.ManyToManyField(Question, related_name='quizzes')
+    questions = models.ManyToManyField(Question, through='QuizQuestion', related_name='quizzes')
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -73,6 +95,10 @@ class QuizAttempt(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),  # Newest-first history pages
+            models.Index(fields=['quiz', 'user', '-created_at']),  # Attempts of one quiz
+        ]
 
     def __str__(self):
         return f"Attempt by {self.user} on {self.quiz}"
@@ -85,9 +111,14 @@ class IncorrectQuestion(models.Model):
     user_time = models.FloatField(null=True, blank=True)
     quiz_attempt = models.ForeignKey(QuizAttempt, on_delete=models.CASCADE, related_name='incorrect_questions')
     question_order = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Copy of the attempt's time, so the list is ordered without a join
 
     class Meta:
-        ordering = ['-quiz_attempt__created_at']
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),  # Newest-first history pages
+            models.Index(fields=['user', 'question']),  # Subjects and topics with incorrect questions
+        ]
 
     def __str__(self):
         return f"Incorrect attempt by {self.user} for {self.question} in attempt {self.quiz_attempt.id}"
@@ -105,6 +136,10 @@ class DisplaySetAttempt(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id']),  # Newest-first history pages
+            models.Index(fields=['display_set', 'user', '-created_at']),  # Attempts of one display set
+        ]
 
     def __str__(self):
         return f"Attempt by {self.user} on {self.display_set}"
@@ -117,9 +152,11 @@ class DisplaySetIncorrectQuestion(models.Model):
     user_time = models.FloatField(null=True, blank=True)
     display_set_attempt = models.ForeignKey(DisplaySetAttempt, on_delete=models.CASCADE, related_name='incorrect_questions')
     question_order = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)  # Copy of the attempt's time, so the list is ordered without a join
 
     class Meta:
-        ordering = ['-display_set_attempt__created_at']
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at', '-id'])]  # Newest-first history pages
 
     def __str__(self):
         return f"Incorrect attempt by {self.user} for {self.question} in attempt {self.display_set_attempt.id}"
@@ -136,6 +173,7 @@ class FavoriteQuestion(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ('user', 'question')
+        indexes = [models.Index(fields=['user', '-created_at', '-id'])]  # Newest-first history pages
 
     def __str__(self):
         return f"Favorite by {self.user.email} - Question ID {self.question.id}"
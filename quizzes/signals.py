@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import MotivationalMessage, MultiSubjectMotivationalMessage
+from utils.motivational_messages import clear_motivational_catalogue
+
+@receiver(post_save, sender=MotivationalMessage)
+@receiver(post_delete, sender=MotivationalMessage)
+@receiver(post_save, sender=MultiSubjectMotivationalMessage)
+@receiver(post_delete, sender=MultiSubjectMotivationalMessage)
+def clear_motivational_catalogue_cache(sender, instance, **kwargs):
+    transaction.on_commit(clear_motivational_catalogue)
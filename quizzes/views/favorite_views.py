@@ -4,7 +4,9 @@ from rest_framework import generics
 from quizzes.models import FavoriteQuestion, Question, QuizAttempt, Subject, Topic
 from serializers.quiz_serializers import FavoriteQuestionSerializer
 from utils.api_responses import ApiResponse
-from pagination.custom_pagination import CustomPagination
+from pagination.keyset_pagination import CreatedAtCursorPagination
+from utils.ordered_questions import get_question_order
+from utils.prefetch_querysets import prefetch_favorite_questions
 
 class ToggleFavoriteQuestionView(APIView):
     permission_classes = [IsAuthenticated]
@@ -51,10 +53,8 @@ class ToggleFavoriteQuestionView(APIView):
             ):
                 return ApiResponse.BadRequest("Soru bu sınava ait değildir.")
 
-            questions = quiz_attempt.quiz.questions.all().values_list('id', flat=True)
-            try:
-                question_order = list(questions).index(question_id) + 1
-            except ValueError:
+            question_order = get_question_order(quiz_attempt.quiz, question_id)
+            if question_order is None:
                 return ApiResponse.BadRequest("Soru sınavda bulunamadı.")
 
             favorite = FavoriteQuestion.objects.create(
@@ -68,12 +68,12 @@ class ToggleFavoriteQuestionView(APIView):
 
 class FavoriteQuestionsListView(generics.ListAPIView):
     serializer_class = FavoriteQuestionSerializer
-    pagination_class = CustomPagination
+    pagination_class = CreatedAtCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = FavoriteQuestion.objects.filter(user=user)
+        queryset = prefetch_favorite_questions(FavoriteQuestion.objects.filter(user=user))
         
         subject_id = self.request.query_params.get('subject_id')
         topic_id = self.request.query_params.get('topic_id')
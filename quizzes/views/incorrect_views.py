@@ -1,20 +1,21 @@
 from serializers.quiz_serializers import IncorrectQuestionSerializer
-from pagination.custom_pagination import CustomPagination
+from pagination.keyset_pagination import CreatedAtCursorPagination
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 from quizzes.models import IncorrectQuestion
 from utils.api_responses import ApiResponse
 from quizzes.models import Subject, Topic
 from rest_framework.views import APIView
+from utils.prefetch_querysets import prefetch_incorrect_questions
 
 class IncorrectQuestionsListView(generics.ListAPIView):
     serializer_class = IncorrectQuestionSerializer
-    pagination_class = CustomPagination
+    pagination_class = CreatedAtCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = IncorrectQuestion.objects.filter(user=user)
+        queryset = prefetch_incorrect_questions(IncorrectQuestion.objects.filter(user=user))
 
         subject_id = self.request.query_params.get('subject_id')
         topic_id = self.request.query_params.get('topic_id')
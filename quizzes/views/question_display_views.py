@@ -8,7 +8,9 @@ from rest_framework.views import APIView
 from questions.models import Question
 from rest_framework import viewsets
 from pagination.custom_pagination import CustomPagination
-from serializers.quiz_serializers import QuestionDisplaySetSerializer, SimpleQuestionDisplaySetSerializer, DetailedQuizGroupSerializer, QuestionDetailSerializer
+from serializers.quiz_serializers import QuestionDisplaySetSerializer, SimpleQuestionDisplaySetSerializer, DetailedQuizGroupSerializer
+from utils.ordered_questions import ordered_questions, set_ordered_questions
+from utils.prefetch_querysets import prefetch_quiz_groups, prefetch_display_sets
 from itertools import chain
 import heapq
 
@@ -18,7 +20,7 @@ class QuestionDisplaySetViewSet(viewsets.ViewSet):
 
     def list(self, request):
         user = request.user
-        question_display_sets = QuestionDisplaySet.objects.filter(created_by=user)
+        question_display_sets = prefetch_display_sets(QuestionDisplaySet.objects.filter(created_by=user))
         page = self.paginator.paginate_queryset(question_display_sets, request)
         serializer = SimpleQuestionDisplaySetSerializer(page, many=True, context={'request': request})
         return self.paginator.get_paginated_response(serializer.data)
@@ -28,35 +30,22 @@ class QuestionDisplaySetViewSet(viewsets.ViewSet):
             return ApiResponse.BadRequest(message="Geçersiz id.")
 
         user = request.user
-        question_display_set = QuestionDisplaySet.objects.filter(pk=pk, created_by=user).first()
+        question_display_set = prefetch_display_sets(QuestionDisplaySet.objects.filter(pk=pk, created_by=user)).first()
 
         if not question_display_set:
             return ApiResponse.NotFound(message="Verilen id'ye uygun soru seti bulunamadı.")
 
-        # Get the related questions
-        questions = question_display_set.questions.all().order_by('id')
-
-        # Paginate the questions
+        # Paginate the questions in their stored order, only the requested page is loaded
+        questions = ordered_questions(question_display_set).select_related('exam_year', 'exam_type')
         paginated_questions = self.paginator.paginate_queryset(questions, request)
-        
-        # Calculate the starting index for the current page
-        page_number = int(request.query_params.get('page', 1))
-        page_size = int(request.query_params.get('page_size', self.paginator.page_size))
-        start_index = (page_number - 1) * page_size
-
-        # Prepare serialized data with correct question_order
-        serialized_questions = []
-        for idx, question in enumerate(paginated_questions, start=start_index + 1):  # Adjust starting index
-            question_data = QuestionDetailSerializer(question).data
-            question_data['question_order'] = idx  # Add question_order to the serialized data
-            serialized_questions.append(question_data)
-
-        # Serialize the display set without the questions
-        display_set_serializer = QuestionDisplaySetSerializer(question_display_set, context={'request': request})
-
-        # Combine the display set data with the paginated questions
+
+        # Serialize the display set with the paginated questions, numbered from the page's first position
+        display_set_serializer = QuestionDisplaySetSerializer(
+            question_display_set, context={'request': request, 'questions': paginated_questions}
+        )
         data = display_set_serializer.data
-        data['questions'] = serialized_questions
+        for question_order, question_data in enumerate(data['questions'], start=self.paginator.page.start_index()):
+            question_data['question_order'] = question_order
 
         return self.paginator.get_paginated_response(data)
 
@@ -94,7 +83,7 @@ class QuestionDisplaySetViewSet(viewsets.ViewSet):
         question_display_set.exam_years.set(year_ids)
         question_display_set.topic.set([topic_id])
         question_display_set.exam_types.set(type_ids)
-        question_display_set.questions.set(questions)
+        set_ordered_questions(question_display_set, questions.order_by('id').values_list('id', flat=True))
 
         serializer = QuestionDisplaySetSerializer(question_display_set, context={'request': request})
         return ApiResponse.Success(data=serializer.data)
@@ -113,8 +102,8 @@ class QuestionDisplaySetViewSet(viewsets.ViewSet):
 class LatestFourQuizGroupsAndDisplaySetsView(APIView):
     def get(self, request):
         # Fetch the latest 4 items from both QuizGroup and QuestionDisplaySet combined
-        latest_quiz_groups = QuizGroup.objects.annotate(type=V('quiz_group', output_field=CharField())).order_by('-created_at')[:4]
-        latest_display_sets = QuestionDisplaySet.objects.annotate(type=V('display_set', output_field=CharField())).order_by('-created_at')[:4]
+        latest_quiz_groups = prefetch_quiz_groups(QuizGroup.objects.all()).annotate(type=V('quiz_group', output_field=CharField())).order_by('-created_at')[:4]
+        latest_display_sets = prefetch_display_sets(QuestionDisplaySet.objects.all()).annotate(type=V('display_set', output_field=CharField())).order_by('-created_at')[:4]
 
         # Combine the two querysets and order them by created_at to get the latest 4 overall
         combined_results = heapq.nlargest(4, chain(latest_quiz_groups, latest_display_sets), key=lambda x: x.created_at)
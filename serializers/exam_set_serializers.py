@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from questions.models import ExamYear, ExamType, Subject, Topic
 from exam_sets.models import ExamSet, UserExamConfiguration, ExamSetQuiz, ExamSetQuizGroup, ExamSetDisplaySet, ExamSetQuizAttempt, ExamSetDisplaySetAttempt
-from serializers.quiz_serializers import ExamYearSerializer, SimpleExamTypeSerializer, SubjectSerializer, SimpleTopicSerializer, QuestionDetailSerializer, MediumQuizSerializer
-from quizzes.models import FavoriteQuestion, Quiz
+from serializers.quiz_serializers import ExamYearSerializer, SimpleExamTypeSerializer, SubjectSerializer, SimpleTopicSerializer, QuestionDetailSerializer, OrderedQuestionsField, MediumQuizSerializer, serialize_topics, count_questions
+from quizzes.models import Quiz
+from utils.favorite_tools import get_favorite_resolver, get_serialized_instances
 
 class ExamSetSerializer(serializers.ModelSerializer):
     exam_years = ExamYearSerializer(many=True, read_only=True)
@@ -74,7 +75,7 @@ class ExamSetQuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'total_questions']
 
     def get_total_questions(self, obj):
-        return obj.questions.count()
+        return count_questions(obj)
 
 class SimpleExamSetQuizGroupSerializer(serializers.ModelSerializer):
     quizzes = ExamSetQuizSerializer(many=True, read_only=True)
@@ -94,21 +95,10 @@ class ExamSetDisplaySetSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'exam_years', 'exam_types', 'subjects', 'topic', 'created_at']
 
     def get_topic(self, obj):
-        topics = obj.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.topic.all(), self.context)
     
 class DetailedExamSetDisplaySetSerializer(serializers.ModelSerializer):
-    questions = QuestionDetailSerializer(many=True, read_only=True)
+    questions = OrderedQuestionsField()
     exam_years = ExamYearSerializer(many=True, read_only=True)
     exam_types = SimpleExamTypeSerializer(many=True, read_only=True)
     subjects = SubjectSerializer(source='ordered_subjects', many=True, read_only=True)
@@ -119,21 +109,10 @@ class DetailedExamSetDisplaySetSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'exam_years', 'exam_types', 'subjects', 'topic', 'questions', 'created_at']
 
     def get_topic(self, obj):
-        topics = obj.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.topic.all(), self.context)
 
 class DetailedExamSetQuizSerializer(serializers.ModelSerializer):
-    questions = QuestionDetailSerializer(many=True, read_only=True)
+    questions = OrderedQuestionsField()
     exam_years = ExamYearSerializer(many=True, read_only=True, source='quiz_group.exam_years')
     exam_types = SimpleExamTypeSerializer(many=True, read_only=True, source='quiz_group.exam_types')
     subjects = SubjectSerializer(source='ordered_subjects', many=True, read_only=True)
@@ -144,19 +123,9 @@ class DetailedExamSetQuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'created_at', 'exam_years', 'exam_types', 'subjects', 'topic', 'questions']
  
     def get_topic(self, obj):
-        if obj.quiz_group:
-            topics = obj.quiz_group.topic.all()
-            count = topics.count()
-            
-            # Check if there's a request parameter to force list format
-            request = self.context.get('request')
-            force_list = request and request.query_params.get('format_topics') == 'list'
-            
-            if count == 1 and not force_list:
-                return SimpleTopicSerializer(topics.first(), many=False).data
-            elif count >= 1:
-                return SimpleTopicSerializer(topics, many=True).data
-        return None
+        if not obj.quiz_group:
+            return None
+        return serialize_topics(obj.quiz_group.topic.all(), self.context)
 
 class MediumExamSetQuizSerializer(serializers.ModelSerializer):
     exam_years = ExamYearSerializer(many=True, read_only=True, source='quiz_group.exam_years')
@@ -171,19 +140,7 @@ class MediumExamSetQuizSerializer(serializers.ModelSerializer):
     def get_topic(self, obj):
         if not obj.quiz_group:
             return None
-        
-        topics = obj.quiz_group.topic.all()
-        count = topics.count()
-    
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.quiz_group.topic.all(), self.context)
 
 class ExamSetQuizAttemptSummarySerializer(serializers.ModelSerializer):
     quiz_details = MediumExamSetQuizSerializer(source='quiz', read_only=True)
@@ -210,7 +167,7 @@ class DetailedExamSetQuizAttemptSerializer(serializers.ModelSerializer):
         fields = ['id', 'quiz', 'exam_years', 'exam_types', 'subjects', 'topic', 'success_rate', 'details', 'correct_count', 'incorrect_count', 'unanswered_count', 'motivational_message', 'created_at']  # Changed subject to ordered_subjects
     
     def get_quiz(self, obj):
-        return {'id': obj.quiz.id, 'total_questions': obj.quiz.questions.count()}
+        return {'id': obj.quiz.id, 'total_questions': count_questions(obj.quiz)}
     
     def get_exam_years(self, obj):
         return ExamYearSerializer(obj.quiz.quiz_group.exam_years.all(), many=True).data
@@ -224,33 +181,19 @@ class DetailedExamSetQuizAttemptSerializer(serializers.ModelSerializer):
         return []
     
     def get_topic(self, obj):
-        topics = obj.quiz.quiz_group.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.quiz.quiz_group.topic.all(), self.context)
 
     def get_details(self, obj):
         answers = obj.details.get('answers', [])
-        user = obj.user
 
         # Sort the answers by question_order
         answers = sorted(answers, key=lambda x: x.get('question_order', 0))
 
-        for answer in answers:
-            question_id = answer.get('question_id')
-            is_favorite = FavoriteQuestion.objects.filter(
-                user=user,
-                question_id=question_id
-            ).exists()
-            answer['is_favorite'] = is_favorite
+        # Resolve favorites for every attempt on the page with a single query
+        resolver = get_favorite_resolver(self.context, obj.user_id)
+        for attempt in get_serialized_instances(self, obj):
+            resolver.prefetch_answers(attempt.details.get('answers', []))
+        resolver.annotate_answers(answers)
 
         return {
             'answers': answers
@@ -265,24 +208,16 @@ class ExamSetDisplaySetAttemptSummarySerializer(serializers.ModelSerializer):
         fields = ['id', 'display_set_details', 'success_rate', 'correct_count', 'incorrect_count', 'unanswered_count', 'motivational_message', 'created_at']
 
     def get_display_set_details(self, obj):
+        subjects = list(obj.display_set.subjects.all())
         return {
             'id': obj.display_set.id,
             'name': obj.display_set.name,
             'created_at': obj.display_set.created_at,
             'exam_years': ExamYearSerializer(obj.display_set.exam_years.all(), many=True).data,
             'exam_types': SimpleExamTypeSerializer(obj.display_set.exam_types.all(), many=True).data,
-            'subject': SubjectSerializer(obj.display_set.ordered_subjects.first()).data if obj.display_set.ordered_subjects.exists() else None,
-            'topic': self._get_topics_data(obj.display_set)
+            'subject': SubjectSerializer(subjects[0]).data if subjects else None,
+            'topic': serialize_topics(obj.display_set.topic.all(), self.context)
         }
-    
-    def _get_topics_data(self, display_set):
-        topics = display_set.topic.all()
-        count = topics.count()
-        if count == 1:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count > 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
 
 class DetailedExamSetDisplaySetAttemptSerializer(serializers.ModelSerializer):
     display_set = serializers.SerializerMethodField()
@@ -311,33 +246,19 @@ class DetailedExamSetDisplaySetAttemptSerializer(serializers.ModelSerializer):
         return []
 
     def get_topic(self, obj):
-        topics = obj.display_set.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.display_set.topic.all(), self.context)
 
     def get_details(self, obj):
         answers = obj.details.get('answers', [])
-        user = obj.user
 
         # Sort the answers by question_order
         answers = sorted(answers, key=lambda x: x.get('question_order', 0))
 
-        for answer in answers:
-            question_id = answer.get('question_id')
-            is_favorite = FavoriteQuestion.objects.filter(
-                user=user,
-                question_id=question_id
-            ).exists()
-            answer['is_favorite'] = is_favorite
+        # Resolve favorites for every attempt on the page with a single query
+        resolver = get_favorite_resolver(self.context, obj.user_id)
+        for attempt in get_serialized_instances(self, obj):
+            resolver.prefetch_answers(attempt.details.get('answers', []))
+        resolver.annotate_answers(answers)
 
         return {
             'answers': answers
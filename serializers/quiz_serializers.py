@@ -2,6 +2,8 @@ from rest_framework import serializers
 from quizzes.models import QuizGroup, Quiz, QuizAttempt, IncorrectQuestion, FavoriteQuestion, QuestionDisplaySet
 from questions.models import Question
 from serializers.question_serializers import SimpleExamTypeSerializer, ExamYearSerializer, SubjectSerializer, SimpleTopicSerializer
+from utils.favorite_tools import get_favorite_resolver, get_serialized_instances
+from utils.ordered_questions import ordered_questions
 
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,6 +18,45 @@ class QuestionDetailSerializer(serializers.ModelSerializer):
         model = Question
         fields = ['id', 'correct_answer', 'difficulty_level', 'image_url', 'video_solution_url', 'exam_year', 'exam_type']
 
+class OrderedQuestionsField(serializers.Field):
+    """
+    Questions of a quiz or display set in their stored order.
+    Views that paginate the questions pass the page as context['questions'] so only that page is serialized.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, obj):
+        questions = self.context.get('questions')
+        if questions is None:
+            questions = ordered_questions(obj).select_related('exam_year', 'exam_type')
+        return QuestionDetailSerializer(questions, many=True, context=self.context).data
+
+def serialize_topics(topics, context):
+    """
+    Serializes the topics of a quiz group or display set: a single topic as an object, several as a list.
+    ?format_topics=list always returns a list. Works on the prefetched topics, so it adds no queries.
+    """
+    topics = list(topics)
+    request = context.get('request')
+    force_list = request and request.query_params.get('format_topics') == 'list'
+
+    if len(topics) == 1 and not force_list:
+        return SimpleTopicSerializer(topics[0], many=False).data
+    elif topics:
+        return SimpleTopicSerializer(topics, many=True).data
+    return None
+
+def count_questions(quiz):
+    """Question count of a quiz, read from the question_count annotation when the queryset has it."""
+    question_count = getattr(quiz, 'question_count', None)
+    if question_count is None:
+        return quiz.questions.count()
+    return question_count
+
 class QuestionFullDetailSerializer(serializers.ModelSerializer):
     exam_year = ExamYearSerializer(read_only=True)
     exam_type = SimpleExamTypeSerializer(read_only=True)
@@ -34,10 +75,10 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'total_questions']
 
     def get_total_questions(self, obj):
-        return obj.questions.count()
+        return count_questions(obj)
 
 class DetailedQuizSerializer(serializers.ModelSerializer):
-    questions = QuestionDetailSerializer(many=True, read_only=True)
+    questions = OrderedQuestionsField()
     exam_years = ExamYearSerializer(many=True, read_only=True, source='quiz_group.exam_years')
     exam_types = SimpleExamTypeSerializer(many=True, read_only=True, source='quiz_group.exam_types')
     subject = SubjectSerializer(read_only=True, source='quiz_group.subject')
@@ -48,20 +89,9 @@ class DetailedQuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'created_at', 'exam_years', 'exam_types', 'subject', 'topic', 'questions']
 
     def get_topic(self, obj):
-        if obj.quiz_group:
-            topics = obj.quiz_group.topic.all()
-            count = topics.count()
-            
-            # Check if there's a request parameter to force list format
-            request = self.context.get('request')
-            force_list = request and request.query_params.get('format_topics') == 'list'
-            
-            if count == 1 and not force_list:
-                return SimpleTopicSerializer(topics.first(), many=False).data
-            elif count >= 1:
-                return SimpleTopicSerializer(topics, many=True).data
-        # Return None if quiz_group is None or has no topics
-        return None
+        if not obj.quiz_group:
+            return None
+        return serialize_topics(obj.quiz_group.topic.all(), self.context)
 
 class MediumQuizSerializer(serializers.ModelSerializer):
     exam_years = ExamYearSerializer(many=True, read_only=True, source='quiz_group.exam_years')
@@ -74,21 +104,9 @@ class MediumQuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'created_at', 'exam_years', 'exam_types', 'subject', 'topic']
 
     def get_topic(self, obj):
-        # Add a check here:
-        if obj.quiz_group:
-            topics = obj.quiz_group.topic.all()
-            count = topics.count()
-            
-            # Check if there's a request parameter to force list format
-            request = self.context.get('request')
-            force_list = request and request.query_params.get('format_topics') == 'list'
-            
-            if count == 1 and not force_list:
-                return SimpleTopicSerializer(topics.first(), many=False).data
-            elif count >= 1:
-                return SimpleTopicSerializer(topics, many=True).data
-        # Return None if quiz_group is None or has no topics
-        return None
+        if not obj.quiz_group:
+            return None
+        return serialize_topics(obj.quiz_group.topic.all(), self.context)
 
 class DetailedQuizGroupSerializer(serializers.ModelSerializer):
     quizzes = QuizSerializer(many=True, read_only=True)
@@ -102,18 +120,7 @@ class DetailedQuizGroupSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'exam_years', 'exam_types', 'subject', 'topic', 'created_at', 'quizzes']
 
     def get_topic(self, obj):
-        topics = obj.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.topic.all(), self.context)
 
 class SimpleQuizGroupSerializer(serializers.ModelSerializer):
     quizzes = QuizSerializer(many=True, read_only=True)
@@ -159,30 +166,16 @@ class DetailedQuizAttemptSerializer(serializers.ModelSerializer):
         return SubjectSerializer(obj.quiz.quiz_group.subject).data
 
     def get_topic(self, obj):
-        topics = obj.quiz.quiz_group.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.quiz.quiz_group.topic.all(), self.context)
 
     def get_details(self, obj):
         answers = obj.details.get('answers', [])
-        user = obj.user
 
-        for answer in answers:
-            question_id = answer.get('question_id')
-            is_favorite = FavoriteQuestion.objects.filter(
-                user=user,
-                question_id=question_id
-            ).exists()
-            answer['is_favorite'] = is_favorite
+        # Resolve favorites for every attempt on the page with a single query
+        resolver = get_favorite_resolver(self.context, obj.user_id)
+        for attempt in get_serialized_instances(self, obj):
+            resolver.prefetch_answers(attempt.details.get('answers', []))
+        resolver.annotate_answers(answers)
 
         return {
             'answers': answers
@@ -199,7 +192,9 @@ class IncorrectQuestionSerializer(serializers.ModelSerializer):
 
     def get_is_favorite(self, obj):
         user = self.context['request'].user
-        return FavoriteQuestion.objects.filter(user=user, question=obj.question).exists()
+        resolver = get_favorite_resolver(self.context, user.id)
+        resolver.prefetch(incorrect_question.question_id for incorrect_question in get_serialized_instances(self, obj))
+        return resolver.is_favorite(obj.question_id)
 
 class FavoriteQuestionSerializer(serializers.ModelSerializer):
     question = QuestionFullDetailSerializer(read_only=True)
@@ -209,7 +204,7 @@ class FavoriteQuestionSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'question_order', 'created_at']
 
 class QuestionDisplaySetSerializer(serializers.ModelSerializer):
-    questions = QuestionDetailSerializer(many=True, read_only=True)
+    questions = OrderedQuestionsField()
     exam_years = ExamYearSerializer(many=True, read_only=True)
     exam_types = SimpleExamTypeSerializer(many=True, read_only=True)
     subject = SubjectSerializer(read_only=True)
@@ -220,18 +215,7 @@ class QuestionDisplaySetSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'exam_years', 'exam_types', 'subject', 'topic', 'questions', 'created_at']
 
     def get_topic(self, obj):
-        topics = obj.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.topic.all(), self.context)
 
 class SimpleQuestionDisplaySetSerializer(serializers.ModelSerializer):
     exam_years = ExamYearSerializer(many=True, read_only=True)
@@ -244,18 +228,7 @@ class SimpleQuestionDisplaySetSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'exam_years', 'exam_types', 'subject', 'topic', 'created_at']
 
     def get_topic(self, obj):
-        topics = obj.topic.all()
-        count = topics.count()
-        
-        # Check if there's a request parameter to force list format
-        request = self.context.get('request')
-        force_list = request and request.query_params.get('format_topics') == 'list'
-        
-        if count == 1 and not force_list:
-            return SimpleTopicSerializer(topics.first(), many=False).data
-        elif count >= 1:
-            return SimpleTopicSerializer(topics, many=True).data
-        return None
+        return serialize_topics(obj.topic.all(), self.context)
 
 class QuizGroupSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,180 @@
+"""
+Gateway for the OpenAI Chat Completions API, used by utils.ai_utils.call_openai_chat.
+
+- One OpenAI client per process with a keep-alive connection pool, over HTTP/2 when the h2 package is installed.
+- Every call has a timeout and is retried with exponential backoff on connection errors, 429 and 5xx responses.
+- At most AI_MAX_CONCURRENT_REQUESTS calls per process run at once in a bounded thread pool. Further calls wait
+  for a slot up to AI_REQUEST_TIMEOUT seconds and then fail, so a slow upstream cannot hold every server thread.
+- Answers are cached for AI_CACHE_TTL seconds under a hash of the model, the system prompt and the normalised
+  user message, so repeated questions are answered without calling the API.
+- stream_chat_completion yields the answer piece by piece as the model generates it. A stream holds its slot
+  until it ends and is closed when the caller stops reading, so the API stops generating for a gone client.
+
+The API address is taken from OPENAI_BASE_URL, point it at a local stub server to test without OpenAI.
+"""
+import hashlib
+import logging
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from openai import OpenAI
+
+try:
+    import h2  # noqa: F401, enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger('django')
+
+CACHE_KEY_PREFIX = 'ai_chat'
+MAX_RETRY_DELAY = 8  # Longest backoff of the OpenAI client between two attempts, in seconds
+WHITESPACE_REGEX = re.compile(r'\s+')
+
+_client = None
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+class AIGatewayBusy(RuntimeError):
+    """Raised when no slot of the gateway frees up or the call does not finish in time."""
+
+def get_client():
+    """The shared OpenAI client of the process, created on first use."""
+    global _client
+    with _lock:
+        if _client is None:
+            if not settings.OPENAI_API_KEY:
+                logger.warning("OPENAI_API_KEY environment variable not set.")
+            http_client = httpx.Client(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONCURRENT_REQUESTS,
+                    max_keepalive_connections=settings.AI_MAX_CONCURRENT_REQUESTS,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(settings.AI_REQUEST_TIMEOUT, connect=5),
+            )
+            _client = OpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_BASE_URL,
+                max_retries=settings.AI_MAX_RETRIES,  # Exponential backoff from 0.5 to MAX_RETRY_DELAY seconds, honours Retry-After
+                http_client=http_client,
+            )
+        return _client
+
+def get_executor():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.AI_MAX_CONCURRENT_REQUESTS, thread_name_prefix='ai-gateway')
+            _slots = threading.BoundedSemaphore(settings.AI_MAX_CONCURRENT_REQUESTS)
+        return _executor, _slots
+
+@receiver(setting_changed)
+def reset_gateway(setting, **kwargs):
+    """Builds the client and the pool again with the new values when a test overrides a gateway setting."""
+    global _client, _executor, _slots
+    if setting.startswith(('AI_', 'OPENAI_')):
+        with _lock:
+            _client = _executor = _slots = None
+
+def normalize_message(message):
+    """
+    Unicode normalised, lower case text with single spaces, so trivially different questions share a cache entry.
+    İ and I are lowered the Turkish way, str.lower() would turn İ into i with a combining dot.
+    """
+    message = unicodedata.normalize('NFKC', message).replace('İ', 'i').replace('I', 'ı').lower()
+    return WHITESPACE_REGEX.sub(' ', message).strip()
+
+def get_cache_key(model, system_prompt, user_message):
+    system_prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    digest = hashlib.sha256('\0'.join([model, system_prompt_hash, normalize_message(user_message)]).encode()).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{digest}'
+
+def create_chat_completion(system_prompt, user_message, model, max_tokens):
+    """
+    Returns the answer of the model, from the cache when the same question was answered within AI_CACHE_TTL.
+    Raises OpenAIError when the API call fails after its retries and AIGatewayBusy when no slot frees up in time.
+    """
+    cache_key = get_cache_key(model, system_prompt, user_message)
+    content = cache.get(cache_key)
+    if content is not None:
+        return content
+
+    executor, slots = get_executor()
+    # A slot is held until the call finishes, also when the caller stopped waiting for it
+    if not slots.acquire(timeout=settings.AI_REQUEST_TIMEOUT):
+        raise AIGatewayBusy("Yapay zeka servisi şu anda yoğun, lütfen daha sonra tekrar deneyin.")
+    try:
+        future = executor.submit(
+            get_client().chat.completions.create,
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            max_tokens=max_tokens,
+        )
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+
+    # Every attempt of the client has its own timeout, the extra second lets the client raise it first
+    deadline = settings.AI_REQUEST_TIMEOUT * (settings.AI_MAX_RETRIES + 1) + MAX_RETRY_DELAY * settings.AI_MAX_RETRIES + 1
+    try:
+        completion = future.result(timeout=deadline)
+    except FutureTimeoutError:
+        raise AIGatewayBusy("Yapay zeka servisi zamanında yanıt vermedi, lütfen daha sonra tekrar deneyin.")
+
+    content = completion.choices[0].message.content
+    if content is not None:
+        cache.set(cache_key, content, timeout=settings.AI_CACHE_TTL)
+    return content
+
+def stream_chat_completion(system_prompt, user_message, model, max_tokens):
+    """
+    Yields the answer of the model in pieces as they arrive, a cached answer in one piece.
+    Runs in the calling thread, closing the generator closes the connection to the API.
+    Raises OpenAIError when the API call fails after its retries and AIGatewayBusy when no slot frees up in time.
+    """
+    cache_key = get_cache_key(model, system_prompt, user_message)
+    content = cache.get(cache_key)
+    if content is not None:
+        yield content
+        return
+
+    _, slots = get_executor()
+    if not slots.acquire(timeout=settings.AI_REQUEST_TIMEOUT):
+        raise AIGatewayBusy("Yapay zeka servisi şu anda yoğun, lütfen daha sonra tekrar deneyin.")
+    try:
+        stream = get_client().chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        pieces, finished = [], False
+        with stream:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                if choice.delta.content:
+                    pieces.append(choice.delta.content)
+                    yield choice.delta.content
+                finished = finished or choice.finish_reason is not None
+        if finished:
+            cache.set(cache_key, ''.join(pieces), timeout=settings.AI_CACHE_TTL)
+    finally:
+        slots.release()
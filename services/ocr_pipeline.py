@@ -0,0 +1,151 @@
+"""
+OCR of uploaded question photos, used by utils.ai_utils.extract_text_from_image.
+
+1. Results are cached for OCR_CACHE_TTL seconds under the SHA-256 of the upload, so the same file is read once.
+2. The photo is turned upright, greyscaled and downscaled to at most OCR_MAX_DIMENSION pixels, then hashed with
+   a 1024 bit difference hash. The hash is split into bands that index it in the cache, a cached photo with
+   a band in common and at most MAX_HASH_DISTANCE different bits is a re-encoded or resized copy and its text is
+   reused. Copies measure a few bits apart while different question pages differ in about 200 bits.
+3. The image is binarised with Otsu's threshold and read by Tesseract. At most OCR_MAX_WORKERS images are read at
+   once, with persistent tesserocr engines when the package is installed and a pytesseract subprocess otherwise.
+"""
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Tesseract starts one OpenMP thread per core for every image, which slows down concurrent reads
+os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+
+OCR_LANGUAGE = 'tur'
+DHASH_SIZE = 32  # 32 x 32 gradients, 1024 bits
+DHASH_MARGIN = 4  # Smaller brightness steps count as flat, so compression noise on the paper does not flip bits
+DHASH_BANDS = 16  # 64 bit bands, a copy that differs in up to 15 bits still shares a band
+MAX_HASH_DISTANCE = 64
+BAND_CANDIDATES = 4  # Hashes kept per band, the most recent first
+EXACT_CACHE_PREFIX = 'ocr:sha256'
+BAND_CACHE_PREFIX = 'ocr:dhash_band'
+PERCEPTUAL_CACHE_PREFIX = 'ocr:dhash'
+
+_executor = None
+_engines = threading.local()  # One tesserocr engine per pool thread
+_lock = threading.Lock()
+
+@receiver(setting_changed)
+def reset_pool(setting, **kwargs):
+    global _executor
+    if setting == 'OCR_MAX_WORKERS':
+        with _lock:
+            _executor = None
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.OCR_MAX_WORKERS, thread_name_prefix='ocr')
+        return _executor
+
+def prepare_image(image):
+    """Upright greyscale copy of the photo, downscaled so its longer side is at most OCR_MAX_DIMENSION pixels."""
+    image = ImageOps.exif_transpose(image).convert('L')
+    image.thumbnail((settings.OCR_MAX_DIMENSION, settings.OCR_MAX_DIMENSION), Image.Resampling.LANCZOS)
+    return image
+
+def binarize(image):
+    """Black text on white from a greyscale image, split at the threshold of Otsu's method."""
+    histogram = image.histogram()
+    total = sum(histogram)
+    weighted_total = sum(value * count for value, count in enumerate(histogram))
+    background_count, background_sum = 0, 0
+    best_threshold, best_variance = 127, -1
+    for threshold, count in enumerate(histogram):
+        background_count += count
+        if background_count == 0:
+            continue
+        foreground_count = total - background_count
+        if foreground_count == 0:
+            break
+        background_sum += threshold * count
+        background_mean = background_sum / background_count
+        foreground_mean = (weighted_total - background_sum) / foreground_count
+        variance = background_count * foreground_count * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+    return image.point([0 if value <= best_threshold else 255 for value in range(256)], 'L')
+
+def difference_hash(image):
+    """Horizontal brightness gradients of a DHASH_SIZE grid as an integer, nearly equal for resized and re-encoded copies."""
+    pixels = list(image.resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.LANCZOS).getdata())
+    bits = 0
+    for row in range(DHASH_SIZE):
+        offset = row * (DHASH_SIZE + 1)
+        for column in range(DHASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + column] - pixels[offset + column + 1] > DHASH_MARGIN)
+    return bits
+
+def get_band_keys(image_hash):
+    band_bits = DHASH_SIZE * DHASH_SIZE // DHASH_BANDS
+    mask = (1 << band_bits) - 1
+    return [f'{BAND_CACHE_PREFIX}:{band}:{(image_hash >> (band * band_bits)) & mask:x}' for band in range(DHASH_BANDS)]
+
+def get_text_key(image_hash):
+    return f'{PERCEPTUAL_CACHE_PREFIX}:{hashlib.sha256(str(image_hash).encode()).hexdigest()}'
+
+def find_similar_text(image_hash):
+    """Text of the closest cached photo that shares a band with the hash and is at most MAX_HASH_DISTANCE bits apart."""
+    candidates = {candidate for hashes in cache.get_many(get_band_keys(image_hash)).values() for candidate in hashes}
+    closest = min(candidates, key=lambda candidate: (candidate ^ image_hash).bit_count(), default=None)
+    if closest is None or (closest ^ image_hash).bit_count() > MAX_HASH_DISTANCE:
+        return None
+    return cache.get(get_text_key(closest))
+
+def remember_text(image_hash, text):
+    band_keys = get_band_keys(image_hash)
+    bands = cache.get_many(band_keys)
+    values = {
+        key: ([image_hash] + [candidate for candidate in bands.get(key, []) if candidate != image_hash])[:BAND_CANDIDATES]
+        for key in band_keys
+    }
+    values[get_text_key(image_hash)] = text
+    cache.set_many(values, timeout=settings.OCR_CACHE_TTL)
+
+def run_tesseract(image):
+    """Reads the text of a prepared image, called in the OCR pool."""
+    if tesserocr is not None:
+        engine = getattr(_engines, 'engine', None)
+        if engine is None:
+            options = {'path': settings.TESSDATA_DIR_PATH} if settings.TESSDATA_DIR_PATH else {}
+            engine = _engines.engine = tesserocr.PyTessBaseAPI(lang=OCR_LANGUAGE, **options)
+        engine.SetImage(image)
+        return engine.GetUTF8Text()
+
+    config = f'--tessdata-dir {settings.TESSDATA_DIR_PATH}' if settings.TESSDATA_DIR_PATH else ''
+    return pytesseract.image_to_string(image, lang=OCR_LANGUAGE, config=config)
+
+def read_text(image_bytes):
+    """Text of the photo, from the cache when the same or a re-encoded copy of it was read within OCR_CACHE_TTL."""
+    exact_key = f'{EXACT_CACHE_PREFIX}:{hashlib.sha256(image_bytes).hexdigest()}'
+    text = cache.get(exact_key)
+    if text is not None:
+        return text
+
+    image = prepare_image(Image.open(io.BytesIO(image_bytes)))
+    image_hash = difference_hash(image)
+    text = find_similar_text(image_hash)
+    if text is None:
+        text = get_executor().submit(run_tesseract, binarize(image)).result()
+        remember_text(image_hash, text)
+    cache.set(exact_key, text, timeout=settings.OCR_CACHE_TTL)
+    return text
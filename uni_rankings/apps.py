@@ -4,3 +4,6 @@ class UniRankingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'uni_rankings'
     verbose_name = 'Üniversite Sıralamaları'
+
+    def ready(self):
+        from uni_rankings import signals
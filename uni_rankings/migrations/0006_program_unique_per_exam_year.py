@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:22
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_programs(apps, schema_editor):
+    """Keeps the latest program of every (major, university, exam_year) so the constraint can be added."""
+    Program = apps.get_model('uni_rankings', 'Program')
+    latest_ids = Program.objects.values('major', 'university', 'exam_year').annotate(latest_id=Max('id')).values('latest_id')
+    Program.objects.exclude(id__in=latest_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uni_rankings', '0005_alter_examyear_year_alter_location_name_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_programs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='program',
+            constraint=models.UniqueConstraint(fields=('major', 'university', 'exam_year'), name='unique_program_per_exam_year'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.0.7 on 2026-10-18 13:23
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+from utils.text_tools import fold_search_text
+
+
+def fill_search_text(apps, schema_editor):
+    Program = apps.get_model('uni_rankings', 'Program')
+    programs = []
+    for program in Program.objects.select_related('university', 'major').only('id', 'university__name', 'major__name').iterator():
+        program.search_text = fold_search_text(f"{program.university.name} {program.major.name}")
+        programs.append(program)
+    Program.objects.bulk_update(programs, ['search_text'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uni_rankings', '0006_program_unique_per_exam_year'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='program',
+            name='search_text',
+            field=models.CharField(blank=True, default='', editable=False, max_length=511, verbose_name='Arama Metni'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['exam_year', 'ranking'], name='program_year_ranking_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=models.Index(fields=['exam_year', 'min_score'], name='program_year_min_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='program',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_text'], name='program_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
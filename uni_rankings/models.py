@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
+from utils.text_tools import fold_search_text
 
 class University(models.Model):
     name = models.CharField(max_length=255, unique=True, verbose_name="Üniversite Adı")
@@ -51,10 +53,28 @@ class Program(models.Model):
     program_code = models.PositiveIntegerField(null=True, blank=True, verbose_name="Program Kodu")
     program_type = models.CharField(max_length=255, null=True, blank=True, verbose_name="Program Türü")
     education_length = models.PositiveIntegerField(null=True, blank=True, verbose_name="Eğitim Süresi")
+    # Folded university and major names for the program search, kept in sync on save and by the bulk import
+    search_text = models.CharField(max_length=511, blank=True, default='', editable=False, verbose_name="Arama Metni")
 
     class Meta:
         verbose_name = "Program"
         verbose_name_plural = "Programlar"
+        constraints = [
+            # One program per major, university and year, the bulk import upserts on it
+            models.UniqueConstraint(fields=['major', 'university', 'exam_year'], name='unique_program_per_exam_year'),
+        ]
+        indexes = [
+            models.Index(fields=['exam_year', 'ranking'], name='program_year_ranking_idx'),
+            models.Index(fields=['exam_year', 'min_score'], name='program_year_min_score_idx'),
+            GinIndex(fields=['search_text'], opclasses=['gin_trgm_ops'], name='program_search_trgm_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_text = build_program_search_text(self.university.name, self.major.name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.major} at {self.university.name}"
+
+def build_program_search_text(university_name, major_name):
+    return fold_search_text(f"{university_name} {major_name}")
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import University, Major, Program, build_program_search_text
+
+def refresh_program_search_text(programs):
+    programs = list(programs.select_related('university', 'major'))
+    for program in programs:
+        program.search_text = build_program_search_text(program.university.name, program.major.name)
+    Program.objects.bulk_update(programs, ['search_text'], batch_size=1000)
+
+@receiver(post_save, sender=University)
+def refresh_university_programs(sender, instance, created, **kwargs):
+    if not created:
+        refresh_program_search_text(instance.programs.all())
+
+@receiver(post_save, sender=Major)
+def refresh_major_programs(sender, instance, created, **kwargs):
+    if not created:
+        refresh_program_search_text(instance.programs.all())
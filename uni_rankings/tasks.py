@@ -1,5 +1,5 @@
 from celery import shared_task
-from .models import University, Major, Program, ExamYear, Location
+from .models import University, Major, Program, ExamYear, Location, build_program_search_text
 import pandas as pd
 import re
 from others.models import BulkUploadStatus
@@ -23,14 +23,114 @@ def clean_column_name(column):
     column = re.sub(r'\s+', ' ', column)
     return column
 
-def get_value_from_row(row, column_name):
-    """Fetch a value from the DataFrame row using a cleaned column name."""
-    column_name = clean_column_name(column_name)
-    try:
-        return row[column_name]
-    except KeyError:
-        print(f"Column '{column_name}' not found in DataFrame. Available columns: {row.index.tolist()}")
+# Updated list of Turkish city names, including additional cities
+TURKISH_CITIES = [
+    'ADANA', 'ADIYAMAN', 'AFYONKARAHİSAR', 'AĞRI', 'AMASYA', 'ANKARA',
+    'ANTALYA', 'ARTVİN', 'AYDIN', 'BALIKESİR', 'BİLECİK', 'BİNGÖL',
+    'BİTLİS', 'BOLU', 'BURDUR', 'BURSA', 'ÇANAKKALE', 'ÇANKIRI',
+    'ÇORUM', 'DENİZLİ', 'DİYARBAKIR', 'EDİRNE', 'ELAZIĞ', 'ERZİNCAN',
+    'ERZURUM', 'ESKİŞEHİR', 'GAZİANTEP', 'GEBZE', 'GİRESUN', 'GÜMÜŞHANE',
+    'HAKKARİ', 'HATAY', 'ISPARTA', 'MERSİN', 'İSTANBUL', 'İZMİR',
+    'KARS', 'KASTAMONU', 'KAYSERİ', 'KIRKLARELİ', 'KIRŞEHİR', 'KOCAELİ',
+    'KONYA', 'KÜTAHYA', 'MALATYA', 'MANİSA', 'KAHRAMANMARAŞ', 'MARDİN',
+    'MUĞLA', 'MUŞ', 'NEVŞEHİR', 'NİĞDE', 'ORDU', 'RİZE', 'SAKARYA',
+    'SAMSUN', 'SİİRT', 'SİNOP', 'SİVAS', 'TEKİRDAĞ', 'TOKAT', 'TRABZON',
+    'TUNCELİ', 'ŞANLIURFA', 'UŞAK', 'VAN', 'YOZGAT', 'ZONGULDAK',
+    'AKSARAY', 'BAYBURT', 'KARAMAN', 'KIRIKKALE', 'BATMAN', 'ŞIRNAK',
+    'BARTIN', 'ARDAHAN', 'IĞDIR', 'YALOVA', 'KARABÜK', 'KİLİS',
+    'OSMANİYE', 'DÜZCE', 'İÇİŞLERİ BAKANLIĞI VE MİLLİ SAVUNMA BAKANLIĞI ADINA SAĞLIK BİLİMLERİ ÜNİVERSİTESİNDE EĞİTİM ALACAKLAR'
+]
+CITY_ORDER = {city: order for order, city in enumerate(TURKISH_CITIES)}
+# A lookahead finds every (possibly overlapping) city occurrence in a single scan
+CITY_REGEX = re.compile('(?=(' + '|'.join(re.escape(city) for city in TURKISH_CITIES) + '))')
+UNIVERSITY_REGEX = r'\b(?:UNIVERSITY|UNIVERSITE|ÜNİVERSİTE|UNIVERSITESI|universite|üniversite|üniversitesi|university)\b'
+UNIVERSITY_WORD_REGEX = re.compile(r'\bÜNİVERSİTE(Sİ)?\b')
+PARENTHESES_REGEX = re.compile(r'\((.*?)\)')
+UOLP_REGEX = re.compile(r'UOLP-([^)]*)')
+PROGRAM_BATCH_SIZE = 1000  # Programs upserted per query, progress is reported after every batch
+PROGRAM_UPDATE_FIELDS = ['ranking', 'program_code', 'min_score', 'max_score', 'program_type', 'education_length', 'search_text']
+
+def get_column(df, form_data, field):
+    """Returns the mapped column of a field by its cleaned name, or None if it is skipped or missing."""
+    if form_data.get(f'skip_{field}') or not form_data.get(field):
+        return None
+    column_name = clean_column_name(form_data[field])
+    if column_name not in df.columns:
+        return None
+    return df[column_name]
+
+def empty_column(df):
+    return pd.Series(None, index=df.index, dtype=object)
+
+def split_text_values(series):
+    """Returns (is_text, text values, numeric values) so Excel text and number cells can be parsed separately."""
+    is_text = series.map(lambda value: isinstance(value, str)).astype(bool)
+    return is_text, series.where(is_text).astype(object), pd.to_numeric(series.where(~is_text), errors='coerce')
+
+def parse_integers(series, thousand_separators=False):
+    """Whole numbers of a column. Text must be digits, optionally with '.' or ',' thousand separators."""
+    is_text, text, numbers = split_text_values(series)
+    if thousand_separators:
+        text = text.str.replace(r'[,.]', '', regex=True)
+    text_numbers = pd.to_numeric(text.where(text.str.isdigit() == True), errors='coerce')
+    values = numbers.where(~is_text, text_numbers)
+    return values.where((values == values.round()) & (values >= 0))
+
+def parse_scores(series):
+    """Scores such as '339,9075' or 339.9075."""
+    is_text, text, numbers = split_text_values(series)
+    text = text.str.replace(',', '.')
+    text_numbers = pd.to_numeric(text.where(text.str.fullmatch(r'\d+(\.\d+)?') == True), errors='coerce')
+    values = numbers.where(~is_text, text_numbers)
+    return values.where(values >= 0)
+
+def to_value(value, cast=None):
+    """Converts pandas missing values to None."""
+    if pd.isna(value):
         return None
+    return cast(value) if cast else value
+
+def detect_location(university_name):
+    """Location name of a university: UOLP programs, a city in the name or the first parenthesised place."""
+    university_upper = university_name.upper()
+
+    if 'UOLP' in university_upper:
+        return "UOLP-Programları" if UOLP_REGEX.search(university_name) else None
+
+    # Step 1: Check for Turkish cities in the university name itself, in list order
+    university_name_cleaned = UNIVERSITY_WORD_REGEX.sub('', university_upper)
+    cities = [match.group(1) for match in CITY_REGEX.finditer(university_name_cleaned)]
+    if cities:
+        return capitalize_turkish(min(cities, key=CITY_ORDER.get))
+
+    # Step 2: Use the first parenthesised content that is not a university name, a city or a foreign location
+    for content in PARENTHESES_REGEX.findall(university_name):
+        if 'ÜNİVERSİTE' in content.upper().strip():
+            continue
+        return capitalize_turkish(content.strip())
+    return None
+
+def get_or_create_names(model, names):
+    """Bulk creates the missing rows of a model with a unique name. Returns ({name: id}, created count)."""
+    names = set(names)
+    existing = set(model.objects.filter(name__in=names).values_list('name', flat=True))
+    model.objects.bulk_create([model(name=name) for name in names - existing], ignore_conflicts=True)
+    return dict(model.objects.filter(name__in=names).values_list('name', 'id')), len(names - existing)
+
+def read_program_rows(df, form_data):
+    """
+    Finds the program rows of the table. University header rows are detected with a regex over the whole column
+    and forward filled onto the program rows below them. Rows starting with an asterisk are notes and skipped.
+    """
+    raw_names = df[clean_column_name(form_data['university_name'])]
+    names = raw_names.map(lambda value: str(value).strip())
+    is_note = names.str.startswith('*')
+    is_university = ~is_note & names.str.contains(UNIVERSITY_REGEX, flags=re.IGNORECASE, regex=True)
+
+    rows = pd.DataFrame({'major_name': names}, index=df.index)
+    rows['university_name'] = names.where(is_university).where(~is_note).ffill()
+    is_program = ~is_note & ~is_university & rows['university_name'].notna() & raw_names.notna()
+    return rows[is_program].copy()
 
 @shared_task(bind=True)
 def process_bulk_upload_uni_rankings(self, df_data, form_data):
@@ -44,190 +144,92 @@ def process_bulk_upload_uni_rankings(self, df_data, form_data):
 
     # Apply the cleaning function to all column names in the DataFrame
     df.columns = [clean_column_name(col) for col in df.columns]
-    print("Cleaned Excel Columns:", df.columns.tolist())
 
     try:
-        # Updated list of Turkish city names, including additional cities
-        turkish_cities = [
-            'ADANA', 'ADIYAMAN', 'AFYONKARAHİSAR', 'AĞRI', 'AMASYA', 'ANKARA',
-            'ANTALYA', 'ARTVİN', 'AYDIN', 'BALIKESİR', 'BİLECİK', 'BİNGÖL',
-            'BİTLİS', 'BOLU', 'BURDUR', 'BURSA', 'ÇANAKKALE', 'ÇANKIRI',
-            'ÇORUM', 'DENİZLİ', 'DİYARBAKIR', 'EDİRNE', 'ELAZIĞ', 'ERZİNCAN',
-            'ERZURUM', 'ESKİŞEHİR', 'GAZİANTEP', 'GEBZE', 'GİRESUN', 'GÜMÜŞHANE',
-            'HAKKARİ', 'HATAY', 'ISPARTA', 'MERSİN', 'İSTANBUL', 'İZMİR',
-            'KARS', 'KASTAMONU', 'KAYSERİ', 'KIRKLARELİ', 'KIRŞEHİR', 'KOCAELİ',
-            'KONYA', 'KÜTAHYA', 'MALATYA', 'MANİSA', 'KAHRAMANMARAŞ', 'MARDİN',
-            'MUĞLA', 'MUŞ', 'NEVŞEHİR', 'NİĞDE', 'ORDU', 'RİZE', 'SAKARYA',
-            'SAMSUN', 'SİİRT', 'SİNOP', 'SİVAS', 'TEKİRDAĞ', 'TOKAT', 'TRABZON',
-            'TUNCELİ', 'ŞANLIURFA', 'UŞAK', 'VAN', 'YOZGAT', 'ZONGULDAK',
-            'AKSARAY', 'BAYBURT', 'KARAMAN', 'KIRIKKALE', 'BATMAN', 'ŞIRNAK',
-            'BARTIN', 'ARDAHAN', 'IĞDIR', 'YALOVA', 'KARABÜK', 'KİLİS',
-            'OSMANİYE', 'DÜZCE', 'İÇİŞLERİ BAKANLIĞI VE MİLLİ SAVUNMA BAKANLIĞI ADINA SAĞLIK BİLİMLERİ ÜNİVERSİTESİNDE EĞİTİM ALACAKLAR'
-        ]
-
-        university_regex = r'\b(UNIVERSITY|UNIVERSITE|ÜNİVERSİTE|UNIVERSITESI|universite|üniversite|üniversitesi|university)\b'
-
         # Get the manually entered exam year
         exam_year_value = int(form_data['exam_year'])
         exam_year, _ = ExamYear.objects.get_or_create(year=exam_year_value)
 
-        # Preprocess to determine total_rows
-        current_university = None
-        rows_to_process = []
-        error_messages = []  # Collect all errors
-        success_messages = []  # Collect success messages
-
-        for _, row in df.iterrows():
-            university_or_major_name = str(row[form_data['university_name']]).strip()
-
-            # Skip entries starting with an asterisk
-            if university_or_major_name.startswith('*'):
-                continue
-
-            # Check if it's a university row using regex
-            if re.search(university_regex, university_or_major_name, re.IGNORECASE):
-                current_university = university_or_major_name
-                continue  # Move to the next row
-
-            if not current_university:
-                continue  # No university context, skip
-
-            university_name = row.get(form_data['university_name'], None)
-            if university_name is not None and not pd.isna(university_name):
-                rows_to_process.append((current_university, row))
-
-        total_rows = len(rows_to_process)
+        rows = read_program_rows(df, form_data)
+        total_rows = len(rows)
+
+        # Parse the optional columns of the program rows at once
+        program_type = get_column(df, form_data, 'program_type')
+        columns = {
+            'program_code': get_column(df, form_data, 'program_code'),
+            'ranking': get_column(df, form_data, 'ranking'),
+            'min_score': get_column(df, form_data, 'min_score'),
+            'max_score': get_column(df, form_data, 'max_score'),
+            'education_length': get_column(df, form_data, 'education_length'),
+        }
+        columns = {field: empty_column(df) if column is None else column for field, column in columns.items()}
+        rows['program_code'] = parse_integers(columns['program_code'])
+        rows['ranking'] = parse_integers(columns['ranking'], thousand_separators=True)
+        rows['min_score'] = parse_scores(columns['min_score'])
+        rows['max_score'] = parse_scores(columns['max_score'])
+        rows['education_length'] = parse_integers(columns['education_length'])
+        if program_type is None:
+            rows['program_type'] = None
+        else:
+            program_types = program_type.map(lambda value: str(value).strip(), na_action='ignore')
+            rows['program_type'] = program_types.mask(program_types == '')
+
+        # Locations only depend on the university, so they are detected once per university
+        university_locations = {name: detect_location(name) for name in rows['university_name'].unique()}
+        rows['location_name'] = rows['university_name'].map(university_locations)
+
+        # Create the dimension rows in bulk
+        university_ids, created_universities = get_or_create_names(University, rows['university_name'])
+        major_ids, _ = get_or_create_names(Major, rows['major_name'])
+        location_ids, _ = get_or_create_names(Location, [name for name in university_locations.values() if name])
+        rows['university_id'] = rows['university_name'].map(university_ids)
+        rows['major_id'] = rows['major_name'].map(major_ids)
+        rows['location_id'] = rows['location_name'].map(location_ids)
+
+        # Later rows of the same program overwrite earlier ones, like the row by row import did
+        programs = rows.drop_duplicates(subset=['major_id', 'university_id'], keep='last')
+        existing_programs = set(
+            Program.objects.filter(exam_year=exam_year).values_list('major_id', 'university_id')
+        )
+        created_programs = sum(
+            (major_id, university_id) not in existing_programs
+            for major_id, university_id in zip(programs['major_id'], programs['university_id'])
+        )
+        updated_programs = total_rows - created_programs
+
+        # Upsert the programs. Rows without a detected location keep the location they already have
         processed_rows = 0
-        created_universities = 0
-        created_programs = 0
-        updated_programs = 0
-
-        created_university_ids = set()
-
-        # Now process the rows
-        for current_university_name, row in rows_to_process:
-            # Detect the location
-            location = None
-            current_university_upper = current_university_name.upper()
-
-            if 'UOLP' in current_university_upper:
-                # Existing UOLP handling logic...
-                uolp_match = re.search(r'UOLP-([^)]*)', current_university_name)
-                if uolp_match:
-                    location_name = f"UOLP-Programları"
-                    location, _ = Location.objects.get_or_create(name=location_name)
-            else:
-                # Step 1: Check for Turkish cities in the university name itself
-                university_name_cleaned = re.sub(r'\bÜNİVERSİTE(Sİ)?\b', '', current_university_upper)
-                city_found_in_name = False
-                for city in turkish_cities:
-                    if city in university_name_cleaned:
-                        location_name = capitalize_turkish(city)
-                        location, _ = Location.objects.get_or_create(name=location_name)
-                        city_found_in_name = True
-                        break  # Exit if a city is found in the university name
-                
-                if not city_found_in_name:
-                    # Step 2: Check within parentheses
-                    parentheses_contents = re.findall(r'\((.*?)\)', current_university_name)
-                    
-                    possible_locations = []
-                    
-                    for content in parentheses_contents:
-                        content_upper = content.upper().strip()
-                        # Skip any content that includes 'ÜNİVERSİTE' or 'ÜNİVERSİTESİ'
-                        if 'ÜNİVERSİTE' in content_upper:
-                            continue
-                        # If content is in turkish cities, use it as location
-                        if content_upper in turkish_cities:
-                            possible_locations.append(content.strip())
-                            break  # Stop after finding the first valid city
-                        else:
-                            # For foreign or special locations
-                            possible_locations.append(content.strip())
-                            break  # Stop after finding the first valid location
-                    
-                    if possible_locations:
-                        # Step 3: Use the first found location from parentheses
-                        location_name = capitalize_turkish(possible_locations[0])
-                        location, _ = Location.objects.get_or_create(name=location_name)
-
-            # Get or create the university
-            current_university, uni_created = University.objects.get_or_create(name=current_university_name)
-            if uni_created or current_university.id not in created_university_ids:
-                if uni_created:
-                    created_universities += 1
-                created_university_ids.add(current_university.id)
-
-            # Handle Major
-            major_name = str(row[form_data['university_name']]).strip()
-            major, _ = Major.objects.get_or_create(name=major_name)
-
-            # Handle optional fields with format validation
-            program_code = clean_column_name(row, form_data['program_code']) if not form_data['skip_program_code'] else None
-            program_code = int(program_code) if program_code and str(program_code).isdigit() else None
-
-            ranking = get_value_from_row(row, form_data['ranking']) if not form_data['skip_ranking'] else None
-            min_score = get_value_from_row(row, form_data['min_score']) if not form_data['skip_min_score'] else None
-            max_score = get_value_from_row(row, form_data['max_score']) if not form_data['skip_max_score'] else None
-
-            print(f"Ranking (raw): {ranking}")
-            print(f"Min Score (raw): {min_score}")
-            print(f"Max Score (raw): {max_score}")
-
-            # Clean and convert ranking
-            if ranking:
-                ranking = re.sub(r'[,.]', '', str(ranking))
-                ranking = int(ranking) if ranking.isdigit() else None
-
-            # Convert min_score and max_score to floats
-            if min_score:
-                min_score = float(str(min_score).replace(',', '.')) if re.match(r'^\d+(\.\d+)?$', str(min_score).replace(',', '.')) else None
-
-            if max_score:
-                max_score = float(str(max_score).replace(',', '.')) if re.match(r'^\d+(\.\d+)?$', str(max_score).replace(',', '.')) else None
-
-            # Handle program_type and education_length
-            program_type = clean_column_name(row, form_data['program_type']) if not form_data['skip_program_type'] else None
-            program_type = str(program_type).strip() if program_type else None
-
-            education_length = clean_column_name(row, form_data['education_length']) if not form_data['skip_education_length'] else None
-            education_length = int(education_length) if education_length and str(education_length).isdigit() else None
-
-            # Create or update Program
-            program_defaults = {
-                'ranking': ranking,
-                'program_code': program_code,
-                'min_score': min_score,
-                'max_score': max_score,
-                'program_type': program_type,
-                'education_length': education_length,
-            }
-            if location:
-                program_defaults['location'] = location
-
-            program, created = Program.objects.update_or_create(
-                major=major,
-                university=current_university,
-                exam_year=exam_year,
-                defaults=program_defaults
-            )
-            if created:
-                created_programs += 1
-            else:
-                updated_programs += 1
-
-            # Update progress
-            processed_rows += 1
-            progress = int((processed_rows / total_rows) * 100)
-            task_status.progress = progress
-            task_status.status = 'PROGRESS'
-            task_status.save()
+        for has_location in (True, False):
+            batch_rows = programs[programs['location_id'].notna() == has_location]
+            update_fields = PROGRAM_UPDATE_FIELDS + ['location'] if has_location else PROGRAM_UPDATE_FIELDS
+            for start in range(0, len(batch_rows), PROGRAM_BATCH_SIZE):
+                batch = batch_rows.iloc[start:start + PROGRAM_BATCH_SIZE]
+                Program.objects.bulk_create([
+                    Program(
+                        major_id=int(row.major_id),
+                        university_id=int(row.university_id),
+                        exam_year=exam_year,
+                        location_id=to_value(row.location_id, int),
+                        ranking=to_value(row.ranking, int),
+                        program_code=to_value(row.program_code, int),
+                        min_score=to_value(row.min_score, float),
+                        max_score=to_value(row.max_score, float),
+                        program_type=to_value(row.program_type),
+                        education_length=to_value(row.education_length, int),
+                        search_text=build_program_search_text(row.university_name, row.major_name),
+                    )
+                    for row in batch.itertuples()
+                ], update_conflicts=True, unique_fields=['major', 'university', 'exam_year'], update_fields=update_fields)
+
+                # Update progress
+                processed_rows += len(batch)
+                task_status.progress = int((processed_rows / len(programs)) * 100)
+                task_status.status = 'PROGRESS'
+                task_status.save(update_fields=['progress', 'status', 'updated_at'])
 
         # Update task status to SUCCESS
         task_status.status = 'SUCCESS'
         task_status.message = f"{created_programs} program ve {created_universities} üniversite başarıyla {exam_year_value} yılı için yüklendi. {updated_programs} program güncellendi. Yükleme geçmişi sayfasına giderek detayları görebilirsiniz."
-        success_messages.append(task_status.message)
         task_status.progress = 100
         task_status.save()
 
@@ -235,7 +237,6 @@ def process_bulk_upload_uni_rankings(self, df_data, form_data):
         # Update task status to FAILURE
         task_status.status = 'FAILURE'
         task_status.message = f"Hata oluştu: {str(e)}"
-        error_messages.append(task_status.message)
         task_status.save()
 
 def capitalize_turkish(text):
@@ -1,7 +1,9 @@
 from rest_framework.views import APIView
 from utils.api_responses import ApiResponse
-from uni_rankings.models import Location, Major, Program, University
-from django.db.models import F
+from uni_rankings.models import ExamYear, Location, Major, Program, University
+from django.db.models import Exists, F, OuterRef
+from pagination.keyset_pagination import KeysetPagination
+from utils.text_tools import fold_search_text
 
 class LocationList(APIView):
     def get(self, request, *args, **kwargs):
@@ -50,3 +52,75 @@ class ProgramList(APIView):
             return ApiResponse.NotFound(message="Verilen filtreler için hiçbir program bulunamadı.")
         
         return ApiResponse.Success(data=list(programs))
+
+class ProgramSearch(APIView):
+    """
+    Searches the programs of one exam year by ranking, base score, score type and university or major name.
+    Results are ordered by ranking (default) or by base score, highest first, and paginated by keyset.
+    """
+    ordering_fields = {
+        'ranking': ('ranking', False),
+        'score': ('min_score', True),
+    }
+
+    def get(self, request, *args, **kwargs):
+        params = request.query_params
+
+        try:
+            min_ranking = parse_optional(params.get('min_ranking'), int)
+            max_ranking = parse_optional(params.get('max_ranking'), int)
+            min_score = parse_optional(params.get('min_score'), float)
+            max_score = parse_optional(params.get('max_score'), float)
+            year = parse_optional(params.get('exam_year'), int)
+        except ValueError:
+            return ApiResponse.BadRequest(message="Sıralama, puan ve sınav yılı sayısal olmalıdır.")
+
+        ordering = params.get('order_by', 'ranking')
+        if ordering not in self.ordering_fields:
+            return ApiResponse.BadRequest(message="order_by 'ranking' veya 'score' olmalıdır.")
+        order_field, descending = self.ordering_fields[ordering]
+
+        # Default to the latest year that has programs
+        exam_years = ExamYear.objects.filter(year=year) if year else ExamYear.objects.filter(
+            Exists(Program.objects.filter(exam_year=OuterRef('pk')))
+        ).order_by('-year')
+        exam_year = exam_years.first()
+        if not exam_year:
+            return ApiResponse.NotFound(message="Bu sınav yılı için hiçbir program bulunamadı.")
+
+        # The sort field is never NULL in the results, which keeps the (exam_year, field) index usable for paging
+        programs = Program.objects.filter(exam_year=exam_year, **{f'{order_field}__isnull': False})
+        if min_ranking is not None:
+            programs = programs.filter(ranking__gte=min_ranking)
+        if max_ranking is not None:
+            programs = programs.filter(ranking__lte=max_ranking)
+        if min_score is not None:
+            programs = programs.filter(min_score__gte=min_score)
+        if max_score is not None:
+            programs = programs.filter(min_score__lte=max_score)
+        if params.get('program_type'):
+            programs = programs.filter(program_type=params.get('program_type').strip())
+
+        search = fold_search_text(params.get('q'))
+        if search:
+            programs = programs.filter(search_text__contains=search)
+
+        programs = programs.annotate(
+            year=F('exam_year__year'),
+            university_name=F('university__name'),
+            major_name=F('major__name'),
+            location_name=F('location__name')
+        ).values(
+            'id', 'year', 'university_id', 'university_name', 'major_id', 'major_name', 'location_name',
+            'program_code', 'ranking', 'min_score', 'max_score', 'program_type', 'education_length'
+        )
+
+        paginator = KeysetPagination(order_field, descending=descending)
+        page = paginator.paginate_queryset(programs, request)
+        return paginator.get_paginated_response(page)
+
+def parse_optional(value, cast):
+    """Casts a query parameter, keeping missing or blank values as None."""
+    if value is None or value.strip() == '':
+        return None
+    return cast(value)
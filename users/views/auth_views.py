@@ -166,6 +166,11 @@ class NewAccessTokenAPIView(APIView):
         
         return ApiResponse.BadRequest("Refresh token gönderilmedi.")
 
+def logout_session(request):
+    """Ends the Django session of the request, API workers (SETTINGS_PROFILE=api) run without sessions."""
+    if hasattr(request, 'session'):
+        django_logout(request)
+
 class LogoutAPIView(APIView):
     permission_classes = [AllowAny]
     authentication_classes = []
@@ -178,7 +183,7 @@ class LogoutAPIView(APIView):
                 token_obj = RefreshToken(refresh_token)
                 token_obj.blacklist()
 
-                django_logout(request)
+                logout_session(request)
 
                 response = ApiResponse.Success(message='Başarıyla çıkış yapıldı.')
                 response.delete_cookie('refresh_token')
@@ -198,7 +203,7 @@ class LogoutAPIView(APIView):
                 token_obj = RefreshToken(refresh_token)
                 token_obj.blacklist()
 
-                django_logout(request)
+                logout_session(request)
 
                 response = ApiResponse.Success(message='Başarıyla çıkış yapıldı.')
                 return response
@@ -1,41 +1,17 @@
-import os
-import re
+from contextlib import closing
 import pytesseract
-from PIL import Image
-import io
-from openai import OpenAI, OpenAIError
-from dotenv import load_dotenv
-
-load_dotenv()
-openai_api_key = os.getenv("OPENAI_API_KEY")
-
-if not openai_api_key:
-    print("Warning: OPENAI_API_KEY environment variable not set.")
-
-client = OpenAI(api_key=openai_api_key)
+from django.conf import settings
+from openai import OpenAIError
+from services.ai_gateway import AIGatewayBusy, create_chat_completion, stream_chat_completion
+from services.ocr_pipeline import read_text
+from utils.content_filter import StreamingMessageFilter, get_content_filter
 
 def is_valid_message(text):
-    """Checks text against basic forbidden patterns."""
-    if not text: # Handle empty or None text
-        return True
-    forbidden_patterns = [
-        r"hack", r"exploit", r"bypass", r"illegal",
-        r"kötüye kullan", r"sistem açığı", r"zararlı kod",
-        r"spam", r"phishing", r"malware",
-        r"scam", r"fraud"
-    ]
-    # Case-insensitive check
-    return not any(re.search(pattern, text, re.IGNORECASE) for pattern in forbidden_patterns)
+    """Checks text against the forbidden words of the content filter."""
+    return get_content_filter().is_valid(text)
 
 def extract_text_from_image(image_file):
-    """Extracts text from an uploaded image file using Tesseract."""
-    tessdata_path = os.getenv("TESSDATA_DIR_PATH")
-    if not tessdata_path:
-        print("Warning: TESSDATA_DIR_PATH environment variable not set.")
-        tessdata_dir_config = None
-    else:
-        tessdata_dir_config = f'--tessdata-dir {tessdata_path}'
-
+    """Extracts text from an uploaded image file with the OCR pipeline, which caches the results."""
     try:
         # Check if image_file is already bytes
         if isinstance(image_file, bytes):
@@ -45,15 +21,7 @@ def extract_text_from_image(image_file):
             image_bytes = image_file.read()
         else:
              raise ValueError("Unsupported image file type")
-        img = Image.open(io.BytesIO(image_bytes))
-
-        # Specify Turkish language and pass the config (if available)
-        if tessdata_dir_config:
-            text = pytesseract.image_to_string(img, lang='tur', config=tessdata_dir_config)
-        else:
-            # Run without explicit config if path wasn't found (might fail)
-            text = pytesseract.image_to_string(img, lang='tur')
-        return text
+        return read_text(image_bytes)
     except pytesseract.TesseractNotFoundError:
         print("Error: Tesseract executable not found or not configured correctly.")
         raise RuntimeError("OCR Tesseract engine not found.")
@@ -62,30 +30,54 @@ def extract_text_from_image(image_file):
         raise RuntimeError(f"Görüntüden metin çıkarılırken hata oluştu: {str(e)}")
 
 def call_openai_chat(system_prompt, user_message, model="gpt-4.1-nano", max_tokens=512):
-    """Calls the OpenAI Chat Completions API."""
-    if not client.api_key:
+    """Calls the OpenAI Chat Completions API through the gateway, which caches the answers."""
+    if not settings.OPENAI_API_KEY:
          raise ValueError("OpenAI API Key not configured.")
 
     if not is_valid_message(user_message):
         return "Etik dışı veya uygunsuz içerik algılandı. Bu tür sorulara yanıt veremem."
 
     try:
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=max_tokens,
-        )
-        response_content = completion.choices[0].message.content
+        response_content = create_chat_completion(system_prompt, user_message, model, max_tokens)
         if not is_valid_message(response_content):
              return "AI tarafından üretilen yanıt uygunsuz içerik filtresini geçemedi."
         return response_content
 
+    except AIGatewayBusy:
+        raise
     except OpenAIError as e:
         print(f"OpenAI API Error: {e}")
         raise RuntimeError(f"Yapay zeka ile iletişimde hata oluştu: {str(e)}")
     except Exception as e:
         print(f"Unexpected error during OpenAI call: {e}")
         raise RuntimeError(f"Yapay zeka ile iletişimde beklenmedik bir hata oluştu: {str(e)}")
+
+def stream_openai_chat(system_prompt, user_message, model="gpt-4.1-nano", max_tokens=512):
+    """
+    Yields the answer of call_openai_chat in pieces as the model generates it, checked by StreamingMessageFilter.
+    Raises RuntimeError when the API call fails or the answer turns out to contain inappropriate content.
+    """
+    if not settings.OPENAI_API_KEY:
+         raise ValueError("OpenAI API Key not configured.")
+
+    if not is_valid_message(user_message):
+        yield "Etik dışı veya uygunsuz içerik algılandı. Bu tür sorulara yanıt veremem."
+        return
+
+    message_filter = StreamingMessageFilter()
+    try:
+        # Closing the stream when the client goes away or the filter stops it ends the generation of the model
+        with closing(stream_chat_completion(system_prompt, user_message, model, max_tokens)) as pieces:
+            for piece in pieces:
+                releasable = message_filter.feed(piece)
+                if releasable is None:
+                    raise RuntimeError("AI tarafından üretilen yanıt uygunsuz içerik filtresini geçemedi.")
+                if releasable:
+                    yield releasable
+        rest = message_filter.flush()
+        if rest:
+            yield rest
+
+    except OpenAIError as e:
+        print(f"OpenAI API Error: {e}")
+        raise RuntimeError(f"Yapay zeka ile iletişimde hata oluştu: {str(e)}")
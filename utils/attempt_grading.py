@@ -0,0 +1,162 @@
+class GradedAnswer:
+    """A single graded question of an attempt."""
+
+    def __init__(self, question, question_order, user_answer, user_time):
+        self.question = question
+        self.question_order = question_order
+        self.user_answer = user_answer
+        self.user_time = user_time
+        self.is_correct = user_answer == question.correct_answer
+
+    def to_detail(self, id_key):
+        """Returns the entry stored in the attempt's details['answers']."""
+        question = self.question
+        exam_year = {'id': question.exam_year.id, 'year': question.exam_year.year} if question.exam_year else None
+        exam_type = {'id': question.exam_type.id, 'name': question.exam_type.name} if question.exam_type else None
+
+        # Quiz attempts store the id under 'question_id', display set attempts under 'id'
+        if id_key == 'id':
+            return {
+                'id': question.id,
+                'question_order': self.question_order,
+                'exam_year': exam_year,
+                'exam_type': exam_type,
+                'difficulty_level': question.difficulty_level,
+                'image_url': question.image_url,
+                'video_solution_url': question.video_solution_url,
+                'user_answer': self.user_answer,
+                'correct_answer': question.correct_answer,
+                'is_correct': self.is_correct,
+                'user_time': self.user_time,
+            }
+        return {
+            'question_id': question.id,
+            'exam_year': exam_year,
+            'exam_type': exam_type,
+            'difficulty_level': question.difficulty_level,
+            'question_order': self.question_order,
+            'image_url': question.image_url,
+            'video_solution_url': question.video_solution_url,
+            'user_answer': self.user_answer,
+            'correct_answer': question.correct_answer,
+            'is_correct': self.is_correct,
+            'user_time': self.user_time,
+        }
+
+class GradingResult:
+    def __init__(self, total_questions, id_key):
+        self.total_questions = total_questions
+        self.id_key = id_key
+        self.correct_count = 0
+        self.incorrect_count = 0
+        self.unanswered_count = 0
+        self.graded_answers = []
+
+    def add(self, graded_answer):
+        if graded_answer.user_answer is None:
+            self.unanswered_count += 1
+        elif graded_answer.is_correct:
+            self.correct_count += 1
+        else:
+            self.incorrect_count += 1
+        self.graded_answers.append(graded_answer)
+
+    @property
+    def success_rate(self):
+        return (self.correct_count / self.total_questions) * 100 if self.total_questions > 0 else 0
+
+    @property
+    def details(self):
+        return {'answers': [graded_answer.to_detail(self.id_key) for graded_answer in self.graded_answers]}
+
+    def build_incorrect_questions(self, model, user, **attempt_kwargs):
+        """
+        Builds unsaved incorrect question rows for every wrong or unanswered question.
+        attempt_kwargs holds the attempt foreign key, e.g. quiz_attempt=... or display_set_attempt=...
+        """
+        return [
+            model(
+                user=user,
+                question=graded_answer.question,
+                user_answer=graded_answer.user_answer,
+                user_time=graded_answer.user_time,
+                question_order=graded_answer.question_order,
+                correct_answer=graded_answer.question.correct_answer,
+                **attempt_kwargs
+            )
+            for graded_answer in self.graded_answers
+            if graded_answer.user_answer is None or not graded_answer.is_correct
+        ]
+
+class AttemptGrader:
+    """
+    Grades submitted answers against the ordered questions of a quiz or display set.
+    The questions are indexed once so every answer is resolved in O(1) without extra queries.
+    """
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.question_index = {question.id: (question, order) for order, question in enumerate(questions, start=1)}
+
+    @classmethod
+    def from_queryset(cls, questions):
+        """Loads the ordered questions with their exam year and exam type in a single query."""
+        return cls(list(questions.select_related('exam_year', 'exam_type')))
+
+    @property
+    def subject_ids(self):
+        return {question.subject_id for question in self.questions if question.subject_id}
+
+    def grade_by_question_id(self, answers):
+        """Grades answers identified by 'question_id'. Questions missing from the answers count as unanswered."""
+        result = GradingResult(len(self.questions), 'question_id')
+        submitted_question_ids = set()
+
+        for answer in answers:
+            question_id = answer.get('question_id', None)
+            submitted_question_ids.add(question_id)
+
+            indexed = self.question_index.get(question_id)
+            if indexed is None:
+                continue
+
+            question, question_order = indexed
+            result.add(GradedAnswer(question, question_order, answer.get('user_answer', None), answer.get('user_time', None)))
+
+        for question_id, (question, question_order) in self.question_index.items():
+            if question_id not in submitted_question_ids:
+                result.add(GradedAnswer(question, question_order, None, None))
+
+        return result
+
+    def grade_by_question_order(self, answers):
+        """Grades answers identified by their 1-based 'question_order'. Missing orders count as unanswered."""
+        total_questions = len(self.questions)
+        result = GradingResult(total_questions, 'id')
+        submitted_orders = set()
+
+        for answer in answers:
+            question_order = answer.get('question_order')
+            submitted_orders.add(question_order)
+
+            # Skip invalid orders
+            if not isinstance(question_order, int) or not (1 <= question_order <= total_questions):
+                continue
+
+            question = self.questions[question_order - 1]
+            result.add(GradedAnswer(question, question_order, answer.get('user_answer'), answer.get('user_time')))
+
+        for question_order, question in enumerate(self.questions, start=1):
+            if question_order not in submitted_orders:
+                result.add(GradedAnswer(question, question_order, None, None))
+
+        return result
+
+def sort_by_subject_order(questions, ordered_subject_ids):
+    """Sorts questions by the position of their subject in ordered_subject_ids, then by question number."""
+    subject_positions = {subject_id: position for position, subject_id in enumerate(ordered_subject_ids)}
+    unordered_position = len(ordered_subject_ids)  # Put unordered subjects at the end
+    return sorted(
+        questions,
+        key=lambda question: (subject_positions.get(question.subject_id, unordered_position), question.question_number)
+    )
@@ -0,0 +1,27 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django_redis.cache import RedisCache
+from utils.request_metrics import record_cache_lookup
+
+# Cache backends that count hits and misses towards the request metrics of LogRequestMiddleware.
+# get_or_set and the BaseCache get_many fall back to get, so they are counted too.
+
+MISSING = object()
+
+class CacheMetricsMixin:
+    def get(self, key, default=None, version=None, **kwargs):
+        value = super().get(key, MISSING, version=version, **kwargs)
+        if value is MISSING:
+            record_cache_lookup(hits=0, misses=1)
+            return default
+        record_cache_lookup(hits=1, misses=0)
+        return value
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    def get_many(self, keys, *args, **kwargs):
+        keys = list(keys)
+        values = super().get_many(keys, *args, **kwargs)
+        record_cache_lookup(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    pass
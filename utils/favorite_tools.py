@@ -0,0 +1,61 @@
+from rest_framework.serializers import ListSerializer
+from quizzes.models import FavoriteQuestion
+
+def get_answer_question_id(answer):
+    """Quiz attempts store the question id under 'question_id', display set attempts under 'id'."""
+    return answer.get('question_id', answer.get('id'))
+
+def get_serialized_instances(serializer, obj):
+    """
+    Returns every instance serialized together with obj.
+    For a list serializer this is the whole page, so lookups can be resolved for all rows at once.
+    """
+    parent = serializer.parent
+    if isinstance(parent, ListSerializer) and parent.instance is not None:
+        return parent.instance
+    return [obj]
+
+class FavoriteQuestionResolver:
+    """
+    Resolves is_favorite for a user's questions with one query per batch of new question ids,
+    instead of one exists() query per question.
+    """
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.favorite_ids = set()
+        self.resolved_ids = set()
+
+    def prefetch(self, question_ids):
+        missing_ids = {question_id for question_id in question_ids if question_id} - self.resolved_ids
+        if not missing_ids:
+            return
+
+        self.favorite_ids.update(
+            FavoriteQuestion.objects.filter(
+                user_id=self.user_id,
+                question_id__in=missing_ids
+            ).values_list('question_id', flat=True)
+        )
+        self.resolved_ids.update(missing_ids)
+
+    def prefetch_answers(self, answers):
+        self.prefetch(get_answer_question_id(answer) for answer in answers)
+
+    def is_favorite(self, question_id):
+        self.prefetch([question_id])
+        return question_id in self.favorite_ids
+
+    def annotate_answers(self, answers):
+        """Sets 'is_favorite' on every answer entry of an attempt's details."""
+        self.prefetch_answers(answers)
+        for answer in answers:
+            answer['is_favorite'] = get_answer_question_id(answer) in self.favorite_ids
+        return answers
+
+def get_favorite_resolver(context, user_id):
+    """Returns the resolver cached on the serializer context for this user, creating it on first use."""
+    resolvers = context.setdefault('favorite_resolvers', {})
+    if user_id not in resolvers:
+        resolvers[user_id] = FavoriteQuestionResolver(user_id)
+    return resolvers[user_id]
@@ -0,0 +1,70 @@
+import random
+from django.core.cache import cache
+from quizzes.models import MotivationalMessage, MultiSubjectMotivationalMessage
+
+MOTIVATIONAL_CATALOGUE_CACHE_KEY = 'motivational_message_catalogue'
+GENERAL_KEY = 'general'
+MULTI_SUBJECT_KEY = 'multi'
+DEFAULT_MESSAGE = "İyi çalışmalar!"
+
+def build_motivational_catalogue():
+    """
+    Loads every active message into a dict keyed by (subject_id | 'general' | 'multi', success_rate_range).
+    """
+    catalogue = {}
+
+    messages = MotivationalMessage.objects.filter(is_active=True).values_list('subject_id', 'success_rate_range', 'message')
+    for subject_id, range_id, message in messages:
+        key = (subject_id or GENERAL_KEY, range_id)
+        catalogue.setdefault(key, []).append(message)
+
+    multi_messages = MultiSubjectMotivationalMessage.objects.filter(is_active=True).values_list('success_rate_range', 'message')
+    for range_id, message in multi_messages:
+        catalogue.setdefault((MULTI_SUBJECT_KEY, range_id), []).append(message)
+
+    return catalogue
+
+def get_motivational_catalogue():
+    catalogue = cache.get(MOTIVATIONAL_CATALOGUE_CACHE_KEY)
+    if catalogue is None:
+        catalogue = build_motivational_catalogue()
+        cache.set(MOTIVATIONAL_CATALOGUE_CACHE_KEY, catalogue, timeout=None)  # Cleared by signals on change
+    return catalogue
+
+def clear_motivational_catalogue():
+    cache.delete(MOTIVATIONAL_CATALOGUE_CACHE_KEY)
+
+def get_success_rate_range(success_rate):
+    if success_rate > 80:
+        return 5
+    elif success_rate > 60:
+        return 4
+    elif success_rate > 40:
+        return 3
+    elif success_rate > 20:
+        return 2
+    return 1  # Default to 0-20%
+
+def get_motivational_message(success_rate, subject_id=None):
+    """
+    Picks a random message for the success rate.
+    subject_id may be a single id or, for multi subject attempts, a list of ids.
+    Falls back to general messages when there is no subject or multi subject message.
+    """
+    range_id = get_success_rate_range(success_rate)
+    catalogue = get_motivational_catalogue()
+
+    messages = None
+    if isinstance(subject_id, list):
+        # Check if multiple subjects are involved
+        if len(subject_id) > 1:
+            messages = catalogue.get((MULTI_SUBJECT_KEY, range_id))
+    elif subject_id:
+        messages = catalogue.get((subject_id, range_id))
+
+    if not messages:
+        messages = catalogue.get((GENERAL_KEY, range_id))
+
+    if messages:
+        return random.choice(messages)
+    return DEFAULT_MESSAGE
@@ -0,0 +1,73 @@
+from itertools import chain
+from django.db import transaction
+from questions.models import Question
+from exam_sets.models import ExamSetSubject, ExamSetQuiz, ExamSetDisplaySet
+from utils.attempt_grading import sort_by_subject_order
+
+def get_through(parent):
+    """Returns the ordered through model of a quiz or display set and the name of its parent foreign key."""
+    field = parent._meta.get_field('questions')
+    return field.remote_field.through, field.m2m_field_name()
+
+def ordered_questions(parent):
+    """Questions of a quiz or display set in their stored order, read from the (parent, position) index."""
+    through, parent_field = get_through(parent)
+    link = through._meta.get_field('question').remote_field.related_name
+    return Question.objects.filter(**{f'{link}__{parent_field}': parent}).order_by(f'{link}__position')
+
+def set_ordered_questions(parent, questions):
+    """
+    Replaces the questions of a quiz or display set, numbering them from 1 in the given order.
+    Runs in a transaction, a failed insert keeps the previous questions instead of leaving none.
+    """
+    through, parent_field = get_through(parent)
+    question_ids = list(dict.fromkeys(getattr(question, 'id', question) for question in questions))
+    with transaction.atomic():
+        through.objects.filter(**{parent_field: parent}).delete()
+        through.objects.bulk_create([
+            through(**{parent_field: parent, 'question_id': question_id, 'position': position})
+            for position, question_id in enumerate(question_ids, start=1)
+        ])
+
+def get_question_order(parent, question_id):
+    """1-based order of a question in a quiz or display set, or None if it is not part of it."""
+    through, parent_field = get_through(parent)
+    links = through.objects.filter(**{parent_field: parent})
+    position = links.filter(question_id=question_id).values_list('position', flat=True).first()
+    if position is None:
+        return None
+    # Positions may have gaps after edits, so the order is the number of questions up to this one
+    return links.filter(position__lte=position).count()
+
+def get_exam_set_subject_ids(exam_set_id):
+    """Subject ids of an exam set in the order its quizzes and display sets list them."""
+    return list(
+        ExamSetSubject.objects.filter(exam_set_id=exam_set_id).order_by('order', 'id').values_list('subject_id', flat=True)
+    )
+
+def renumber_exam_set_questions(exam_set_id):
+    """
+    Rewrites the question positions of an exam set's quizzes and display sets after its subject order changed,
+    so they keep following the subject order and question number. Returns the number of moved questions.
+    """
+    ordered_subject_ids = get_exam_set_subject_ids(exam_set_id)
+    parents = chain(
+        ExamSetQuiz.objects.filter(quiz_group__exam_set_id=exam_set_id),
+        ExamSetDisplaySet.objects.filter(exam_set_id=exam_set_id)
+    )
+    moved = 0
+    for parent in parents:
+        through, parent_field = get_through(parent)
+        links = list(through.objects.filter(**{parent_field: parent}).select_related('question').order_by('position'))
+        questions = sort_by_subject_order([link.question for link in links], ordered_subject_ids)
+        link_by_question_id = {link.question_id: link for link in links}
+
+        changed = []
+        for position, question in enumerate(questions, start=1):
+            link = link_by_question_id[question.id]
+            if link.position != position:
+                link.position = position
+                changed.append(link)
+        through.objects.bulk_update(changed, ['position'], batch_size=1000)
+        moved += len(changed)
+    return moved
@@ -0,0 +1,263 @@
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from questions.models import Subject, Topic
+from performance_metrics.models import QuestionLatestStatus, SubjectPerformance, TopicPerformance
+from utils.question_catalogue import get_question_catalogue
+
+logger = logging.getLogger('django')
+
+ROLLUP_REBUILD_CACHE_KEY = 'performance_rollup_rebuild_scheduled'
+ROLLUP_REBUILD_DELAY = 60  # Seconds question bank changes are collected before one rebuild
+STATUS_UPDATE_FIELDS = ['status', 'answered_at', 'source_type', 'source_attempt_id']
+SUBJECT_PERFORMANCE_FIELDS = [
+    'correct_count', 'incorrect_count', 'unanswered_count', 'unseen_count', 'total_questions', 'success_rate',
+    'correct_percentage', 'incorrect_percentage', 'unanswered_percentage', 'unseen_percentage'
+]
+TOPIC_PERFORMANCE_FIELDS = [
+    'subject', 'correct_count', 'incorrect_count', 'unanswered_count', 'unseen_count', 'total_questions',
+    'success_rate', 'updated_at'
+]
+
+def get_answer_status(answer):
+    """Maps a stored answer entry to 'correct', 'incorrect' or 'unanswered'."""
+    if answer.get('is_correct', False):
+        return 'correct'
+    if answer.get('user_answer') is None:
+        return 'unanswered'
+    return 'incorrect'
+
+def build_latest_statuses(user_id, answers, answered_at, source_type, source_attempt_id, question_key='question_id'):
+    """
+    Builds unsaved QuestionLatestStatus rows for the answers of one attempt.
+    Quiz attempts store the question id under 'question_id', display set attempts under 'id'.
+    """
+    statuses = {}
+    for answer in answers:
+        question_id = answer.get(question_key)
+        if not question_id:
+            continue
+        statuses[question_id] = QuestionLatestStatus(
+            user_id=user_id,
+            question_id=question_id,
+            status=get_answer_status(answer),
+            answered_at=answered_at,
+            source_type=source_type,
+            source_attempt_id=source_attempt_id
+        )
+    return list(statuses.values())
+
+def save_latest_statuses(statuses, batch_size=None):
+    """Upserts the given rows, overwriting the previous status of each (user, question) pair."""
+    if not statuses:
+        return
+    QuestionLatestStatus.objects.bulk_create(
+        statuses,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['user', 'question'],
+        update_fields=STATUS_UPDATE_FIELDS
+    )
+
+def update_latest_question_statuses(attempt, source_type, question_key='question_id'):
+    """Records the answers of a freshly submitted attempt as the user's latest status per question."""
+    save_latest_statuses(build_latest_statuses(
+        attempt.user_id,
+        attempt.details.get('answers', []),
+        attempt.created_at,
+        source_type,
+        attempt.id,
+        question_key=question_key
+    ))
+
+class QuestionTotals:
+    """
+    Question bank totals shared by every user's rollup.
+    Subject totals only count questions with an image, topic totals count every question of the topic's subject.
+    """
+
+    def __init__(self):
+        self.subject_ids = list(Subject.objects.order_by('id').values_list('id', flat=True))
+        self.topic_subjects = dict(Topic.objects.filter(subject__isnull=False).values_list('id', 'subject_id'))
+        catalogue = get_question_catalogue()
+        self.subject_totals = catalogue.totals_by(2, with_image=True)
+        self.topic_totals = catalogue.totals_by(
+            3, cell_filter=lambda key: key[2] is not None and key[2] == self.topic_subjects.get(key[3])
+        )
+
+def count_latest_statuses(user_id, group_field, seen_filter=None):
+    """
+    Counts the user's latest question statuses grouped by group_field.
+    Returns {group_id: {'correct': n, 'incorrect': n, 'unanswered': n, 'seen': n}}.
+    """
+    seen_count = Count('id', filter=seen_filter) if seen_filter is not None else Count('id')
+    rows = (
+        QuestionLatestStatus.objects.filter(user_id=user_id, **{f'{group_field}__isnull': False})
+        .values(group_field, 'status')
+        .annotate(count=Count('id'), seen_count=seen_count)
+        .order_by()
+    )
+
+    counts = {}
+    for row in rows:
+        group_counts = counts.setdefault(row[group_field], {'seen': 0})
+        group_counts[row['status']] = row['count']
+        group_counts['seen'] += row['seen_count']
+    return counts
+
+def calculate_performance(counts, total_questions):
+    correct_count = counts.get('correct', 0)
+    incorrect_count = counts.get('incorrect', 0)
+    unanswered_count = counts.get('unanswered', 0)
+    unseen_count = max(total_questions - counts.get('seen', 0), 0)
+    attempted_count = correct_count + incorrect_count
+
+    def percentage(count):
+        return (count / total_questions * 100) if total_questions > 0 else 0
+
+    return {
+        'correct_count': correct_count,
+        'incorrect_count': incorrect_count,
+        'unanswered_count': unanswered_count,
+        'unseen_count': unseen_count,
+        'total_questions': total_questions,
+        'success_rate': (correct_count / attempted_count * 100) if attempted_count > 0 else 0,
+        'correct_percentage': percentage(correct_count),
+        'incorrect_percentage': percentage(incorrect_count),
+        'unanswered_percentage': percentage(unanswered_count),
+        'unseen_percentage': percentage(unseen_count),
+    }
+
+def refresh_user_performance(user_id, totals=None):
+    """
+    Recomputes the user's SubjectPerformance (exam_type=None) and TopicPerformance rows
+    from QuestionLatestStatus. Returns the subject performances ordered by subject id.
+    Pass a shared QuestionTotals when refreshing many users in a row.
+    """
+    totals = totals or QuestionTotals()
+    now = timezone.now()
+
+    # seen only counts questions with an image so unseen_count matches subject_totals
+    subject_counts = count_latest_statuses(user_id, 'question__subject_id', Q(question__image_url__isnull=False))
+    topic_counts = count_latest_statuses(user_id, 'question__topic_id', Q(question__subject_id=F('question__topic__subject_id')))
+
+    values_by_subject = {
+        subject_id: calculate_performance(subject_counts.get(subject_id, {}), totals.subject_totals.get(subject_id, 0))
+        for subject_id in totals.subject_ids
+    }
+
+    with transaction.atomic():
+        # Upsert of the overall rows: update_conflicts cannot target their partial unique constraint, Django adds no
+        # index predicate to ON CONFLICT. Missing rows are inserted with the conflicts of a concurrent refresh
+        # ignored, then every row is locked and updated.
+        SubjectPerformance.objects.bulk_create(
+            [
+                SubjectPerformance(user_id=user_id, subject_id=subject_id, exam_type=None, **values)
+                for subject_id, values in values_by_subject.items()
+            ],
+            ignore_conflicts=True
+        )
+        subject_performances = list(
+            SubjectPerformance.objects.select_for_update()
+            .filter(user_id=user_id, exam_type=None, subject_id__in=values_by_subject.keys())
+            .order_by('subject_id')
+        )
+        for performance in subject_performances:
+            for field, value in values_by_subject[performance.subject_id].items():
+                setattr(performance, field, value)
+            performance.updated_at = now
+        SubjectPerformance.objects.bulk_update(subject_performances, SUBJECT_PERFORMANCE_FIELDS + ['updated_at'])
+
+        topic_performances = []
+        for topic_id, total_questions in totals.topic_totals.items():
+            values = calculate_performance(topic_counts.get(topic_id, {}), total_questions)
+            topic_performances.append(TopicPerformance(
+                user_id=user_id,
+                subject_id=totals.topic_subjects[topic_id],
+                topic_id=topic_id,
+                correct_count=values['correct_count'],
+                incorrect_count=values['incorrect_count'],
+                unanswered_count=values['unanswered_count'],
+                unseen_count=values['unseen_count'],
+                total_questions=total_questions,
+                success_rate=values['success_rate'],
+                updated_at=now
+            ))
+
+        TopicPerformance.objects.filter(user_id=user_id).exclude(topic_id__in=totals.topic_totals.keys()).delete()
+        TopicPerformance.objects.bulk_create(
+            topic_performances,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['user', 'topic'],
+            update_fields=TOPIC_PERFORMANCE_FIELDS
+        )
+
+    return subject_performances
+
+def schedule_performance_refresh(user_id):
+    """Refreshes the user's performance rollups in Celery once the current transaction commits."""
+    from performance_metrics.tasks import refresh_user_performance_task
+
+    def enqueue():
+        try:
+            refresh_user_performance_task.delay(user_id)
+        except Exception as e:
+            logger.error(f"Performans güncellemesi kuyruğa alınamadı (user {user_id}): {str(e)}")
+
+    transaction.on_commit(enqueue)
+
+def rebuild_performance_rollups(user_ids=None):
+    """
+    Refreshes the rollups of the given users, by default of every user who has stored rollups,
+    with the question bank totals loaded once. Returns the number of refreshed users.
+    """
+    if user_ids is None:
+        user_ids = list(
+            SubjectPerformance.objects.filter(exam_type=None).order_by('user_id').values_list('user_id', flat=True).distinct()
+        )
+    totals = QuestionTotals()
+    for user_id in user_ids:
+        refresh_user_performance(user_id, totals=totals)
+    return len(user_ids)
+
+def get_user_rebuild_cache_key(user_id):
+    return f'{ROLLUP_REBUILD_CACHE_KEY}:{user_id}'
+
+def get_answering_user_ids(**question_filter):
+    """Ids of the users whose latest statuses include a question matching the filter, e.g. question_id=1."""
+    return list(
+        QuestionLatestStatus.objects.filter(**{f'question__{key}': value for key, value in question_filter.items()})
+        .order_by('user_id').values_list('user_id', flat=True).distinct()
+    )
+
+def schedule_performance_rebuild(user_ids=None):
+    """
+    Rebuilds stored rollups in Celery after the question bank changed, so they do not wait for the user's next
+    submission. Without user_ids every rollup is rebuilt, which bulk uploads do. Admin edits of single questions
+    pass the users who answered the question, the totals of the other users follow with their next submission.
+    Changes within ROLLUP_REBUILD_DELAY share one rebuild per user.
+    """
+    from performance_metrics.tasks import rebuild_performance_rollups_task
+
+    if user_ids is None:
+        if not cache.add(ROLLUP_REBUILD_CACHE_KEY, True, timeout=ROLLUP_REBUILD_DELAY):
+            return
+        keys = [ROLLUP_REBUILD_CACHE_KEY]
+    else:
+        if not user_ids or cache.get(ROLLUP_REBUILD_CACHE_KEY):
+            return  # Nobody answered the question, or every rollup is rebuilt anyway
+        keys = {get_user_rebuild_cache_key(user_id): user_id for user_id in user_ids}
+        for key in cache.get_many(list(keys)):
+            del keys[key]
+        if not keys:
+            return
+        user_ids = list(keys.values())
+        cache.set_many(dict.fromkeys(keys, True), timeout=ROLLUP_REBUILD_DELAY)
+    try:
+        rebuild_performance_rollups_task.apply_async(args=[user_ids], countdown=ROLLUP_REBUILD_DELAY)
+    except Exception as e:
+        cache.delete_many(list(keys))
+        logger.error(f"Performans özetlerinin yeniden hesaplanması kuyruğa alınamadı: {str(e)}")
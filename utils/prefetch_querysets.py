@@ -0,0 +1,71 @@
+from django.db.models import Count, Prefetch
+from quizzes.models import Quiz, QuizAttempt
+from exam_sets.models import ExamSetQuiz
+
+# Every helper loads what its serializers read per row with a fixed number of queries,
+# so the query count of a page does not grow with the page size.
+
+def with_question_count(queryset):
+    """Annotates quizzes with question_count, read by the total_questions fields instead of a COUNT per quiz."""
+    return queryset.annotate(question_count=Count('question_links'))
+
+def prefetch_quiz_groups(queryset):
+    """Quiz groups with their filters and quizzes, for DetailedQuizGroupSerializer and SimpleQuizGroupSerializer."""
+    return queryset.select_related('subject').prefetch_related(
+        'exam_years', 'exam_types', 'topic',
+        Prefetch('quizzes', queryset=with_question_count(Quiz.objects.all()))
+    )
+
+def prefetch_display_sets(queryset):
+    """Display sets with their filters, for the display set serializers."""
+    return queryset.select_related('subject').prefetch_related('exam_years', 'exam_types', 'topic')
+
+def prefetch_quizzes(queryset):
+    """Quizzes with the filters of their group, for DetailedQuizSerializer and MediumQuizSerializer."""
+    return with_question_count(queryset).select_related('quiz_group__subject').prefetch_related(
+        'quiz_group__exam_years', 'quiz_group__exam_types', 'quiz_group__topic'
+    )
+
+def prefetch_quiz_attempts(queryset):
+    """Quiz attempts with their quiz and its group, for the quiz attempt serializers."""
+    return queryset.prefetch_related(Prefetch('quiz', queryset=prefetch_quizzes(Quiz.objects.all())))
+
+def prefetch_incorrect_questions(queryset):
+    """Incorrect questions with their question and attempt, for IncorrectQuestionSerializer."""
+    return queryset.select_related('question__exam_year', 'question__exam_type').prefetch_related(
+        Prefetch('quiz_attempt', queryset=prefetch_quiz_attempts(QuizAttempt.objects.all()))
+    )
+
+def prefetch_favorite_questions(queryset):
+    """Favorite questions with their question, for FavoriteQuestionSerializer."""
+    return queryset.select_related(
+        'question__exam_year', 'question__exam_type', 'question__subject', 'question__topic'
+    )
+
+def prefetch_exam_sets(queryset):
+    """Active exam sets with their filters, for ExamSetSerializer."""
+    return queryset.prefetch_related('exam_years', 'exam_types', 'ordered_subjects', 'topics')
+
+def prefetch_exam_set_quiz_groups(queryset):
+    """Exam set quiz groups with their quizzes, for SimpleExamSetQuizGroupSerializer."""
+    return queryset.prefetch_related(Prefetch('quizzes', queryset=with_question_count(ExamSetQuiz.objects.all())))
+
+def prefetch_exam_set_display_sets(queryset):
+    """Exam set display sets with their filters, for the exam set display set serializers."""
+    return queryset.prefetch_related('exam_years', 'exam_types', 'subjects', 'topic')
+
+def prefetch_exam_set_quizzes(queryset):
+    """Exam set quizzes with the filters of their group, for the exam set quiz serializers."""
+    return with_question_count(queryset).select_related('quiz_group').prefetch_related(
+        'quiz_group__exam_years', 'quiz_group__exam_types', 'quiz_group__topic'
+    )
+
+def prefetch_exam_set_quiz_attempts(queryset):
+    """Exam set quiz attempts with their quiz and its group, for the exam set quiz attempt serializers."""
+    return queryset.prefetch_related(Prefetch('quiz', queryset=prefetch_exam_set_quizzes(ExamSetQuiz.objects.all())))
+
+def prefetch_exam_set_display_set_attempts(queryset):
+    """Exam set display set attempts with their display set, for the exam set display set attempt serializers."""
+    return queryset.select_related('display_set').prefetch_related(
+        'display_set__exam_years', 'display_set__exam_types', 'display_set__subjects', 'display_set__topic'
+    )
@@ -0,0 +1,77 @@
+from django.core.cache import cache
+from questions.models import Question
+
+QUESTION_CATALOGUE_CACHE_KEY = 'question_catalogue_index'
+
+class QuestionCatalogue:
+    """
+    In-memory index of the question bank, grouped into cells keyed by
+    (exam_year_id, exam_type_id, subject_id, topic_id). Every cell keeps the ids of all its
+    questions and of the ones with an image, so counts and id lists never need a COUNT query.
+    The question bank only changes on admin edits and uploads, which rebuild the index.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells  # {(exam_year_id, exam_type_id, subject_id, topic_id): {'ids': [...], 'image_ids': [...]}}
+
+    @classmethod
+    def build(cls):
+        cells = {}
+        rows = Question.objects.order_by('id').values_list(
+            'id', 'exam_year_id', 'exam_type_id', 'subject_id', 'topic_id', 'image_url'
+        )
+        for question_id, exam_year_id, exam_type_id, subject_id, topic_id, image_url in rows.iterator():
+            cell = cells.setdefault((exam_year_id, exam_type_id, subject_id, topic_id), {'ids': [], 'image_ids': []})
+            cell['ids'].append(question_id)
+            if image_url is not None:
+                cell['image_ids'].append(question_id)
+        return cls(cells)
+
+    def iter_cells(self, exam_year_ids=None, exam_type_ids=None, subject_ids=None, topic_ids=None):
+        """Yields (key, cell) for every cell matching the filters. A filter of None matches everything."""
+        filters = [
+            set(values) if values is not None else None
+            for values in (exam_year_ids, exam_type_ids, subject_ids, topic_ids)
+        ]
+        for key, cell in self.cells.items():
+            if all(allowed is None or value in allowed for value, allowed in zip(key, filters)):
+                yield key, cell
+
+    def ids(self, exam_year_ids=None, exam_type_ids=None, subject_ids=None, topic_ids=None, with_image=False):
+        field = 'image_ids' if with_image else 'ids'
+        question_ids = []
+        for _, cell in self.iter_cells(exam_year_ids, exam_type_ids, subject_ids, topic_ids):
+            question_ids.extend(cell[field])
+        return question_ids
+
+    def count(self, exam_year_ids=None, exam_type_ids=None, subject_ids=None, topic_ids=None, with_image=False):
+        field = 'image_ids' if with_image else 'ids'
+        return sum(len(cell[field]) for _, cell in self.iter_cells(exam_year_ids, exam_type_ids, subject_ids, topic_ids))
+
+    def totals_by(self, position, with_image=False, cell_filter=None):
+        """
+        Counts questions grouped by one part of the cell key
+        (0: exam_year_id, 1: exam_type_id, 2: subject_id, 3: topic_id). Rows with a NULL group are skipped.
+        """
+        field = 'image_ids' if with_image else 'ids'
+        totals = {}
+        for key, cell in self.cells.items():
+            group_id = key[position]
+            if group_id is None or (cell_filter is not None and not cell_filter(key)):
+                continue
+            totals[group_id] = totals.get(group_id, 0) + len(cell[field])
+        return totals
+
+def rebuild_question_catalogue():
+    catalogue = QuestionCatalogue.build()
+    cache.set(QUESTION_CATALOGUE_CACHE_KEY, catalogue.cells, timeout=None)  # Rebuilt on question changes
+    return catalogue
+
+def get_question_catalogue():
+    cells = cache.get(QUESTION_CATALOGUE_CACHE_KEY)
+    if cells is None:
+        return rebuild_question_catalogue()
+    return QuestionCatalogue(cells)
+
+def clear_question_catalogue():
+    cache.delete(QUESTION_CATALOGUE_CACHE_KEY)
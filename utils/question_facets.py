@@ -0,0 +1,126 @@
+import hashlib
+import json
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from questions.models import ExamYear, ExamType, Subject, Topic
+from utils.question_catalogue import get_question_catalogue
+
+QUESTION_FACETS_SCHEMA_VERSION = 1  # Bump when the blob layout changes so stale blobs are ignored
+QUESTION_FACETS_CACHE_KEY = f'question_facets:v{QUESTION_FACETS_SCHEMA_VERSION}'
+
+class QuestionFacets:
+    """
+    Precomputed year -> exam type -> subject -> topic tree of the questions that have an image and a topic,
+    used by the cascading question pickers instead of DISTINCT joins over the question table.
+    Years, exam types, subjects and topics are stored in the database ordering the pickers use,
+    so filtering the tree keeps the legacy ordering.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.version = data['version']
+        self.tree = data['tree']  # {exam_year_id: {exam_type_id: {subject_id: [topic_id, ...]}}}
+
+    @classmethod
+    def build(cls):
+        tree = {}
+        for (exam_year_id, exam_type_id, subject_id, topic_id), cell in get_question_catalogue().cells.items():
+            if exam_year_id is None or exam_type_id is None or topic_id is None or not cell['image_ids']:
+                continue
+            topic_ids = tree.setdefault(exam_year_id, {}).setdefault(exam_type_id, {}).setdefault(subject_id, [])
+            if topic_id not in topic_ids:
+                topic_ids.append(topic_id)
+
+        exam_type_ids, subject_ids, topic_ids = set(), set(), set()
+        for exam_types in tree.values():
+            exam_type_ids.update(exam_types)
+            for subjects in exam_types.values():
+                subject_ids.update(subject_id for subject_id in subjects if subject_id is not None)
+                for subject_topic_ids in subjects.values():
+                    topic_ids.update(subject_topic_ids)
+
+        data = {
+            'tree': tree,
+            'exam_years': list(ExamYear.objects.filter(id__in=tree.keys()).order_by('-year').values('id', 'year')),
+            'exam_types': list(ExamType.objects.filter(id__in=exam_type_ids).order_by('name').values('id', 'name')),
+            'subjects': list(Subject.objects.filter(id__in=subject_ids).order_by('name').values('id', 'name')),
+            'topics': list(
+                Topic.objects.filter(id__in=topic_ids).order_by('name').values('id', 'name', 'achievement_code', 'subject_id')
+            ),
+        }
+        # The version only changes when the content does, so clients keep their ETags across rebuilds
+        data['version'] = hashlib.md5(json.dumps(data, default=str).encode()).hexdigest()
+        return cls(data)
+
+    def iter_subject_nodes(self, exam_year_ids, exam_type_ids):
+        """Yields the {subject_id: [topic_id, ...]} node of every selected (year, exam type) pair."""
+        for exam_year_id in exam_year_ids:
+            exam_types = self.tree.get(exam_year_id, {})
+            for exam_type_id in exam_type_ids:
+                if exam_type_id in exam_types:
+                    yield exam_types[exam_type_id]
+
+    def exam_years(self):
+        return self.data['exam_years']
+
+    def exam_types(self, exam_year_ids):
+        exam_type_ids = set()
+        for exam_year_id in exam_year_ids:
+            exam_type_ids.update(self.tree.get(exam_year_id, {}))
+        return [exam_type for exam_type in self.data['exam_types'] if exam_type['id'] in exam_type_ids]
+
+    def subjects(self, exam_year_ids, exam_type_ids):
+        subject_ids = set()
+        for subjects in self.iter_subject_nodes(exam_year_ids, exam_type_ids):
+            subject_ids.update(subjects)
+        return [subject for subject in self.data['subjects'] if subject['id'] in subject_ids]
+
+    def topics(self, exam_year_ids, exam_type_ids, subject_id):
+        """Topics are matched on their own subject, like the legacy Topic.subject filter."""
+        topic_ids = set()
+        for subjects in self.iter_subject_nodes(exam_year_ids, exam_type_ids):
+            for subject_topic_ids in subjects.values():
+                topic_ids.update(subject_topic_ids)
+        return [
+            {'id': topic['id'], 'name': topic['name'], 'achievement_code': topic['achievement_code']}
+            for topic in self.data['topics']
+            if topic['id'] in topic_ids and topic['subject_id'] == subject_id
+        ]
+
+def rebuild_question_facets():
+    facets = QuestionFacets.build()
+    cache.set(QUESTION_FACETS_CACHE_KEY, facets.data, timeout=None)  # Rebuilt on question changes
+    return facets
+
+def get_question_facets():
+    data = cache.get(QUESTION_FACETS_CACHE_KEY)
+    if data is None:
+        return rebuild_question_facets()
+    return QuestionFacets(data)
+
+def clear_question_facets():
+    cache.delete(QUESTION_FACETS_CACHE_KEY)
+
+def get_facet_etag(request, facets):
+    """ETag of a picker response: the facet version plus the requested path and filters."""
+    return quote_etag(hashlib.md5(f'{facets.version}:{request.get_full_path()}'.encode()).hexdigest())
+
+def facet_not_modified(request, etag):
+    """Returns a 304 response if the client already has this version of the response, otherwise None."""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return None
+
+    etags = parse_etags(if_none_match)
+    if '*' not in etags and etag not in etags:
+        return None
+    return with_facet_etag(Response(status=status.HTTP_304_NOT_MODIFIED), etag)
+
+def with_facet_etag(response, etag):
+    response['ETag'] = etag
+    # Responses depend on the caller's token, so only the client may cache them and it must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,111 @@
+"""
+Text index of the question bank, used by SolveImageView to answer photos of questions we already hold.
+
+The text of every question image is read once by `python manage.py index_question_texts` and stored as a
+QuestionText. The text is folded, cut into overlapping SHINGLE_SIZE character shingles and summarised by a
+MinHash signature of NUM_PERMUTATIONS values, the share of equal values estimates the Jaccard similarity of two
+shingle sets. The signature is split into BANDS bands of ROWS_PER_BAND values and every band is stored as a
+QuestionTextBand key. A photographed question is compared only with the questions that share a band with it:
+with 32 bands of 4 rows a text with a similarity of 0.5 shares a band with a probability of 87%, one with 0.8
+(the default QUESTION_MATCH_THRESHOLD) with more than 99.99%, while unrelated questions (similarity below 0.1)
+almost never do.
+"""
+import hashlib
+import re
+import zlib
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from questions.models import QuestionText, QuestionTextBand
+from utils.text_tools import fold_search_text
+
+SHINGLE_SIZE = 5
+MIN_SHINGLES = 20  # Shorter texts match too many questions by chance and are not indexed or looked up
+NUM_PERMUTATIONS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+MAX_CANDIDATES = 20  # Questions sharing the most bands that are compared with the full signature
+PRIME = 4294967291  # Largest prime below 2 ** 32
+NON_ALPHANUMERIC_REGEX = re.compile(r'[^a-z0-9]+')
+
+# Fixed seed, the stored signatures are only comparable with signatures of the same permutations
+_random = np.random.default_rng(20241014)
+PERMUTATION_A = _random.integers(1, 1 << 31, size=NUM_PERMUTATIONS, dtype=np.uint64)  # a * x + b stays below 2 ** 64
+PERMUTATION_B = _random.integers(0, PRIME, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+def get_shingles(text):
+    """CRC32 hashes of the SHINGLE_SIZE character windows of the folded text, OCR noise in punctuation and case is ignored."""
+    text = NON_ALPHANUMERIC_REGEX.sub(' ', fold_search_text(text)).strip()
+    return {zlib.crc32(text[i:i + SHINGLE_SIZE].encode()) for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def get_signature(text):
+    """MinHash signature of the text as a list of ints, or None when the text is too short to be matched."""
+    shingles = get_shingles(text)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    # (a * x + b) mod p of every shingle for every permutation, the minimum per permutation is the signature
+    hashes = (PERMUTATION_A[:, None] * values + PERMUTATION_B[:, None]) % np.uint64(PRIME)
+    return hashes.min(axis=1).tolist()
+
+def get_band_keys(signature):
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(f'{band}:{rows}'.encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+def get_similarity(signature, other):
+    return sum(a == b for a, b in zip(signature, other)) / NUM_PERMUTATIONS
+
+@transaction.atomic
+def index_question(question, text):
+    """Stores the text read from the image of the question and its band keys, replacing the previous ones."""
+    signature = get_signature(text) or []
+    question_text, _ = QuestionText.objects.update_or_create(
+        question=question,
+        defaults={'image_url': question.image_url, 'text': text, 'signature': signature},
+    )
+    question_text.bands.all().delete()
+    if signature:
+        QuestionTextBand.objects.bulk_create(
+            QuestionTextBand(question_text=question_text, key=key) for key in get_band_keys(signature)
+        )
+    return question_text
+
+def find_matching_question(text):
+    """
+    The indexed question most similar to the text and its estimated similarity. The question is None when none
+    reaches QUESTION_MATCH_THRESHOLD or when the runner-up is within QUESTION_MATCH_MARGIN of it, the photo is
+    then solved by the model. Texts read from an image that has since been replaced are ignored.
+    """
+    signature = get_signature(text)
+    if signature is None:
+        return None, 0
+
+    candidate_ids = (
+        QuestionTextBand.objects.filter(key__in=get_band_keys(signature))
+        .values('question_text')
+        .annotate(matches=Count('id'))
+        .order_by('-matches')
+        .values_list('question_text', flat=True)[:MAX_CANDIDATES]
+    )
+    candidates = (
+        QuestionText.objects.filter(id__in=list(candidate_ids), image_url=F('question__image_url'))
+        .select_related('question__exam_year', 'question__exam_type', 'question__subject', 'question__topic')
+    )
+
+    best, best_similarity, runner_up_similarity = None, 0, 0
+    for candidate in candidates:
+        similarity = get_similarity(signature, candidate.signature)
+        if similarity > best_similarity:
+            best, best_similarity, runner_up_similarity = candidate, similarity, best_similarity
+        elif similarity > runner_up_similarity:
+            runner_up_similarity = similarity
+    if best is None or best_similarity < settings.QUESTION_MATCH_THRESHOLD:
+        return None, best_similarity
+    if best_similarity - runner_up_similarity < settings.QUESTION_MATCH_MARGIN:
+        return None, best_similarity  # Questions sharing a passage, the photo may show either of them
+    return best.question, best_similarity
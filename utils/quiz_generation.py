@@ -0,0 +1,41 @@
+import random
+from django.db import transaction
+from questions.models import Question
+from quizzes.models import QuizGroup, Quiz, QuizQuestion
+
+def sample_question_ids(exam_year_ids, exam_type_ids, subject_id, topic_ids, max_questions=None, seed=None):
+    """
+    Picks the shuffled ids of the questions with an image matching the filters.
+    Only the ids are read from the database, no question rows are loaded. They are not taken from the cached
+    question catalogue, which can still hold a question deleted moments ago and fail the insert of the quiz.
+    The same seed returns the same questions in the same order as long as the question bank does not change.
+    """
+    question_ids = list(
+        Question.objects.filter(
+            exam_year_id__in=exam_year_ids,
+            exam_type_id__in=exam_type_ids,
+            subject_id=subject_id,
+            topic_id__in=topic_ids,
+            image_url__isnull=False
+        ).order_by('id').values_list('id', flat=True)  # Sorted so a seed is reproducible
+    )
+    random.Random(seed).shuffle(question_ids)
+
+    if max_questions is not None:
+        question_ids = question_ids[:max_questions]
+    return question_ids
+
+def create_quiz_group(user, name, subject_id, exam_year_ids, exam_type_ids, topic_ids, question_ids):
+    """Creates a quiz group with a single quiz of the given questions in their given order, inserting them in one query."""
+    with transaction.atomic():
+        quiz_group = QuizGroup.objects.create(name=name, created_by=user, subject_id=subject_id)
+        quiz_group.exam_years.set(exam_year_ids)
+        quiz_group.exam_types.set(exam_type_ids)
+        quiz_group.topic.set(topic_ids)
+
+        quiz = Quiz.objects.create(quiz_group=quiz_group)
+        QuizQuestion.objects.bulk_create([
+            QuizQuestion(quiz_id=quiz.id, question_id=question_id, position=position)
+            for position, question_id in enumerate(question_ids, start=1)
+        ])
+    return quiz_group
@@ -0,0 +1,198 @@
+"""
+In-process request metrics, recorded by LogRequestMiddleware for every resolved URL name and method.
+
+Every worker process keeps its own registry, so with several gunicorn workers a call to the metrics endpoint
+only shows the requests served by the worker that answered it and the numbers start over when a worker restarts.
+"""
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # Seconds
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+RESPONSE_SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576)  # Bytes
+QUANTILES = (0.5, 0.95, 0.99)
+SLOWEST_QUERY_COUNT = 3
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+
+class Histogram:
+    """Cumulative bucket counts with sum, count and max, the shape of a Prometheus histogram."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is the +Inf bucket
+        self.sum = 0
+        self.count = 0
+        self.max = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation, capped at the largest observed value."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative_counts(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+    def summary(self, digits=4):
+        if not self.count:
+            return {'count': 0}
+        data = {
+            'count': self.count,
+            'avg': round(self.sum / self.count, digits),
+            'max': round(self.max, digits),
+        }
+        for q in QUANTILES:
+            data[f'p{int(q * 100)}'] = round(self.quantile(q), digits)
+        return data
+
+class RequestStats:
+    """Database queries and cache lookups of one request, collected while the request is served."""
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.slowest_queries = []  # Min-heap of (seconds, sql), the fastest of the kept queries is dropped first
+
+    def __call__(self, execute, sql, params, many, context):
+        """Database execute wrapper, installed with connection.execute_wrapper for the duration of the request."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.query_count += 1
+            self.query_time += duration
+            if len(self.slowest_queries) < SLOWEST_QUERY_COUNT:
+                heapq.heappush(self.slowest_queries, (duration, sql))
+            else:
+                heapq.heappushpop(self.slowest_queries, (duration, sql))
+
+    def get_slowest_queries(self):
+        """(seconds, sql) pairs of the slowest queries, slowest first."""
+        return sorted(self.slowest_queries, reverse=True)
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.db_time = Histogram(DURATION_BUCKETS)
+        self.query_count = Histogram(QUERY_COUNT_BUCKETS)
+        self.response_size = Histogram(RESPONSE_SIZE_BUCKETS)
+        self.status_codes = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+class RequestMetrics:
+    """Thread safe registry of ViewMetrics keyed by (URL name, method)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+        self.started_at = time.time()
+
+    def record(self, view_name, method, status_code, duration, stats, response_size=None):
+        with self.lock:
+            metrics = self.views.get((view_name, method))
+            if metrics is None:
+                metrics = self.views[(view_name, method)] = ViewMetrics()
+            metrics.duration.observe(duration)
+            metrics.db_time.observe(stats.query_time)
+            metrics.query_count.observe(stats.query_count)
+            if response_size is not None:  # Streaming responses have no size up front
+                metrics.response_size.observe(response_size)
+            metrics.status_codes[status_code] = metrics.status_codes.get(status_code, 0) + 1
+            metrics.cache_hits += stats.cache_hits
+            metrics.cache_misses += stats.cache_misses
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+            self.started_at = time.time()
+
+    def snapshot(self):
+        """Summary of every view with approximate percentiles, slowest average duration first."""
+        with self.lock:
+            views = [
+                {
+                    'view': view_name,
+                    'method': method,
+                    'status_codes': {str(code): count for code, count in sorted(metrics.status_codes.items())},
+                    'duration_seconds': metrics.duration.summary(),
+                    'db_seconds': metrics.db_time.summary(),
+                    'queries': metrics.query_count.summary(digits=1),
+                    'response_bytes': metrics.response_size.summary(digits=0),
+                    'cache_hits': metrics.cache_hits,
+                    'cache_misses': metrics.cache_misses,
+                }
+                for (view_name, method), metrics in self.views.items()
+            ]
+            started_at = self.started_at
+        views.sort(key=lambda view: view['duration_seconds']['avg'], reverse=True)
+        return {'uptime_seconds': round(time.time() - started_at), 'views': views}
+
+    def render_prometheus(self):
+        """The registry in the Prometheus text exposition format."""
+        histograms = (
+            ('http_request_duration_seconds', "Wall time of the request.", 'duration'),
+            ('http_request_db_duration_seconds', "Time spent in database queries per request.", 'db_time'),
+            ('http_request_db_queries', "Database queries per request.", 'query_count'),
+            ('http_response_size_bytes', "Size of the response body.", 'response_size'),
+        )
+        with self.lock:
+            items = sorted(self.views.items())
+            lines = []
+            for name, description, attribute in histograms:
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+                for (view_name, method), metrics in items:
+                    histogram = getattr(metrics, attribute)
+                    labels = f'view="{escape_label(view_name)}",method="{method}"'
+                    for bound, count in histogram.cumulative_counts():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            lines += ['# HELP http_responses_total Responses by status code.', '# TYPE http_responses_total counter']
+            for (view_name, method), metrics in items:
+                for status_code, count in sorted(metrics.status_codes.items()):
+                    lines.append(
+                        f'http_responses_total{{view="{escape_label(view_name)}",method="{method}",status="{status_code}"}} {count}'
+                    )
+
+            lines += ['# HELP cache_lookups_total Cache lookups by result.', '# TYPE cache_lookups_total counter']
+            for (view_name, method), metrics in items:
+                labels = f'view="{escape_label(view_name)}",method="{method}"'
+                lines.append(f'cache_lookups_total{{{labels},result="hit"}} {metrics.cache_hits}')
+                lines.append(f'cache_lookups_total{{{labels},result="miss"}} {metrics.cache_misses}')
+        return '\n'.join(lines) + '\n'
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def record_cache_lookup(hits, misses):
+    """Counts cache lookups towards the current request, lookups outside of a request are ignored."""
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+request_metrics = RequestMetrics()
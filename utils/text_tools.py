@@ -0,0 +1,11 @@
+import re
+from unidecode import unidecode
+
+def fold_search_text(text):
+    """
+    Folds text for accent and case insensitive matching: 'İstanbul Üniversitesi' -> 'istanbul universitesi'.
+    Turkish letters are transliterated before lowercasing, so 'I', 'İ' and 'ı' all become 'i'.
+    """
+    if not text:
+        return ''
+    return re.sub(r'\s+', ' ', unidecode(text).lower()).strip()
@@ -13,3 +13,11 @@ def validate_quiz_input(year_ids, type_ids, subject_id, topic_id, quiz_group_nam
 
     if not isinstance(type_ids, list) or not all(isinstance(tid, int) for tid in type_ids):
         raise ValidationError("type_ids listesinde yalnızca sayısal değerler olmalıdır.")
+
+def validate_quiz_options(max_questions, seed):
+    # bool is a subclass of int, so reject it explicitly
+    if max_questions is not None and (not isinstance(max_questions, int) or isinstance(max_questions, bool) or max_questions < 1):
+        raise ValidationError("max_questions pozitif bir tam sayı olmalıdır.")
+
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValidationError("seed sayısal olmalıdır.")